@@ -1,7 +1,9 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import serial
-import time
+
+from tabla_onda import tabla_am, repetir
+from generador_host import GeneradorTabla, resumen
+from arranque import abrir_puerto
 
 # Parámetros de la señal
 fs = 1000       # Frecuencia de muestreo (Hz)
@@ -24,20 +26,22 @@ senal_am = Ac * (1 + m * np.sin(2 * np.pi * fm * t)) * np.sin(2 * np.pi * fc * t
 # Señal con offset
 senal_am_offset = senal_am + offset
 
-# Normalización para PWM
-senal_am_normalizada = np.interp(senal_am_offset, (min(senal_am_offset), max(senal_am_offset)), (0, 255))
+# Normalización para PWM: un periodo común de portadora y envolvente,
+# cuantizado a 0..255 una sola vez y repetido (ver tabla_onda.py)
+tabla_pwm = tabla_am(fs, fc, fm, m, Ac, offset)
+senal_am_normalizada = repetir(tabla_pwm, len(t))
 
-# Envío por puerto serial (ajusta COMX)
-puerto = serial.Serial('COM5', 115200)
-time.sleep(2)
+# Envío por puerto serial (ajusta COMX): bloques binarios con plazos sobre
+# el reloj monotónico; el Arduino reproduce a fs desde su anillo (AMsignal.ino)
+puerto = abrir_puerto('COM5', 115200)
 
-for valor in senal_am_normalizada:
-    mensaje = f"{int(valor)}\n"
-    puerto.write(mensaje.encode())
-    time.sleep(1/fs)
+generador = GeneradorTabla(puerto, tabla_pwm, fs)
+informe = generador.transmitir(len(t))
 
+puerto.flush()  # Que salga el último bloque antes de cerrar
 puerto.close()
 print("Señal enviada completamente.")
+print(f"  {resumen(informe)}")
 
 # Gráficas en el dominio del tiempo
 plt.figure(figsize=(12, 10))
@@ -1,18 +1,41 @@
+// Reproduce por PWM (pin 11) las muestras que envía AMsignal.py.
+//
+// El host manda bytes binarios (un byte = un valor PWM 0..255) en bloques
+// con un adelanto de OBJETIVO muestras (ver generador_host.py). Aquí se
+// guardan en un anillo y se aplican a FS constantes medidas con micros(),
+// no al ritmo en que llegan los bytes.
+//
+// El periodo se corrige con el nivel del anillo: si se llena, el reloj del
+// Arduino va lento respecto del host y se acorta; si se vacía, se alarga.
+// Así la tasa de salida sigue a la del host sin desbordes a largo plazo.
+
+const unsigned long FS = 1000;                  // Debe coincidir con fs de AMsignal.py
+const unsigned long PERIODO_US = 1000000UL / FS;
+const int OBJETIVO = 128;                       // Nivel deseado (ADELANTO del host)
+const int PIN_PWM = 11;
+
+uint8_t anillo[256];                            // Índices uint8_t: dan la vuelta solos
+uint8_t cabeza = 0;
+uint8_t cola = 0;
+unsigned long proximo;
+
 void setup() {
-  Serial.begin(9600);
-  pinMode(11, OUTPUT);
+  Serial.begin(115200);
+  pinMode(PIN_PWM, OUTPUT);
+  proximo = micros();
 }
 
 void loop() {
-  if (Serial.available()) {
-    String input = Serial.readStringUntil('\n');
-    input.trim();
-    int pwm = input.toInt();
-
-    // Asegura que esté entre 0 y 255
-    pwm = constrain(pwm, 0, 255);
+  // Pasar lo recibido al anillo (si se llena, los bytes esperan en el buffer serial)
+  while (Serial.available() && (uint8_t)(cabeza + 1) != cola) {
+    anillo[cabeza++] = Serial.read();
+  }
 
-    analogWrite(11, pwm);  // Aplica PWM al pin 11
+  if ((long)(micros() - proximo) >= 0) {
+    int nivel = (uint8_t)(cabeza - cola);
+    if (nivel > 0) {
+      analogWrite(PIN_PWM, anillo[cola++]);     // Sin datos se mantiene el último valor
+    }
+    proximo += PERIODO_US - (nivel - OBJETIVO) / 16;
   }
 }
-
@@ -1,10 +1,14 @@
-import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Backend sin interfaz gráfica
-import matplotlib.pyplot as plt
-import serial
-import time
 import os
+import json
+import hashlib
+import threading
+import time
+
+import numpy as np
+
+from arranque import abrir_puerto, LISTO_ESP32
+from sintetizador_tabla import compilar_am, pureza, enviar_tabla, PUREZA_MIN_DB
+from supervisor import unirse, avisar_listo, publicar_estado
 
 # ============================================
 # PARÁMETROS DE LA SEÑAL AM
@@ -15,17 +19,31 @@ m = 0.5         # Índice de modulación (0-1)
 offset = 1.65   # Offset DC (1.65V = punto medio del DAC)
 amplitud = 1.0  # Amplitud de la portadora (V)
 
+# True: tabla compilada en el host + acumulador de fase (portadoras hasta
+# 20 kHz, ver sintetizador_tabla.py). False: START con sin() en el ESP32
+MODO_TABLA = True
+
 duracion_preview = 0.1  # Duración para vista previa (s)
+fs_preview = 50000  # Frecuencia de muestreo para gráfica
+
+# Las gráficas de vista previa se generan DESPUÉS de arrancar la señal, en
+# un hilo, y solo si cambiaron los parámetros (clave guardada junto a ellas).
+# matplotlib se importa recién ahí: no demora la conexión con el ESP32.
+ARCHIVOS_GRAFICAS = ('graficas/senal_am_temporal.png', 'graficas/senal_am_fft.png')
+ARCHIVO_CLAVE = 'graficas/senal_am.clave'
 
 # ============================================
 # CONEXIÓN SERIAL
 # ============================================
 puerto_esp32 = 'COM9'  # Puerto del ESP32
 
+# Bajo supervisor.py: si el supervisor termina, cierre normal (STOP) y salida
+unirse()
+
 print(f"Conectando al ESP32 en {puerto_esp32}...")
 try:
-    puerto = serial.Serial(puerto_esp32, 115200, timeout=2)
-    time.sleep(2)
+    # Listo cuando el ESP32 termina de imprimir su menú (tope: 2 s)
+    puerto = abrir_puerto(puerto_esp32, 115200, timeout=2, senal_listo=LISTO_ESP32)
     print("✓ Conectado al ESP32")
 except Exception as e:
     print(f"❌ Error al conectar: {e}")
@@ -34,17 +52,37 @@ except Exception as e:
 # ============================================
 # ENVIAR PARÁMETROS AL ESP32
 # ============================================
-comando = f"START,{fc},{fm},{m},{offset},{amplitud}\n"
-print(f"Enviando: {comando.strip()}")
-puerto.write(comando.encode())
-
-# Esperar confirmación
-time.sleep(0.5)
-if puerto.in_waiting:
-    respuesta = puerto.readline().decode().strip()
+puerto.timeout = 0.1  # Las respuestas se esperan con plazo propio
+if MODO_TABLA:
+    # Señal compilada en el host y verificada antes de subirla
+    tabla = compilar_am(fc, fm, m, offset, amplitud)
+    medicion = pureza(tabla)
+    print(f"Tabla: {len(tabla.tabla)} muestras, fc real {medicion['fc_real']:.3f} Hz, "
+          f"fm real {medicion['fm_real']:.3f} Hz, m {medicion['m_medido']:.3f}, "
+          f"SFDR {medicion['sfdr_db']:.1f} dB")
+    if medicion['sfdr_db'] < PUREZA_MIN_DB:
+        print(f"⚠ Espurio en {medicion['f_espurio']:.0f} Hz: pureza por debajo de {PUREZA_MIN_DB:.0f} dB")
+    ok, respuesta = enviar_tabla(puerto, tabla)
     print(f"ESP32: {respuesta}")
+    if not ok:
+        puerto.close()
+        exit(1)
+else:
+    comando = f"START,{fc},{fm},{m},{offset},{amplitud}\n"
+    print(f"Enviando: {comando.strip()}")
+    puerto.write(comando.encode())
+
+    # Esperar confirmación: se sigue apenas llega (antes, 0.5 s fijos)
+    limite = time.perf_counter() + 1.0
+    while time.perf_counter() < limite:
+        respuesta = puerto.readline().decode(errors='replace').strip()
+        if 'GENERANDO' in respuesta or 'ERROR' in respuesta:
+            print(f"ESP32: {respuesta}")
+            break
+puerto.timeout = 2
 
 print("\n✓ Señal AM generándose en ESP32")
+avisar_listo()  # Habilita al analizador si corre bajo supervisor.py
 print(f"  Portadora: {fc} Hz")
 print(f"  Moduladora: {fm} Hz")
 print(f"  Índice modulación: {m}")
@@ -52,91 +90,115 @@ print(f"  Índice modulación: {m}")
 # ============================================
 # GENERAR Y GUARDAR GRÁFICAS (SIN MOSTRAR)
 # ============================================
-fs_preview = 50000  # Frecuencia de muestreo para gráfica
-t = np.linspace(0, duracion_preview, int(fs_preview * duracion_preview))
-
-# Señales
-envolvente = m * np.sin(2 * np.pi * fm * t)
-portadora = np.sin(2 * np.pi * fc * t)
-senal_am = amplitud * (1 + m * np.sin(2 * np.pi * fm * t)) * np.sin(2 * np.pi * fc * t)
-senal_am_offset = senal_am + offset
-
-# Crear directorio para gráficas
-if not os.path.exists('graficas'):
-    os.makedirs('graficas')
-
-# ============================================
-# GRÁFICA 1: Señales
-# ============================================
-plt.figure(figsize=(14, 10))
-
-# Gráfica 1: Envolvente
-plt.subplot(4, 1, 1)
-plt.plot(t * 1000, envolvente, color='orange', linewidth=1.5)
-plt.title(f'Envolvente ({fm} Hz)', fontsize=12, fontweight='bold')
-plt.ylabel('Amplitud')
-plt.grid(True, alpha=0.3)
-plt.xlim(0, duracion_preview * 1000)
-
-# Gráfica 2: Portadora
-plt.subplot(4, 1, 2)
-plt.plot(t * 1000, portadora, color='red', linewidth=0.8)
-plt.title(f'Portadora ({fc} Hz)', fontsize=12, fontweight='bold')
-plt.ylabel('Amplitud')
-plt.grid(True, alpha=0.3)
-plt.xlim(0, duracion_preview * 1000)
-
-# Gráfica 3: Señal AM
-plt.subplot(4, 1, 3)
-plt.plot(t * 1000, senal_am, color='blue', linewidth=0.8)
-plt.title(f'Señal AM (m={m})', fontsize=12, fontweight='bold')
-plt.ylabel('Amplitud')
-plt.grid(True, alpha=0.3)
-plt.xlim(0, duracion_preview * 1000)
-
-# Gráfica 4: Señal con offset (salida del DAC)
-plt.subplot(4, 1, 4)
-plt.plot(t * 1000, senal_am_offset, color='purple', linewidth=0.8)
-plt.axhline(y=0, color='gray', linestyle='--', linewidth=0.5, label='0V')
-plt.axhline(y=3.3, color='gray', linestyle='--', linewidth=0.5, label='3.3V')
-plt.title(f'Salida DAC (offset={offset}V)', fontsize=12, fontweight='bold')
-plt.xlabel('Tiempo (ms)')
-plt.ylabel('Voltaje (V)')
-plt.grid(True, alpha=0.3)
-plt.xlim(0, duracion_preview * 1000)
-plt.ylim(-0.2, 3.5)
-plt.legend(loc='upper right')
-
-plt.tight_layout()
-plt.savefig('graficas/senal_am_temporal.png', dpi=150)
-print("✓ Gráfica temporal guardada: graficas/senal_am_temporal.png")
-plt.close()
-
-# ============================================
-# GRÁFICA 2: FFT
-# ============================================
-fft_signal = np.fft.fft(senal_am_offset)
-frecuencias = np.fft.fftfreq(len(t), 1/fs_preview)
-n = len(t) // 2
-
-plt.figure(figsize=(14, 5))
-plt.plot(frecuencias[:n], np.abs(fft_signal[:n]), color='darkblue', linewidth=1)
-plt.title('Espectro de Frecuencia - Señal AM', fontsize=14, fontweight='bold')
-plt.xlabel('Frecuencia (Hz)')
-plt.ylabel('Magnitud')
-plt.grid(True, alpha=0.3)
-plt.xlim(0, fc + 200)
-
-# Marcar frecuencias clave
-plt.axvline(x=fc, color='red', linestyle='--', linewidth=1.5, label=f'Portadora ({fc} Hz)')
-plt.axvline(x=fc-fm, color='orange', linestyle='--', linewidth=1, label=f'LSB ({fc-fm} Hz)')
-plt.axvline(x=fc+fm, color='orange', linestyle='--', linewidth=1, label=f'USB ({fc+fm} Hz)')
-plt.legend()
-
-plt.tight_layout()
-plt.savefig('graficas/senal_am_fft.png', dpi=150)
-print("✓ Gráfica FFT guardada: graficas/senal_am_fft.png")
-plt.close()
+def clave_parametros():
+    """Hash de todo lo que cambia las gráficas"""
+    parametros = [fc, fm, m, offset, amplitud, duracion_preview, fs_preview]
+    return hashlib.sha1(json.dumps(parametros).encode()).hexdigest()[:16]
+
+def graficas_en_cache(clave):
+    if not all(os.path.exists(archivo) for archivo in ARCHIVOS_GRAFICAS):
+        return False
+    try:
+        with open(ARCHIVO_CLAVE) as f:
+            return f.read().strip() == clave
+    except OSError:
+        return False
+
+def guardar_graficas():
+    clave = clave_parametros()
+    if graficas_en_cache(clave):
+        print("✓ Gráficas sin cambios (en caché): graficas/")
+        return
+
+    import matplotlib
+    matplotlib.use('Agg')  # Backend sin interfaz gráfica
+    import matplotlib.pyplot as plt
+
+    t = np.linspace(0, duracion_preview, int(fs_preview * duracion_preview))
+
+    # Señales
+    envolvente = m * np.sin(2 * np.pi * fm * t)
+    portadora = np.sin(2 * np.pi * fc * t)
+    senal_am = amplitud * (1 + m * np.sin(2 * np.pi * fm * t)) * np.sin(2 * np.pi * fc * t)
+    senal_am_offset = senal_am + offset
+
+    # Crear directorio para gráficas
+    if not os.path.exists('graficas'):
+        os.makedirs('graficas')
+
+    # ---------- Gráfica 1: Señales ----------
+    plt.figure(figsize=(14, 10))
+
+    # Gráfica 1: Envolvente
+    plt.subplot(4, 1, 1)
+    plt.plot(t * 1000, envolvente, color='orange', linewidth=1.5)
+    plt.title(f'Envolvente ({fm} Hz)', fontsize=12, fontweight='bold')
+    plt.ylabel('Amplitud')
+    plt.grid(True, alpha=0.3)
+    plt.xlim(0, duracion_preview * 1000)
+
+    # Gráfica 2: Portadora
+    plt.subplot(4, 1, 2)
+    plt.plot(t * 1000, portadora, color='red', linewidth=0.8)
+    plt.title(f'Portadora ({fc} Hz)', fontsize=12, fontweight='bold')
+    plt.ylabel('Amplitud')
+    plt.grid(True, alpha=0.3)
+    plt.xlim(0, duracion_preview * 1000)
+
+    # Gráfica 3: Señal AM
+    plt.subplot(4, 1, 3)
+    plt.plot(t * 1000, senal_am, color='blue', linewidth=0.8)
+    plt.title(f'Señal AM (m={m})', fontsize=12, fontweight='bold')
+    plt.ylabel('Amplitud')
+    plt.grid(True, alpha=0.3)
+    plt.xlim(0, duracion_preview * 1000)
+
+    # Gráfica 4: Señal con offset (salida del DAC)
+    plt.subplot(4, 1, 4)
+    plt.plot(t * 1000, senal_am_offset, color='purple', linewidth=0.8)
+    plt.axhline(y=0, color='gray', linestyle='--', linewidth=0.5, label='0V')
+    plt.axhline(y=3.3, color='gray', linestyle='--', linewidth=0.5, label='3.3V')
+    plt.title(f'Salida DAC (offset={offset}V)', fontsize=12, fontweight='bold')
+    plt.xlabel('Tiempo (ms)')
+    plt.ylabel('Voltaje (V)')
+    plt.grid(True, alpha=0.3)
+    plt.xlim(0, duracion_preview * 1000)
+    plt.ylim(-0.2, 3.5)
+    plt.legend(loc='upper right')
+
+    plt.tight_layout()
+    plt.savefig(ARCHIVOS_GRAFICAS[0], dpi=150)
+    print("✓ Gráfica temporal guardada: graficas/senal_am_temporal.png")
+    plt.close()
+
+    # ---------- Gráfica 2: FFT ----------
+    fft_signal = np.fft.fft(senal_am_offset)
+    frecuencias = np.fft.fftfreq(len(t), 1/fs_preview)
+    n = len(t) // 2
+
+    plt.figure(figsize=(14, 5))
+    plt.plot(frecuencias[:n], np.abs(fft_signal[:n]), color='darkblue', linewidth=1)
+    plt.title('Espectro de Frecuencia - Señal AM', fontsize=14, fontweight='bold')
+    plt.xlabel('Frecuencia (Hz)')
+    plt.ylabel('Magnitud')
+    plt.grid(True, alpha=0.3)
+    plt.xlim(0, fc + 200)
+
+    # Marcar frecuencias clave
+    plt.axvline(x=fc, color='red', linestyle='--', linewidth=1.5, label=f'Portadora ({fc} Hz)')
+    plt.axvline(x=fc-fm, color='orange', linestyle='--', linewidth=1, label=f'LSB ({fc-fm} Hz)')
+    plt.axvline(x=fc+fm, color='orange', linestyle='--', linewidth=1, label=f'USB ({fc+fm} Hz)')
+    plt.legend()
+
+    plt.tight_layout()
+    plt.savefig(ARCHIVOS_GRAFICAS[1], dpi=150)
+    print("✓ Gráfica FFT guardada: graficas/senal_am_fft.png")
+    plt.close()
+
+    with open(ARCHIVO_CLAVE, 'w') as f:
+        f.write(clave)
+
+threading.Thread(target=guardar_graficas).start()
 
 # ============================================
 # MANTENER CONEXIÓN ACTIVA
@@ -153,6 +215,7 @@ print("="*50 + "\n")
 try:
     while True:
         time.sleep(1)
+        publicar_estado(puerto_abierto=int(puerto.is_open))
         # Verificar que el puerto sigue abierto
         if not puerto.is_open:
             print("⚠ Puerto cerrado inesperadamente")
@@ -1,15 +1,24 @@
-import serial
+import time
+
+from arranque import abrir_puertos, CUALQUIER_DATO
+
+# Configuración del puerto serial (ajusta el COM según tu sistema). Se abre
+# antes de importar matplotlib: el Arduino se reinicia mientras tanto
+apertura = abrir_puertos({'Arduino': dict(puerto='COM9', baud=115200, timeout=None,
+                                          senal_listo=CUALQUIER_DATO)})
+
 import numpy as np
 import matplotlib.pyplot as plt
-import time
 
-# Configuración del puerto serial
-puerto = serial.Serial('COM9', 115200)  # Ajusta el COM según tu sistema
-time.sleep(2)  # Espera para establecer conexión
+from ingesta_serial import parsear_bloque
+from reloj_muestras import EstimadorFs
+
+puerto = apertura['Arduino'].result()
 
 # Parámetros
 ventana = 256  # Número de muestras por ventana (para el gráfico y la FFT)
-fs_muestras = []  # Lista para calcular frecuencia de muestreo real
+FS_INICIAL = 1000  # Hz - supuesto (delay(1) del sketch) hasta medir la fs real
+reloj = EstimadorFs()  # fs real: regresión sobre la llegada de cada bloque
 
 # Preparar la gráfica
 plt.ion()
@@ -34,36 +43,44 @@ fig.canvas.mpl_connect('close_event', on_close)
 
 # Bucle de lectura
 datos = []
+residuo = b''  # Línea incompleta del bloque anterior
 try:
     while running:
-        if puerto.in_waiting:
-            inicio = time.time()
-            valor = puerto.readline().decode().strip()
-            try:
-                dato = int(valor)
-                datos.append(dato)
-                if len(datos) >= ventana:
-                    # Tiempo entre muestras
-                    duracion = time.time() - inicio
-                    fs_muestras.append(1/duracion)
-
-                    # Actualizar señal
-                    x = np.arange(ventana)
-                    y = datos[-ventana:]
-                    linea1.set_data(x, y)
-
-                    # FFT
-                    fft = np.abs(np.fft.fft(y))
-                    freqs = np.fft.fftfreq(ventana, d=1/np.mean(fs_muestras[-10:]))
-                    linea2.set_data(freqs[:ventana//2], fft[:ventana//2])
-
-                    # Redibujar
-                    ax1.set_ylim(min(y)-10, max(y)+10)
-                    ax2.set_ylim(0, max(fft[:ventana//2])+10)
-                    fig.canvas.draw()
-                    fig.canvas.flush_events()
-            except ValueError:
-                pass
+        pendientes = puerto.in_waiting
+        if pendientes:
+            # Todo lo pendiente de una vez, marcado con la hora de llegada
+            bloque = residuo + puerto.read(pendientes)
+            llegada = time.perf_counter()
+            corte = bloque.rfind(b'\n')
+            if corte < 0:
+                residuo = bloque
+                continue
+            residuo = bloque[corte + 1:]
+            valores, _ = parsear_bloque(bloque[:corte + 1])
+            if valores.size == 0:
+                continue
+            reloj.registrar(valores.size, llegada)
+            datos = (datos + valores.tolist())[-ventana:]
+
+            if len(datos) >= ventana:
+                fs_actual = reloj.fs or FS_INICIAL
+
+                # Actualizar señal
+                x = np.arange(ventana)
+                y = datos
+                linea1.set_data(x, y)
+
+                # FFT
+                fft = np.abs(np.fft.fft(y))
+                freqs = np.fft.fftfreq(ventana, d=1/fs_actual)
+                linea2.set_data(freqs[:ventana//2], fft[:ventana//2])
+                ax2.set_title(f'FFT en tiempo real (fs medida: {fs_actual:.1f} Hz)')
+
+                # Redibujar
+                ax1.set_ylim(min(y)-10, max(y)+10)
+                ax2.set_ylim(0, max(fft[:ventana//2])+10)
+                fig.canvas.draw()
+                fig.canvas.flush_events()
 
 except KeyboardInterrupt:
     print("Interrupción manual.")
@@ -1,19 +1,29 @@
 import pyqtgraph as pg
 from PyQt5.QtWidgets import QApplication
 import numpy as np
-import serial
-from collections import deque
 import sys
 import threading
 import time
-from scipy.signal import butter, sosfiltfilt
+from scipy.signal import sosfiltfilt
+
+from buffer_circular import BufferCircular
+from ingesta_serial import IngestaSerial
+from espectro import espectro_magnitud
+from picos import encontrar_picos, estimar_picos
+from fuentes import FuenteArchivo, FuenteSintetica
+from decimacion import minmax_columnas
+from panel_metricas import TextosGrafica
+from filtros import disenar
+from planificador import PlanificadorFrames
+from arranque import abrir_puerto, CUALQUIER_DATO
+from supervisor import unirse, publicar_estado
 
 # ============================================
 # CONFIGURACIÓN
 # ============================================
 fs = 5000  # 5 kHz de muestreo (coincide con Arduino)
 N = 10000  # 2 segundos de datos (5000 * 2)
-buffer = deque([0]*N, maxlen=N)
+buffer = BufferCircular.para_ventana(N)
 
 # Puerto serial - ARDUINO (NO el ESP32)
 PUERTO_SERIAL = 'COM7'  # Puerto del ARDUINO que recibe la señal
@@ -22,25 +32,41 @@ BAUD_RATE = 115200
 # IMPORTANTE: El ESP32 debe estar en COM9 enviando la señal
 # Este script lee desde el Arduino en COM8
 
+# Fuente de muestras: 'serial' (Arduino), 'sintetica' (AM de AMsignalESP32.py)
+# o la ruta de una grabación (directorio de grabador.py o .npy de valores ADC)
+FUENTE = 'serial'
+VELOCIDAD = 1.0  # Veces tiempo real para archivo/sintética (0 = lo más rápido posible)
+
 # Filtros
 fc_envolvente = 100  # Hz - Pasa-bajos para extraer envolvente de 50 Hz
 orden = 4
 
-# Crear filtro pasa-bajos para envolvente
-sos_envolvente = butter(orden, fc_envolvente / (fs / 2), btype='low', output='sos')
+# El pasa-bajos se diseña con la fs efectiva (ver fs_efectiva), en caché
 
 # ============================================
-# CONEXIÓN SERIAL
+# CONEXIÓN SERIAL / FUENTE DE MUESTRAS
 # ============================================
-print(f"Intentando conectar a {PUERTO_SERIAL}...")
-try:
-    ser = serial.Serial(PUERTO_SERIAL, BAUD_RATE, timeout=1)
-    time.sleep(2)  # Esperar a que Arduino se reinicie
-    ser.reset_input_buffer()  # Limpiar buffer
-    print(f"✓ Conectado a {PUERTO_SERIAL}")
-except Exception as e:
-    print(f"❌ Error al conectar: {e}")
-    sys.exit(1)
+# Bajo supervisor.py el Arduino se abre recién cuando el ESP32 ya genera
+unirse(esperar_generando=FUENTE == 'serial')
+
+ser = None
+if FUENTE == 'serial':
+    print(f"Intentando conectar a {PUERTO_SERIAL}...")
+    try:
+        # Espera el reinicio del Arduino solo hasta su primera muestra
+        ser = abrir_puerto(PUERTO_SERIAL, BAUD_RATE, senal_listo=CUALQUIER_DATO)
+        print(f"✓ Conectado a {PUERTO_SERIAL}")
+    except Exception as e:
+        print(f"❌ Error al conectar: {e}")
+        sys.exit(1)
+    # Lee todo lo pendiente en el puerto y lo parsea en bloque
+    fuente = IngestaSerial(ser, buffer, fs=fs)
+elif FUENTE == 'sintetica':
+    fuente = FuenteSintetica(buffer, fs, velocidad=VELOCIDAD or None)
+    print("✓ Fuente sintética")
+else:
+    fuente = FuenteArchivo(buffer, FUENTE, fs=fs, velocidad=VELOCIDAD or None)
+    print(f"✓ Reproduciendo {FUENTE}")
 
 # ============================================
 # INTERFAZ GRÁFICA
@@ -91,16 +117,10 @@ for i in range(3):
     line.setVisible(False)
     marcadores_fft.append(line)
 
-# Panel de información
-info_text = pg.TextItem(
-    html='<div style="background-color: rgba(0,0,0,150); padding: 10px; border-radius: 5px;">'
-         '<span style="color: white; font-size: 12pt;">Iniciando...</span></div>',
-    anchor=(0, 0)
-)
-plot_fft.addItem(info_text)
-info_text.setPos(50, -5)
-
-frecuencias = np.fft.fftfreq(N, 1/fs)[:N//2]
+# Panel de información: una línea de texto plano por dato, sin HTML
+# [estado/RMS total, RMS envolvente, f1, f2, f3, estadísticas]
+info_text = TextosGrafica(plot_fft, ['cyan', 'lime'] + colores + ['gray'], pos=(50, -5))
+info_text.actualizar(["Iniciando..."])
 
 # ============================================
 # VARIABLES DE CONTROL
@@ -115,30 +135,17 @@ running = True
 def leer_serial():
     global datos_recibidos, errores_lectura, running
     
-    while running:
+    while running and not fuente.terminada:
         try:
-            if ser.in_waiting > 0:
-                linea = ser.readline().decode('utf-8').strip()
-                
-                if linea and linea.isdigit():
-                    valor_adc = int(linea)
-                    
-                    # Validar rango (0-1023 para Arduino)
-                    if 0 <= valor_adc <= 1023:
-                        # Convertir ADC a voltaje (0-5V)
-                        voltaje = (valor_adc / 1023.0) * 5.0
-                        buffer.append(voltaje)
-                        datos_recibidos += 1
-                    else:
-                        errores_lectura += 1
-                else:
-                    if linea:  # Solo contar si hay datos
-                        errores_lectura += 1
-                        
+            if fuente.leer() == 0:
+                time.sleep(0.001)  # Nada pendiente: ceder CPU
         except Exception as e:
-            errores_lectura += 1
+            fuente.errores_lectura += 1
             print(f"Error en lectura: {e}")
             time.sleep(0.001)
+        
+        datos_recibidos = fuente.datos_recibidos
+        errores_lectura = fuente.errores_lectura
 
 # Iniciar hilo de lectura
 hilo_lectura = threading.Thread(target=leer_serial, daemon=True)
@@ -148,10 +155,17 @@ print("✓ Hilo de lectura iniciado")
 # ============================================
 # FUNCIONES DE PROCESAMIENTO
 # ============================================
+def fs_efectiva():
+    """fs medida con el reloj del host (serial) o la nominal, redondeada a 0.1 Hz"""
+    reloj = fuente.reloj
+    if reloj is not None and reloj.listo:
+        return round(reloj.fs, 1)
+    return fs
+
 def extraer_envolvente(datos):
     """Extrae la envolvente usando filtro pasa-bajos"""
     try:
-        envolvente = sosfiltfilt(sos_envolvente, datos)
+        envolvente = sosfiltfilt(disenar('low', orden, fc_envolvente, fs_efectiva()), datos)
         return envolvente
     except:
         return datos
@@ -160,47 +174,47 @@ def calcular_rms(datos):
     """Calcula el voltaje RMS"""
     return np.sqrt(np.mean(datos**2))
 
-def encontrar_picos_fft(fft_vals, num_picos=3):
-    """Encuentra las N frecuencias principales en la FFT"""
-    # Evitar DC (frecuencia 0)
-    fft_vals_copia = fft_vals.copy()
-    fft_vals_copia[0:5] = 0  # Ignorar primeros bins (DC y ruido bajo)
-    
-    picos_idx = []
-    fft_temp = fft_vals_copia.copy()
-    
-    for _ in range(num_picos):
-        idx = np.argmax(fft_temp)
-        if fft_temp[idx] > 0:
-            picos_idx.append(idx)
-            # Eliminar pico y vecinos (ventana de 50 bins)
-            inicio = max(0, idx - 25)
-            fin = min(len(fft_temp), idx + 25)
-            fft_temp[inicio:fin] = 0
-    
-    return sorted(picos_idx)
-
 # ============================================
 # ACTUALIZACIÓN GRÁFICA
 # ============================================
 frames_procesados = 0
+total_leido = None
+# Intervalo del timer y periodo de la FFT adaptados al costo medido
+planificador = PlanificadorFrames(intervalo_inicial=0.05)
 
 def actualizar():
-    global frames_procesados
+    global frames_procesados, total_leido
+    
+    publicar_estado(datos=datos_recibidos, errores=errores_lectura, frames=frames_procesados)
     
-    # Convertir buffer a array
-    datos_np = np.array(buffer)
+    # Últimas N muestras (vista sin copia del buffer circular)
+    total = buffer.total_escrito
+    datos_np = buffer.ultimos(N, hasta=total)
     
     # Verificar que hay suficientes datos
     if len(datos_np) < orden * 6:
-        info_text.setHtml(
-            '<div style="background-color: rgba(0,0,0,150); padding: 10px; border-radius: 5px;">'
-            f'<span style="color: yellow; font-size: 12pt;">Llenando buffer... ({len(datos_np)}/{N})</span></div>'
-        )
+        info_text.actualizar([f"Llenando buffer... ({len(datos_np)}/{N})"])
         return
     
+    # Sin muestras nuevas no hay nada que recalcular ni redibujar
+    if not planificador.inicio_frame(total != total_leido):
+        return
+    total_leido = total
     frames_procesados += 1
+    with planificador.etapa('trazas'):
+        datos_centrados, rms_am, rms_envolvente = dibujar_trazas(datos_np)
+    
+    # FFT: cuando el planificador indica que toca (antes cada 5 frames)
+    if planificador.toca('espectro'):
+        with planificador.etapa('espectro', lenta=True):
+            dibujar_espectro(datos_centrados, rms_am, rms_envolvente)
     
+    intervalo = planificador.fin_frame()
+    if intervalo is not None:
+        timer.setInterval(intervalo)
+
+def dibujar_trazas(datos_np):
+    """Señal AM y envolvente; devuelve (datos_centrados, rms_am, rms_envolvente)"""
     # Remover componente DC
     datos_centrados = datos_np - np.mean(datos_np)
     
@@ -211,64 +225,58 @@ def actualizar():
     rms_am = calcular_rms(datos_centrados)
     rms_envolvente = calcular_rms(envolvente)
     
-    # Actualizar gráfica de señal AM
-    curve_am.setData(datos_centrados)
+    # Actualizar gráfica de señal AM (min/max por píxel: sin aliasing de la portadora)
+    curve_am.setData(*minmax_columnas(datos_centrados, plot_am.getViewBox().width()))
     y_max_am = np.max(np.abs(datos_centrados))
     if y_max_am > 0:
         label_am.setText(f"RMS: {rms_am:.3f} V | Pico: {y_max_am:.3f} V")
         label_am.setPos(100, y_max_am * 0.85)
     
     # Actualizar gráfica de envolvente
-    curve_envolvente.setData(envolvente)
+    curve_envolvente.setData(*minmax_columnas(envolvente, plot_envolvente.getViewBox().width()))
     y_max_env = np.max(np.abs(envolvente))
     if y_max_env > 0:
         label_envolvente.setText(f"RMS: {rms_envolvente:.3f} V | Pico: {y_max_env:.3f} V")
         label_envolvente.setPos(100, y_max_env * 0.85)
     
-    # FFT (calcular cada 5 frames para mejor rendimiento)
-    if frames_procesados % 5 == 0:
-        # Aplicar ventana
-        windowed = datos_centrados * np.hanning(len(datos_centrados))
+    return datos_centrados, rms_am, rms_envolvente
+
+def dibujar_espectro(datos_centrados, rms_am, rms_envolvente):
+    # FFT real con ventana y eje de frecuencias en caché
+    frecuencias, fft_vals = espectro_magnitud(datos_centrados, fs_efectiva())
+    
+    # Normalizar y convertir a dB
+    max_fft = np.max(fft_vals)
+    if max_fft > 0:
+        fft_db = 20 * np.log10(fft_vals / max_fft + 1e-12)
+        fft_db = np.clip(fft_db, -60, 5)
+        curve_fft.setData(frecuencias, fft_db)
+        
+        # Encontrar y marcar las 3 frecuencias principales
+        picos_idx = encontrar_picos(fft_vals, num_picos=3)
+        picos_freq, picos_amp = estimar_picos(fft_vals, frecuencias, picos_idx, 'gaussiana')
+        
+        # Textos de información: setText() solo en las líneas que cambiaron
+        lineas = [f"RMS Total: {rms_am:.3f} V", f"RMS Envolvente: {rms_envolvente:.3f} V",
+                  "", "", ""]
         
-        # Calcular FFT
-        fft_vals = np.abs(np.fft.fft(windowed))[:N//2]
+        for i in range(len(picos_idx)):
+            freq = picos_freq[i]
+            mag = 20 * np.log10(picos_amp[i] / max_fft + 1e-12)
+            marcadores_fft[i].setValue(freq)
+            marcadores_fft[i].setVisible(True)
+            lineas[2 + i] = f"● f{i+1}: {freq:.1f} Hz ({mag:.1f} dB)"
         
-        # Normalizar y convertir a dB
-        max_fft = np.max(fft_vals)
-        if max_fft > 0:
-            fft_db = 20 * np.log10(fft_vals / max_fft + 1e-12)
-            fft_db = np.clip(fft_db, -60, 5)
-            curve_fft.setData(frecuencias, fft_db)
-            
-            # Encontrar y marcar las 3 frecuencias principales
-            picos_idx = encontrar_picos_fft(fft_vals, num_picos=3)
-            
-            # Construir texto de información
-            info_html = '<div style="background-color: rgba(0,0,0,180); padding: 10px; border-radius: 5px;">'
-            info_html += f'<span style="color: cyan; font-size: 11pt; font-weight: bold;">RMS Total: {rms_am:.3f} V</span><br>'
-            info_html += f'<span style="color: lime; font-size: 11pt;">RMS Envolvente: {rms_envolvente:.3f} V</span><br><br>'
-            info_html += '<span style="color: white; font-size: 10pt; font-weight: bold;">Frecuencias principales:</span><br>'
-            
-            for i, idx in enumerate(picos_idx):
-                freq = frecuencias[idx]
-                mag = fft_db[idx]
-                marcadores_fft[i].setValue(freq)
-                marcadores_fft[i].setVisible(True)
-                
-                color = colores[i]
-                info_html += f'<span style="color: {color}; font-size: 10pt;">● f{i+1}: {freq:.1f} Hz ({mag:.1f} dB)</span><br>'
-            
-            info_html += f'<br><span style="color: gray; font-size: 9pt;">Datos: {datos_recibidos} | Errores: {errores_lectura}</span>'
-            info_html += '</div>'
-            
-            info_text.setHtml(info_html)
+        lineas.append(f"Datos: {datos_recibidos} | Errores: {errores_lectura} | "
+                      f"{planificador.fps:.1f} FPS | Perdidos: {planificador.perdidos}")
+        info_text.actualizar(lineas)
 
 # ============================================
 # TIMER Y EJECUCIÓN
 # ============================================
 timer = pg.QtCore.QTimer()
 timer.timeout.connect(actualizar)
-timer.start(50)  # Actualizar cada 50 ms (20 FPS)
+timer.start(planificador.intervalo_ms)  # Luego lo ajusta el planificador
 
 win.show()
 print("\n✓ Interfaz gráfica iniciada")
@@ -282,5 +290,6 @@ except KeyboardInterrupt:
     print("\n\nCerrando...")
 finally:
     running = False
-    ser.close()
-    print("✓ Puerto serial cerrado")
\ No newline at end of file
+    if ser:
+        ser.close()
+        print("✓ Puerto serial cerrado")
\ No newline at end of file
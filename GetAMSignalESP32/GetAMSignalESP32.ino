@@ -3,6 +3,12 @@
 // ============================================
 // Genera señal AM hasta 10kHz usando Timer hardware
 // DAC a 8 bits (0-255) -> 0-3.3V
+//
+// Dos modos:
+//   START,fc,fm,m,offset,amp  dos sin() en float por muestra (fc <= 5 kHz)
+//   Trama TABLA (binaria)     tabla compilada en el host + acumulador de
+//                             fase, solo enteros en el ISR (ver
+//                             sintetizador_tabla.py y protocolo_binario.py)
 
 #define LED 2
 #define DAC_PIN 25
@@ -17,6 +23,23 @@ volatile float amplitud = 1.0;   // Amplitud (V)
 volatile bool generando = false;
 volatile uint32_t sample_count = 0;
 
+// Modo tabla: un periodo de la señal ya cuantizado, recorrido por un
+// acumulador de fase de 32 bits con interpolación lineal. Doble buffer: la
+// tabla nueva se recibe en la inactiva y se cambia de un solo paso.
+#define MAX_TABLA 16384
+#define BITS_FRACCION 8
+const uint8_t SYNC_COMANDO[2] = {0x5A, 0xA5};
+const uint8_t CMD_TABLA = 'T';
+
+uint8_t tablas[2][MAX_TABLA];
+volatile uint8_t *tabla_activa = tablas[0];
+volatile uint32_t fase = 0;
+volatile uint32_t incremento = 0;
+volatile uint32_t mascara = 0;
+volatile uint8_t desplazamiento = 32;
+volatile bool modo_tabla = false;
+portMUX_TYPE mux = portMUX_INITIALIZER_UNLOCKED;
+
 // Timer
 hw_timer_t *timer = NULL;
 
@@ -29,6 +52,17 @@ const uint32_t SAMPLE_RATE = 50000;  // 50kHz
 void IRAM_ATTR onTimer() {
   if (!generando) return;
   
+  if (modo_tabla) {
+    // Misma cuenta que TablaDDS.simular(): sumar, leer e interpolar
+    fase += incremento;
+    uint32_t i = fase >> desplazamiento;
+    int32_t fraccion = (fase >> (desplazamiento - BITS_FRACCION)) & 0xFF;
+    int32_t a = tabla_activa[i];
+    int32_t b = tabla_activa[(i + 1) & mascara];
+    dacWrite(DAC_PIN, (uint8_t)(a + (((b - a) * fraccion) >> BITS_FRACCION)));
+    return;
+  }
+  
   // Calcular tiempo actual
   float t = (float)sample_count / SAMPLE_RATE;
   
@@ -50,11 +84,99 @@ void IRAM_ATTR onTimer() {
   sample_count++;
 }
 
+// ============================================
+// TRAMA TABLA
+// ============================================
+// SYNC(2) codigo(1) n(uint16) payload(n) crc(uint16), little-endian.
+// payload = incremento(uint32) bits(uint8) tabla(2^bits bytes).
+// CRC-16/CCITT (0x1021, inicio 0xFFFF) de codigo+n+payload.
+uint16_t crc16(uint16_t crc, const uint8_t *datos, size_t n) {
+  while (n--) {
+    crc ^= (uint16_t)(*datos++) << 8;
+    for (int i = 0; i < 8; i++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+bool leerExacto(uint8_t *destino, size_t n) {
+  return Serial.readBytes(destino, n) == n;
+}
+
+void descartarEntrada() {
+  while (Serial.available()) Serial.read();
+}
+
+void recibirTabla() {
+  uint8_t cabecera[5];  // sync(2), codigo, n(2)
+  uint8_t parametros[5];
+  uint8_t crc_recibido[2];
+  
+  if (!leerExacto(cabecera, sizeof(cabecera)) || cabecera[1] != SYNC_COMANDO[1]) {
+    Serial.println("ERROR: trama incompleta");
+    descartarEntrada();
+    return;
+  }
+  uint16_t n = cabecera[3] | (cabecera[4] << 8);
+  if (cabecera[2] != CMD_TABLA || n < sizeof(parametros) + 2 || n > sizeof(parametros) + MAX_TABLA) {
+    Serial.println("ERROR: comando binario desconocido");
+    descartarEntrada();
+    return;
+  }
+  
+  // Se recibe en la tabla que el ISR no está leyendo
+  uint8_t *inactiva = (tabla_activa == tablas[0]) ? tablas[1] : tablas[0];
+  size_t largo = n - sizeof(parametros);
+  if (!leerExacto(parametros, sizeof(parametros)) || !leerExacto(inactiva, largo) ||
+      !leerExacto(crc_recibido, sizeof(crc_recibido))) {
+    Serial.println("ERROR: trama incompleta");
+    descartarEntrada();
+    return;
+  }
+  
+  uint16_t crc = crc16(0xFFFF, cabecera + 2, 3);
+  crc = crc16(crc, parametros, sizeof(parametros));
+  crc = crc16(crc, inactiva, largo);
+  if (crc != (crc_recibido[0] | (crc_recibido[1] << 8))) {
+    Serial.println("ERROR: CRC de tabla");
+    return;
+  }
+  
+  uint32_t nuevo_incremento = parametros[0] | (parametros[1] << 8) |
+                              ((uint32_t)parametros[2] << 16) | ((uint32_t)parametros[3] << 24);
+  uint8_t bits = parametros[4];
+  if (bits < BITS_FRACCION || bits > 24 || ((size_t)1 << bits) != largo) {
+    Serial.println("ERROR: largo de tabla");
+    return;
+  }
+  
+  portENTER_CRITICAL(&mux);
+  tabla_activa = inactiva;
+  incremento = nuevo_incremento;
+  mascara = largo - 1;
+  desplazamiento = 32 - bits;
+  fase = 0;
+  modo_tabla = true;
+  generando = true;
+  portEXIT_CRITICAL(&mux);
+  timerStart(timer);
+  digitalWrite(LED, HIGH);
+  
+  Serial.print("✓ GENERANDO SEÑAL AM (tabla de ");
+  Serial.print(largo);
+  Serial.print(" muestras, incremento ");
+  Serial.print(nuevo_incremento);
+  Serial.println(")");
+}
+
 // ============================================
 // SETUP
 // ============================================
 void setup() {
+  Serial.setRxBufferSize(1024);
   Serial.begin(115200);
+  Serial.setTimeout(1000);  // Entre bytes de una trama
   pinMode(LED, OUTPUT);
   
   // Configurar DAC
@@ -71,6 +193,7 @@ void setup() {
   Serial.println("Comandos:");
   Serial.println("  START,fc,fm,m,offset,amp");
   Serial.println("  STOP");
+  Serial.println("  Trama TABLA (binaria, ver sintetizador_tabla.py)");
   Serial.println("=================================\n");
   Serial.print("Sample Rate: ");
   Serial.print(SAMPLE_RATE);
@@ -82,6 +205,11 @@ void setup() {
 // LOOP PRINCIPAL
 // ============================================
 void loop() {
+  if (Serial.available() && Serial.peek() == SYNC_COMANDO[0]) {
+    recibirTabla();
+    return;
+  }
+  
   if (Serial.available()) {
     String comando = Serial.readStringUntil('\n');
     comando.trim();
@@ -113,6 +241,7 @@ void loop() {
         
         // Iniciar generación
         sample_count = 0;
+        modo_tabla = false;
         generando = true;
         timerStart(timer);
         digitalWrite(LED, HIGH);
@@ -0,0 +1,65 @@
+// ============================================
+// LECTURA ANALÓGICA CON TRAMAS BINARIAS
+// ============================================
+// Muestrea A0 a 5 kHz y envía tramas (ver protocolo_binario.py):
+//   A5 5A | seq u16 | n u16 | n * u16 | crc u16   (little-endian)
+// CRC-16/CCITT (poly 0x1021, inicio 0xFFFF) sobre seq + n + payload.
+
+const uint32_t SAMPLE_RATE = 5000;                  // Hz
+const uint32_t PERIODO_US = 1000000UL / SAMPLE_RATE;
+const uint16_t MUESTRAS_POR_TRAMA = 64;
+
+uint16_t muestras[MUESTRAS_POR_TRAMA];
+uint16_t indice = 0;
+uint16_t seq = 0;
+uint32_t proxima_muestra = 0;
+
+// ============================================
+// CRC-16/CCITT (bit a bit, sin tabla)
+// ============================================
+uint16_t crc16(uint16_t crc, const uint8_t *datos, size_t n) {
+  for (size_t i = 0; i < n; i++) {
+    crc ^= (uint16_t)datos[i] << 8;
+    for (uint8_t b = 0; b < 8; b++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : (crc << 1);
+    }
+  }
+  return crc;
+}
+
+void enviarTrama() {
+  uint8_t cabecera[6] = {
+    0xA5, 0x5A,
+    (uint8_t)(seq & 0xFF), (uint8_t)(seq >> 8),
+    (uint8_t)(MUESTRAS_POR_TRAMA & 0xFF), (uint8_t)(MUESTRAS_POR_TRAMA >> 8)
+  };
+  // AVR y ESP32 son little-endian: el arreglo ya está en el orden del protocolo
+  const uint8_t *payload = (const uint8_t *)muestras;
+  size_t n_bytes = MUESTRAS_POR_TRAMA * sizeof(uint16_t);
+
+  uint16_t crc = crc16(0xFFFF, cabecera + 2, 4);
+  crc = crc16(crc, payload, n_bytes);
+  uint8_t cola[2] = {(uint8_t)(crc & 0xFF), (uint8_t)(crc >> 8)};
+
+  Serial.write(cabecera, sizeof(cabecera));
+  Serial.write(payload, n_bytes);
+  Serial.write(cola, sizeof(cola));
+  seq++;
+}
+
+void setup() {
+  Serial.begin(921600);
+  proxima_muestra = micros();
+}
+
+void loop() {
+  // Muestreo por plazo fijo: enviar una trama no acumula deriva en el reloj
+  if ((int32_t)(micros() - proxima_muestra) >= 0) {
+    proxima_muestra += PERIODO_US;
+    muestras[indice++] = analogRead(A0);
+    if (indice == MUESTRAS_POR_TRAMA) {
+      enviarTrama();
+      indice = 0;
+    }
+  }
+}
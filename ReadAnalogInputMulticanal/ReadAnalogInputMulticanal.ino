@@ -0,0 +1,19 @@
+// Lee varios canales analógicos y envía un cuadro por línea: "a0,a1,a2"
+// (formato de IngestaSerial con canales > 1 / ReadNWriteAMSignal.py --canales)
+const int PINES[] = {A0, A1, A2};   // Fotodetectores y sensores MQ
+const int CANALES = sizeof(PINES) / sizeof(PINES[0]);
+
+void setup() {
+  Serial.begin(115200);      // Iniciar comunicación serial
+}
+
+void loop() {
+  for (int c = 0; c < CANALES; c++) {
+    if (c > 0) {
+      Serial.print(',');
+    }
+    Serial.print(analogRead(PINES[c]));   // 0–1023
+  }
+  Serial.println();
+  delay(1);
+}
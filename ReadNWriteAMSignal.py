@@ -1,15 +1,29 @@
 import pyqtgraph as pg
-from PyQt5.QtWidgets import QApplication, QPushButton, QVBoxLayout, QWidget, QHBoxLayout, QLabel, QTextEdit
+from PyQt5.QtWidgets import (QApplication, QPushButton, QVBoxLayout, QWidget, QHBoxLayout, QLabel,
+                             QScrollArea, QDoubleSpinBox, QSpinBox)
 from PyQt5.QtCore import QTimer
 import numpy as np
-import serial
-from collections import deque
 import sys
 import threading
 import time
-from scipy.signal import butter, sosfiltfilt, hilbert
+import argparse
+from functools import partial
 import os
 
+from buffer_circular import BufferCircular
+from ingesta_serial import IngestaSerial
+from pipeline_multiproceso import Pipeline
+from analisis_am import AnalizadorAM, AnalizadorMulticanal
+from decimacion import PiramideMinMax, minmax_columnas
+from espectro import frecuencias_rfft
+from panel_metricas import PanelMetricas
+from planificador import PlanificadorFrames
+from cascada import VistaCascada
+from grabador import Grabador
+from fuentes import FuenteArchivo, FuenteSintetica
+from arranque import abrir_puertos, LISTO_ESP32, CUALQUIER_DATO
+from sintetizador_tabla import compilar_am, enviar_tabla
+
 # ============================================
 # CONFIGURACIÓN
 # ============================================
@@ -24,17 +38,37 @@ fm = 50      # Frecuencia moduladora (Hz)
 m = 0.5      # Índice de modulación (0-1)
 offset = 1.65  # Offset DC (V)
 amplitud = 1.0 # Amplitud (V)
+MODO_TABLA = True  # Tabla + acumulador de fase en el ESP32; False = START con sin() por muestra
 
 # Parámetros de lectura
 fs = 5000  # 5 kHz de muestreo
 N = 10000  # 2 segundos de datos
-buffer = deque([0]*N, maxlen=N)
+buffer = BufferCircular.para_ventana(N)  # Con --canales > 1 pasa a ser canales x muestras
+
+# Multicanal (--canales): líneas "v0,v1,..." del Arduino. Las gráficas y el
+# panel principales muestran CANAL_PRINCIPAL; el resto se analiza en bloque
+# y cada canal tiene su gráfica, que se crea al pedirla.
+canales = 1
+CANAL_PRINCIPAL = 0
+analizador_canales = None  # AnalizadorMulticanal, solo con canales > 1
 
 # Filtros mejorados para extraer envolvente
 # Usar frecuencia de corte muy baja para extraer solo la moduladora de 50 Hz
 fc_envolvente = 80  # Hz - Pasa-bajos más agresivo
 orden = 6  # Orden más alto para mejor filtrado
-sos_envolvente = butter(orden, fc_envolvente / (fs / 2), btype='low', output='sos')
+
+# Envolvente incremental: solo procesa las muestras nuevas de cada frame
+MODO_ENVOLVENTE = 'causal'  # 'fase_cero' = sin desfase, con latencia fija
+
+# Cadena de análisis (envolvente, Welch, seguidor de tonos, distancia): ver analisis_am.py
+analizador = AnalizadorAM(fs, N, fc, fm, fc_envolvente, orden, modo_envolvente=MODO_ENVOLVENTE)
+modelos_distancia = analizador.modelos_distancia
+
+# Grabación a disco del ADC crudo (se activa con --grabar DIRECTORIO)
+grabador = None
+
+# Fuente de muestras del hilo lector (ver fuentes.py); se crea en el main
+fuente = None
 
 # Variables de control
 datos_recibidos = 0
@@ -46,51 +80,41 @@ generando = False
 ser_esp32 = None
 ser_arduino = None
 
-# ============================================
-# FUNCIONES DE CALCULO DE DISTANCIA
-# ============================================
-def calcular_distancia_logaritmica(voltaje_rms):
-    """Calcula distancia usando fórmula logarítmica: y = -2.802ln(x) - 1.927"""
-    if voltaje_rms <= 0:
-        return float('inf')  # Distancia infinita si no hay voltaje
-    distancia = -2.802 * np.log(voltaje_rms) - 1.927
-    return max(0, distancia)  # No permitir distancias negativas
-
-def calcular_distancia_polinomica(voltaje_rms):
-    """Calcula distancia usando fórmula polinómica: y = 57.077x² - 44.634x + 8.9461"""
-    distancia = 57.077 * (voltaje_rms**2) - 44.634 * voltaje_rms + 8.9461
-    return max(0, distancia)  # No permitir distancias negativas
-
 # ============================================
 # CONEXIÓN A PUERTOS SERIALES
 # ============================================
-def conectar_puertos():
+def conectar_puertos(abrir_arduino=True):
+    """Abre el ESP32 y (salvo en modo pipeline) el Arduino, los dos a la vez"""
     global ser_esp32, ser_arduino
     
     print("Conectando a dispositivos...\n")
     
-    # Conectar ESP32
-    try:
-        ser_esp32 = serial.Serial(PUERTO_ESP32, BAUD_RATE, timeout=1)
-        time.sleep(2)  # Esperar reset
-        ser_esp32.reset_input_buffer()
-        print(f"✓ ESP32 conectado en {PUERTO_ESP32}")
-    except Exception as e:
-        print(f"❌ Error al conectar ESP32: {e}")
-        return False
+    # Cada placa se da por lista al dar señales de vida (ver arranque.py)
+    especificaciones = {'ESP32': dict(puerto=PUERTO_ESP32, baud=BAUD_RATE, senal_listo=LISTO_ESP32)}
+    # En modo pipeline el Arduino lo abre el proceso de adquisición
+    if abrir_arduino:
+        especificaciones['Arduino'] = dict(puerto=PUERTO_ARDUINO, baud=BAUD_RATE,
+                                           senal_listo=CUALQUIER_DATO)
     
-    # Conectar Arduino
-    try:
-        ser_arduino = serial.Serial(PUERTO_ARDUINO, BAUD_RATE, timeout=1)
-        time.sleep(2)  # Esperar reset
-        ser_arduino.reset_input_buffer()
-        print(f"✓ Arduino conectado en {PUERTO_ARDUINO}")
-    except Exception as e:
-        print(f"❌ Error al conectar Arduino: {e}")
-        ser_esp32.close()
+    abiertos = {}
+    for nombre, futuro in abrir_puertos(especificaciones).items():
+        try:
+            abiertos[nombre] = futuro.result()
+            print(f"✓ {nombre} conectado en {especificaciones[nombre]['puerto']}")
+        except Exception as e:
+            print(f"❌ Error al conectar {nombre}: {e}")
+    
+    if len(abiertos) < len(especificaciones):
+        for ser in abiertos.values():
+            ser.close()
         return False
     
-    print("\n✓ Todos los dispositivos conectados\n")
+    ser_esp32 = abiertos['ESP32']
+    ser_arduino = abiertos.get('Arduino')
+    if not abrir_arduino:
+        print("\n✓ ESP32 conectado (Arduino en proceso de adquisición)\n")
+    else:
+        print("\n✓ Todos los dispositivos conectados\n")
     return True
 
 # ============================================
@@ -100,8 +124,15 @@ def iniciar_generacion():
     global generando
     
     if ser_esp32 and not generando:
-        comando = f"START,{fc},{fm},{m},{offset},{amplitud}\n"
-        ser_esp32.write(comando.encode())
+        if MODO_TABLA:
+            # Tabla compilada en el host (ver sintetizador_tabla.py)
+            ok, respuesta = enviar_tabla(ser_esp32, compilar_am(fc, fm, m, offset, amplitud))
+            if not ok:
+                print(f"❌ ESP32: {respuesta}")
+                return False
+        else:
+            comando = f"START,{fc},{fm},{m},{offset},{amplitud}\n"
+            ser_esp32.write(comando.encode())
         generando = True
         print(f"✓ Señal AM iniciada: fc={fc}Hz, fm={fm}Hz, m={m}")
         return True
@@ -118,80 +149,81 @@ def detener_generacion():
     return False
 
 # ============================================
-# HILO DE LECTURA SERIAL (ARDUINO)
+# HILO DE LECTURA (ARDUINO, ARCHIVO O SINTÉTICA)
 # ============================================
-def leer_serial():
+def fabrica_fuente(tipo, archivo=None, velocidad=1.0, canales=1):
+    """Constructor fuente(buffer, grabador=...) para el hilo o el pipeline; None = Arduino"""
+    if tipo == 'sintetica':
+        # Con varios canales, un m distinto por canal para distinguirlos
+        m_canales = m if canales == 1 else [m * (c + 1) / canales for c in range(canales)]
+        return partial(FuenteSintetica, fs=fs, fc=fc, fm=fm, m=m_canales, offset=offset,
+                       amplitud=amplitud, velocidad=velocidad, canales=canales)
+    if tipo == 'archivo':
+        return partial(FuenteArchivo, ruta=archivo, fs=fs, velocidad=velocidad)
+    return None
+
+def leer_fuente():
     global datos_recibidos, errores_lectura, running
     
     print("✓ Hilo de lectura iniciado")
     
     while running:
         try:
-            if ser_arduino and ser_arduino.in_waiting > 0:
-                linea = ser_arduino.readline().decode('utf-8').strip()
-                
-                if linea and linea.isdigit():
-                    valor_adc = int(linea)
-                    
-                    if 0 <= valor_adc <= 1023:
-                        voltaje = (valor_adc / 1023.0) * 5.0
-                        buffer.append(voltaje)
-                        datos_recibidos += 1
-                    else:
-                        errores_lectura += 1
-                else:
-                    if linea:
-                        errores_lectura += 1
-                        
+            if fuente.leer() == 0:
+                if fuente.terminada:
+                    print("✓ Fuente terminada")
+                    break
+                time.sleep(0.001)  # Nada pendiente: ceder CPU
         except Exception as e:
-            errores_lectura += 1
+            fuente.errores_lectura += 1
             time.sleep(0.001)
+        
+        datos_recibidos = fuente.datos_recibidos
+        errores_lectura = fuente.errores_lectura
+    
+    datos_recibidos = fuente.datos_recibidos
+    errores_lectura = fuente.errores_lectura
 
 # ============================================
-# FUNCIONES DE PROCESAMIENTO MEJORADAS
+# ANÁLISIS DE UNA VENTANA (GUI o proceso DSP)
 # ============================================
-def extraer_envolvente_hilbert(datos):
-    """Extrae la envolvente usando Transformada de Hilbert"""
-    try:
-        # Método Hilbert - más preciso para señales AM
-        analitica = hilbert(datos)
-        envolvente = np.abs(analitica)
-        
-        # Aplicar filtro pasa-bajos adicional para suavizar
-        envolvente_filtrada = sosfiltfilt(sos_envolvente, envolvente)
-        
-        return envolvente_filtrada
-    except:
-        return datos
+# Campos que el proceso DSP publica en memoria compartida (modo pipeline)
+CAMPOS_PIPELINE = analizador.campos()
+
+def analizar_ventana(datos, n_nuevos=None, con_fft=True, fs=None):
+    """Procesa una ventana de N muestras y devuelve un dict de resultados.
+
+    fs = fs efectiva medida: si se alejó de la actual se rediseñan filtros y ejes.
+    """
+    analizador.ajustar_fs(fs)
+    return analizador.analizar(datos, n_nuevos, con_fft)
 
-def calcular_rms(datos):
-    return np.sqrt(np.mean(datos**2))
+def ajustar_analisis(fc_envolvente=None, orden=None):
+    """Resintoniza el pasa-bajos de la envolvente sin reiniciar el análisis.
 
-def encontrar_picos_fft(fft_vals, num_picos=3):
-    fft_vals_copia = fft_vals.copy()
-    fft_vals_copia[0:5] = 0
-    
-    picos_idx = []
-    fft_temp = fft_vals_copia.copy()
-    
-    for _ in range(num_picos):
-        idx = np.argmax(fft_temp)
-        if fft_temp[idx] > 0:
-            picos_idx.append(idx)
-            inicio = max(0, idx - 25)
-            fin = min(len(fft_temp), idx + 25)
-            fft_temp[inicio:fin] = 0
-    
-    return sorted(picos_idx)
+    Corre donde vive el DSP: el hilo de la GUI o el proceso DSP del pipeline.
+    """
+    for analizador_activo in (analizador, analizador_canales):
+        if analizador_activo is not None:
+            analizador_activo.resintonizar_envolvente(fc_envolvente, orden)
 
 # ============================================
 # INTERFAZ GRÁFICA OPTIMIZADA
 # ============================================
 class VentanaPrincipal(QWidget):
-    def __init__(self):
+    def __init__(self, pipeline=None):
         super().__init__()
+        self.pipeline = pipeline  # None = DSP en el hilo de la GUI
         self.frames_procesados = 0
-        self.ultimo_fft_time = time.time()
+        self.total_leido = None  # total_escrito del buffer en el frame anterior
+        # Intervalo del timer y periodo del espectro adaptados al costo medido
+        self.planificador = PlanificadorFrames(intervalo_inicial=0.1)
+        self.medicion_anterior = (None, 0)  # (perf_counter, datos_recibidos) para la tasa
+        self.latencia = None  # Edad de la muestra más nueva al terminar el análisis (s)
+        # Diezmado min/max incremental de las trazas (solo en modo hilo)
+        self.piramide_am = PiramideMinMax(N)
+        self.piramide_envolvente = PiramideMinMax(N)
+        self.graficas_canal = {}  # canal -> gráfica propia (se crea al pedirla)
         self.init_ui()
     
     def init_ui(self):
@@ -223,13 +255,38 @@ class VentanaPrincipal(QWidget):
         panel_control.addWidget(self.label_estado)
         panel_control.addStretch()
         
+        # Pasa-bajos de la envolvente, ajustable en marcha
+        self.spin_fc_envolvente = QDoubleSpinBox()
+        self.spin_fc_envolvente.setRange(5.0, fc - fm)
+        self.spin_fc_envolvente.setSingleStep(5.0)
+        self.spin_fc_envolvente.setSuffix(" Hz")
+        self.spin_fc_envolvente.setValue(fc_envolvente)
+        self.spin_fc_envolvente.setKeyboardTracking(False)  # Un cambio al confirmar, no por tecla
+        self.spin_orden = QSpinBox()
+        self.spin_orden.setRange(1, 10)
+        self.spin_orden.setValue(orden)
+        self.spin_fc_envolvente.valueChanged.connect(self.on_filtro)
+        self.spin_orden.valueChanged.connect(self.on_filtro)
+        panel_control.addWidget(QLabel("Envolvente fc:"))
+        panel_control.addWidget(self.spin_fc_envolvente)
+        panel_control.addWidget(QLabel("orden:"))
+        panel_control.addWidget(self.spin_orden)
+        
+        # Un botón por canal: muestra u oculta su gráfica
+        if canales > 1:
+            for c in range(canales):
+                boton = QPushButton(f"Canal {c}")
+                boton.setCheckable(True)
+                boton.toggled.connect(partial(self.alternar_canal, c))
+                panel_control.addWidget(boton)
+        
         layout_graficas.addLayout(panel_control)
         
         # Gráficas
         self.graphics_widget = pg.GraphicsLayoutWidget()
         
         # === Señal AM original ===
-        self.plot_am = self.graphics_widget.addPlot(title="Señal AM Recibida (1000 Hz portadora)")
+        self.plot_am = self.graphics_widget.addPlot(title="Señal AM Recibida (1000 Hz portadora)", colspan=2)
         self.plot_am.setLabel('left', 'Voltaje', units='V')
         self.plot_am.setLabel('bottom', 'Muestras')
         self.plot_am.showGrid(x=True, y=True, alpha=0.3)
@@ -237,7 +294,7 @@ class VentanaPrincipal(QWidget):
         
         # === Envolvente ===
         self.graphics_widget.nextRow()
-        self.plot_envolvente = self.graphics_widget.addPlot(title="Envolvente Extraída (Hilbert + Filtro)")
+        self.plot_envolvente = self.graphics_widget.addPlot(title="Envolvente Extraída (Hilbert + Filtro)", colspan=2)
         self.plot_envolvente.setLabel('left', 'Voltaje', units='V')
         self.plot_envolvente.setLabel('bottom', 'Muestras')
         self.plot_envolvente.showGrid(x=True, y=True, alpha=0.3)
@@ -266,10 +323,22 @@ class VentanaPrincipal(QWidget):
             line.setVisible(False)
             self.marcadores_fft.append(line)
         
-        self.frecuencias = np.fft.fftfreq(N, 1/fs)[:N//2]
+        self.frecuencias = analizador.espectro_welch.frecuencias
+        
+        # === Cascada: historia de espectros junto a la FFT ===
+        self.plot_cascada = self.graphics_widget.addPlot(title="Cascada (espectrograma)")
+        self.plot_cascada.setLabel('left', 'Tiempo', units='s')
+        self.plot_cascada.setLabel('bottom', 'Frecuencia', units='Hz')
+        welch = analizador.espectro_welch
+        self.cascada = VistaCascada(self.plot_cascada, self.frecuencias, 1500, welch.salto / welch.fs)
         
         layout_graficas.addWidget(self.graphics_widget)
         
+        # Gráficas por canal (vacío y oculto hasta que se pide un canal)
+        self.widget_canales = pg.GraphicsLayoutWidget()
+        self.widget_canales.setVisible(False)
+        layout_graficas.addWidget(self.widget_canales)
+        
         # ===== COLUMNA DERECHA: PANEL DE INFORMACIÓN =====
         panel_info_widget = QWidget()
         panel_info_widget.setMaximumWidth(350)
@@ -288,21 +357,13 @@ class VentanaPrincipal(QWidget):
         """)
         layout_info.addWidget(titulo_info)
         
-        # Área de texto para información
-        self.info_text = QTextEdit()
-        self.info_text.setReadOnly(True)
-        self.info_text.setStyleSheet("""
-            QTextEdit {
-                background-color: #1a1a1a;
-                color: #00ff00;
-                font-family: 'Courier New', monospace;
-                font-size: 11pt;
-                padding: 10px;
-                border: 2px solid #2c3e50;
-                border-radius: 5px;
-            }
-        """)
-        layout_info.addWidget(self.info_text)
+        # Panel de métricas: etiquetas persistentes, solo cambia el texto de cada valor
+        self.panel = self.crear_panel()
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setWidget(self.panel)
+        scroll.setStyleSheet("border: 2px solid #2c3e50; border-radius: 5px;")
+        layout_info.addWidget(scroll)
         
         panel_info_widget.setLayout(layout_info)
         
@@ -315,7 +376,57 @@ class VentanaPrincipal(QWidget):
         # Timer de actualización - REDUCIR FRECUENCIA
         self.timer = QTimer()
         self.timer.timeout.connect(self.actualizar)
-        self.timer.start(100)  # 10 FPS (antes 50ms = 20 FPS)
+        self.timer.start(self.planificador.intervalo_ms)  # Luego lo ajusta el planificador
+    
+    def crear_panel(self):
+        panel = PanelMetricas()
+        panel.agregar('estado', 'Estado:', '{}', 'yellow')
+        
+        panel.seccion('MEDICIONES RMS', 'cyan')
+        panel.agregar('rms_am', 'RMS Total:', '{:.4f} V', 'cyan', 13)
+        panel.agregar('rms_envolvente', 'RMS Envolvente:', '{:.4f} V', 'lime', 13)
+        
+        panel.seccion('DISTANCIA ESTIMADA', '#FF5722')
+        panel.agregar('distancia_log', 'Logarítmica:', '{:.2f} cm', '#FF5722', 13)
+        panel.nota(f"Fórmula: {modelos_distancia['logaritmica'].descripcion()}", '#FF5722')
+        panel.agregar('distancia_poli', 'Polinómica:', '{:.2f} cm', '#FF5722', 13)
+        panel.nota(f"Fórmula: {modelos_distancia['polinomica'].descripcion()}", '#FF5722')
+        panel.agregar('rango_distancia', 'Rango ventana:', '{0[0]:.2f} - {0[1]:.2f} cm', '#FF5722')
+        
+        panel.seccion('FRECUENCIAS PRINCIPALES', 'yellow')
+        colores = ['yellow', 'orange', 'red']
+        nombres = ['Portadora', 'Banda Lat. Inferior', 'Banda Lat. Superior']
+        for i in range(3):
+            panel.agregar(f'freq_{i}', f'● {nombres[i]}:', '{:.2f} Hz', colores[i], 12)
+            panel.agregar(f'mag_{i}', '   Magnitud:', '{:.1f} dB', colores[i])
+        
+        panel.seccion('ÍNDICE DE MODULACIÓN', 'orange')
+        panel.agregar('m_estimado', 'm estimado (FFT):', '{:.3f}', 'orange', 13)
+        panel.agregar('m_tonos', 'm seguidor tonos:', '{:.3f}', 'orange', 13)
+        panel.agregar('m_teorico', 'm teórico:', '{:.3f}', 'orange', 13)
+        
+        if canales > 1:
+            panel.seccion('CANALES (envolvente | distancia)', '#00bcd4')
+            for c in range(canales):
+                panel.agregar(f'canal_{c}', f'Canal {c}:', '{0[0]:.3f} V | {0[1]:.1f} cm', '#00bcd4')
+        
+        panel.seccion('ESTADÍSTICAS', 'gray')
+        panel.agregar('datos', 'Datos recibidos:', '{:d}', 'gray', 10)
+        panel.agregar('errores', 'Errores:', '{:d}', 'gray', 10)
+        panel.agregar('tasa', 'Tasa:', '{:.0f} muestras/s', 'gray', 10)
+        panel.agregar('latencia', 'Latencia:', '{:.1f} ms', 'gray', 10)
+        panel.agregar('fs', 'fs efectiva:', '{:.1f} Hz', 'gray', 10)
+        panel.agregar('huecos', 'Huecos:', '{0[0]:d} ({0[1]:d} muestras)', 'gray', 10)
+        panel.agregar('frames', 'Frames:', '{:d}', 'gray', 10)
+        panel.agregar('fps', 'FPS reales:', '{:.1f}', 'gray', 10)
+        panel.agregar('intervalo', 'Intervalo timer:', '{:d} ms', 'gray', 10)
+        panel.agregar('perdidos', 'Frames perdidos:', '{:d}', 'gray', 10)
+        panel.agregar('saltados', 'Sin datos nuevos:', '{:d}', 'gray', 10)
+        panel.agregar('tiempos', 'Etapas:', '{}', 'gray', 9)
+        panel.terminar()
+        
+        panel.actualizar({'estado': 'Esperando datos', 'm_teorico': m}, forzar=True)
+        return panel
     
     def on_iniciar(self):
         if iniciar_generacion():
@@ -331,147 +442,294 @@ class VentanaPrincipal(QWidget):
             self.label_estado.setText("Estado: ⬛ Detenido")
             self.label_estado.setStyleSheet("font-size: 14pt; font-weight: bold; color: #e74c3c;")
     
+    def on_filtro(self):
+        parametros = {'fc_envolvente': self.spin_fc_envolvente.value(),
+                      'orden': self.spin_orden.value()}
+        if self.pipeline:
+            self.pipeline.ajustar(**parametros)
+        else:
+            ajustar_analisis(**parametros)
+    
+    def contadores(self):
+        """(datos recibidos, errores) del hilo lector o del proceso de adquisición"""
+        if self.pipeline is not None:
+            return self.pipeline.datos_recibidos, self.pipeline.errores_lectura
+        return datos_recibidos, errores_lectura
+    
+    def huecos(self):
+        """(huecos, muestras perdidas) según el reloj de la fuente; None si no lo tiene"""
+        if self.pipeline is not None:
+            return self.pipeline.huecos
+        if fuente.reloj is None:
+            return None
+        return fuente.reloj.huecos, fuente.reloj.perdidas
+    
+    def medir_tasa(self, datos_recibidos):
+        """Muestras por segundo desde la medición anterior (cualquier fuente o modo)"""
+        ahora = time.perf_counter()
+        t_anterior, datos_anteriores = self.medicion_anterior
+        self.medicion_anterior = (ahora, datos_recibidos)
+        if t_anterior is None or ahora <= t_anterior:
+            return 0.0
+        return (datos_recibidos - datos_anteriores) / (ahora - t_anterior)
+    
+    def terminar_frame(self):
+        """Cierra el frame en el planificador y aplica el nuevo intervalo si cambió"""
+        intervalo = self.planificador.fin_frame()
+        if intervalo is not None:
+            self.timer.setInterval(intervalo)
+    
     def actualizar(self):
-        datos_np = np.array(buffer)
-        
-        if len(datos_np) < orden * 6:
-            self.info_text.setHtml(f"""
-                <div style='color: yellow; font-size: 12pt;'>
-                <b>⏳ LLENANDO BUFFER...</b><br><br>
-                Progreso: {len(datos_np)}/{N}<br>
-                {int((len(datos_np)/N)*100)}% completado
-                </div>
-            """)
+        if self.pipeline is not None:
+            resultados = self.pipeline.leer_resultados()
+            # El proceso DSP aún no publica un resultado nuevo: frame saltado
+            if not self.planificador.inicio_frame(resultados is not None):
+                return
+            self.frames_procesados += 1
+            self.mostrar_resultados(resultados, self.planificador.toca('espectro'))
+            self.terminar_frame()
             return
         
-        self.frames_procesados += 1
-        
-        # Remover DC y procesar
-        datos_centrados = datos_np - np.mean(datos_np)
-        
-        # Extraer envolvente con método Hilbert (más preciso)
-        envolvente = extraer_envolvente_hilbert(datos_centrados)
-        
-        rms_am = calcular_rms(datos_centrados)
-        rms_envolvente = calcular_rms(envolvente)
+        total = buffer.total_escrito
+        todos = buffer.ultimos(N, hasta=total)
+        datos_np = todos if todos.ndim == 1 else todos[CANAL_PRINCIPAL]
         
-        # CALCULAR DISTANCIAS
-        distancia_log = calcular_distancia_logaritmica(rms_envolvente)
-        distancia_poli = calcular_distancia_polinomica(rms_envolvente)
-        
-        # Actualizar señal AM (diezmar para mejor rendimiento)
-        step = 5 if len(datos_centrados) > 5000 else 1
-        self.curve_am.setData(datos_centrados[::step])
+        if len(datos_np) < orden * 6:
+            progreso = int((len(datos_np) / N) * 100)
+            self.panel.actualizar({'estado': f"⏳ Llenando buffer {len(datos_np)}/{N} ({progreso}%)"})
+            return
         
-        # Actualizar envolvente
-        self.curve_envolvente.setData(envolvente[::step])
+        # Sin muestras nuevas no hay nada que recalcular ni redibujar
+        if not self.planificador.inicio_frame(total != self.total_leido):
+            return
         
-        # FFT - OPTIMIZADO: calcular cada 10 frames en lugar de 5
-        tiempo_actual = time.time()
-        if self.frames_procesados % 10 == 0 or (tiempo_actual - self.ultimo_fft_time) > 0.5:
-            self.ultimo_fft_time = tiempo_actual
-            
-            # Diezmar señal para FFT más rápido
-            datos_diezmados = datos_centrados[::2]  # Reducir a la mitad
+        self.frames_procesados += 1
+        n_nuevos = None if self.total_leido is None else total - self.total_leido
+        self.total_leido = total
+        con_fft = self.planificador.toca('espectro')
+        # fs efectiva según el reloj del host (solo el puerto serial la estima)
+        reloj = fuente.reloj
+        fs_medida = reloj.fs if reloj is not None and reloj.listo else None
+        with self.planificador.etapa('dsp'):
+            resultados = analizar_ventana(datos_np, n_nuevos, con_fft, fs_medida)
+        if analizador_canales is not None:
+            analizador_canales.ajustar_fs(fs_medida)
+            # Todos los canales en bloque (envolvente, RMS y FFT vectorizados)
+            with self.planificador.etapa('canales'):
+                self.mostrar_canales(analizador_canales.analizar(todos, n_nuevos, con_fft))
+        if fuente.t_ultimo_bloque is not None:
+            self.latencia = time.perf_counter() - fuente.t_ultimo_bloque
+        self.mostrar_resultados(resultados, con_fft, datos_np, n_nuevos)
+        self.terminar_frame()
+    
+    def dibujar_traza(self, plot, curva, datos, piramide=None, n_nuevos=None, desplazamiento=0.0):
+        """Min/max por columna de píxeles; la pirámide solo recibe las muestras nuevas"""
+        ancho = max(1, int(plot.getViewBox().width()))
+        xy = None
+        if piramide is not None:
+            if n_nuevos is None or n_nuevos >= len(datos):
+                piramide.reiniciar()
+                piramide.agregar(datos)
+            elif n_nuevos:
+                piramide.agregar(datos[len(datos) - n_nuevos:])
+            xy = piramide.columnas(len(datos), ancho, desplazamiento)
+        if xy is None:
+            xy = minmax_columnas(datos, ancho, desplazamiento)
+        curva.setData(*xy)
+    
+    def alternar_canal(self, canal, visible):
+        """Muestra u oculta la gráfica de un canal; la crea la primera vez"""
+        grafica = self.graficas_canal.get(canal)
+        if grafica is None:
+            if not visible:
+                return
+            plot = self.widget_canales.addPlot(row=canal, col=0, title=f"Canal {canal}")
+            plot.setLabel('left', 'Voltaje', units='V')
+            plot.showGrid(x=True, y=True, alpha=0.3)
+            grafica = {
+                'plot': plot,
+                'am': plot.plot(pen=pg.mkPen('c', width=1)),
+                'envolvente': plot.plot(pen=pg.mkPen('g', width=2)),
+                'titulo': None,
+                'm': np.nan,
+            }
+            self.graficas_canal[canal] = grafica
+        grafica['plot'].setVisible(visible)
+        self.widget_canales.setVisible(any(g['plot'].isVisible() for g in self.graficas_canal.values()))
+    
+    def mostrar_canales(self, resultados):
+        """Métricas de todos los canales y trazas de los que tienen gráfica visible"""
+        valores = {}
+        for c in range(canales):
+            m_canal = resultados['m_estimado'][c] if 'm_estimado' in resultados else np.nan
+            valores[f'canal_{c}'] = (resultados['rms_envolvente'][c], resultados['distancia_log'][c])
+            grafica = self.graficas_canal.get(c)
+            if grafica is None or not grafica['plot'].isVisible():
+                continue
+            if not np.isnan(m_canal):
+                grafica['m'] = m_canal
+            ancho = max(1, int(grafica['plot'].getViewBox().width()))
+            grafica['am'].setData(*minmax_columnas(resultados['datos_centrados'][c], ancho))
+            grafica['envolvente'].setData(*minmax_columnas(resultados['envolvente'][c], ancho))
+            titulo = (f"Canal {c} | RMS {resultados['rms_am'][c]:.3f} V | "
+                      f"Envolvente {resultados['rms_envolvente'][c]:.3f} V | m {grafica['m']:.2f}")
+            if titulo != grafica['titulo']:
+                grafica['plot'].setTitle(titulo)
+                grafica['titulo'] = titulo
+        self.panel.actualizar(valores)
+    
+    def mostrar_resultados(self, resultados, con_fft, datos=None, n_nuevos=None):
+        # Señal AM y envolvente diezmadas a min/max por píxel (sin aliasing de la portadora)
+        with self.planificador.etapa('trazas'):
+            self.dibujar_trazas(resultados, datos, n_nuevos)
+        
+        # Cascada: una fila por salto de Welch (solo si hay espectros nuevos)
+        if 'segmentos' in resultados:
+            with self.planificador.etapa('cascada'):
+                self.cascada.actualizar(resultados['espectro_reciente'], resultados['segmentos'])
+        
+        # FFT y panel: solo cuando el planificador indica que toca el espectro
+        if con_fft and 'fft_vals' in resultados:
+            with self.planificador.etapa('espectro', lenta=True):
+                self.mostrar_espectro(resultados)
+    
+    def dibujar_trazas(self, resultados, datos, n_nuevos):
+        datos_centrados = resultados['datos_centrados']
+        envolvente = resultados['envolvente']
+        if datos is not None:
+            # Modo hilo: pirámide sobre las muestras crudas, el DC se resta al dibujar
+            self.dibujar_traza(self.plot_am, self.curve_am, datos, self.piramide_am,
+                               n_nuevos, desplazamiento=np.mean(datos))
+            self.dibujar_traza(self.plot_envolvente, self.curve_envolvente, envolvente,
+                               self.piramide_envolvente, n_nuevos)
+        else:
+            self.dibujar_traza(self.plot_am, self.curve_am, datos_centrados)
+            self.dibujar_traza(self.plot_envolvente, self.curve_envolvente, envolvente)
+    
+    def mostrar_espectro(self, resultados):
+        rms_am = resultados['rms_am']
+        rms_envolvente = resultados['rms_envolvente']
+        distancia_log = resultados['distancia_log']
+        distancia_poli = resultados['distancia_poli']
+        distancia_traza = resultados['distancia_traza']
+        fft_vals = resultados['fft_vals']
+        picos_freq = resultados['picos_freq']
+        picos_amp = resultados['picos_amp']
+        m_estimado = resultados['m_estimado']
+        # Eje de la fs con la que se analizó (sigue a la fs medida; en caché)
+        frecuencias = frecuencias_rfft(analizador.espectro_welch.n_segmento, float(resultados['fs']))
+        datos_recibidos, errores_lectura = self.contadores()
+        tasa = self.medir_tasa(datos_recibidos)
+        latencia = None if self.latencia is None else self.latencia * 1000
+        
+        # Normalizar y convertir a dB
+        max_fft = np.max(fft_vals)
+        if max_fft > 0:
+            fft_db = 20 * np.log10(fft_vals / max_fft + 1e-12)
+            fft_db = np.clip(fft_db, -60, 5)
+            self.curve_fft.setData(frecuencias, fft_db)
             
-            # Aplicar ventana
-            windowed = datos_diezmados * np.hanning(len(datos_diezmados))
+            valores = {
+                'estado': '✓ Analizando',
+                'rms_am': rms_am,
+                'rms_envolvente': rms_envolvente,
+                'distancia_log': distancia_log,
+                'distancia_poli': distancia_poli,
+                'rango_distancia': (np.min(distancia_traza), np.max(distancia_traza)),
+                'm_estimado': m_estimado,
+                'm_tonos': resultados['m_tonos'],
+                'datos': int(datos_recibidos),
+                'errores': int(errores_lectura),
+                'tasa': tasa,
+                'latencia': latencia,
+                'fs': resultados['fs'],
+                'huecos': self.huecos(),
+                'frames': self.frames_procesados,
+                'fps': self.planificador.fps,
+                'intervalo': self.planificador.intervalo_ms,
+                'perdidos': self.planificador.perdidos,
+                'saltados': self.planificador.saltados,
+                'tiempos': self.planificador.resumen_tiempos(),
+            }
             
-            # Calcular FFT
-            fft_vals = np.abs(np.fft.fft(windowed))[:len(datos_diezmados)//2]
-            frecuencias_diezmadas = np.fft.fftfreq(len(datos_diezmados), 1/fs)[:len(datos_diezmados)//2]
+            for i in range(3):
+                if np.isnan(picos_freq[i]):
+                    self.marcadores_fft[i].setVisible(False)
+                    valores[f'freq_{i}'] = valores[f'mag_{i}'] = np.nan
+                    continue
+                self.marcadores_fft[i].setValue(picos_freq[i])
+                self.marcadores_fft[i].setVisible(True)
+                valores[f'freq_{i}'] = picos_freq[i]
+                valores[f'mag_{i}'] = 20 * np.log10(picos_amp[i] / max_fft + 1e-12)
             
-            # Normalizar y convertir a dB
-            max_fft = np.max(fft_vals)
-            if max_fft > 0:
-                fft_db = 20 * np.log10(fft_vals / max_fft + 1e-12)
-                fft_db = np.clip(fft_db, -60, 5)
-                self.curve_fft.setData(frecuencias_diezmadas, fft_db)
-                
-                # Encontrar picos
-                picos_idx = encontrar_picos_fft(fft_vals, num_picos=3)
-                
-                # Actualizar panel de información
-                info_html = f"""
-                <div style='color: #00ff00;'>
-                <h2 style='color: cyan; border-bottom: 2px solid cyan;'>MEDICIONES RMS</h2>
-                <p style='font-size: 13pt;'>
-                <b style='color: cyan;'>RMS Total:</b> {rms_am:.4f} V<br>
-                <b style='color: lime;'>RMS Envolvente:</b> {rms_envolvente:.4f} V<br>
-                </p>
-                
-                <h2 style='color: #FF5722; border-bottom: 2px solid #FF5722; margin-top: 20px;'>DISTANCIA ESTIMADA</h2>
-                <p style='font-size: 13pt; color: #FF5722;'>
-                <b>Voltaje RMS envolvente:</b> {rms_envolvente:.4f} V<br>
-                <b>Distancia (logarítmica):</b> {distancia_log:.2f} cm<br>
-                &nbsp;&nbsp;<i>Fórmula: y = -2.802·ln(x) - 1.927</i><br>
-                <b>Distancia (polinómica):</b> {distancia_poli:.2f} cm<br>
-                &nbsp;&nbsp;<i>Fórmula: y = 57.077x² - 44.634x + 8.9461</i>
-                </p>
-                
-                <h2 style='color: yellow; border-bottom: 2px solid yellow; margin-top: 20px;'>FRECUENCIAS PRINCIPALES</h2>
-                """
-                
-                colores_html = ['yellow', 'orange', 'red']
-                nombres = ['Portadora', 'Banda Lateral 1', 'Banda Lateral 2']
-                
-                for i, idx in enumerate(picos_idx):
-                    freq = frecuencias_diezmadas[idx]
-                    mag = fft_db[idx]
-                    self.marcadores_fft[i].setValue(freq)
-                    self.marcadores_fft[i].setVisible(True)
-                    
-                    info_html += f"""
-                    <p style='font-size: 12pt; color: {colores_html[i]};'>
-                    <b>● {nombres[i]}:</b><br>
-                    &nbsp;&nbsp;&nbsp;Frecuencia: <b>{freq:.1f} Hz</b><br>
-                    &nbsp;&nbsp;&nbsp;Magnitud: <b>{mag:.1f} dB</b>
-                    </p>
-                    """
-                
-                # Calcular índice de modulación estimado
-                if len(picos_idx) >= 3:
-                    portadora_mag = fft_vals[picos_idx[0]]
-                    lateral_mag = (fft_vals[picos_idx[1]] + fft_vals[picos_idx[2]]) / 2
-                    m_estimado = (2 * lateral_mag) / portadora_mag if portadora_mag > 0 else 0
-                    
-                    info_html += f"""
-                    <h2 style='color: orange; border-bottom: 2px solid orange; margin-top: 20px;'>ÍNDICE DE MODULACIÓN</h2>
-                    <p style='font-size: 13pt; color: orange;'>
-                    <b>m estimado:</b> {m_estimado:.3f} ({m_estimado*100:.1f}%)<br>
-                    <b>m teórico:</b> {m:.3f} ({m*100:.1f}%)
-                    </p>
-                    """
-                
-                info_html += f"""
-                <h2 style='color: gray; border-bottom: 2px solid gray; margin-top: 20px;'>ESTADÍSTICAS</h2>
-                <p style='font-size: 10pt; color: gray;'>
-                Datos recibidos: {datos_recibidos}<br>
-                Errores: {errores_lectura}<br>
-                FPS: {1000/100:.0f} Hz<br>
-                Frames: {self.frames_procesados}
-                </p>
-                </div>
-                """
-                
-                self.info_text.setHtml(info_html)
+            # Solo cambian los QLabel cuyo texto cambió
+            self.panel.actualizar(valores)
 
 # ============================================
 # MAIN
 # ============================================
 if __name__ == "__main__":
-    # Conectar puertos
-    if not conectar_puertos():
+    parser = argparse.ArgumentParser(description="Generador y analizador de señal AM")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Adquisición y DSP en procesos separados (memoria compartida)")
+    parser.add_argument('--grabar', metavar='DIRECTORIO', default=None,
+                        help="Guarda las muestras crudas (ver grabador.py)")
+    parser.add_argument('--fuente', choices=('serial', 'archivo', 'sintetica'), default='serial')
+    parser.add_argument('--archivo', default=None,
+                        help="Grabación (directorio) o .npy de valores ADC para --fuente archivo")
+    parser.add_argument('--velocidad', type=float, default=1.0,
+                        help="Veces tiempo real para archivo/sintética (0 = lo más rápido posible)")
+    parser.add_argument('--canales', type=int, default=1,
+                        help="Canales por cuadro (líneas \"v0,v1,...\" del Arduino)")
+    args, argv_qt = parser.parse_known_args()
+    if args.fuente == 'archivo' and not args.archivo:
+        parser.error("--fuente archivo necesita --archivo")
+    if args.canales > 1 and (args.pipeline or args.grabar or args.fuente == 'archivo'):
+        parser.error("--canales > 1 solo funciona en modo hilo, sin --grabar ni --fuente archivo")
+    
+    canales = args.canales
+    if canales > 1:
+        buffer = BufferCircular.para_ventana(N, canales=canales)
+        analizador_canales = AnalizadorMulticanal(fs, N, canales, fc, fm, fc_envolvente, orden,
+                                                  modo_envolvente=MODO_ENVOLVENTE)
+    
+    pipeline = None
+    directorio_grabacion = args.grabar
+    crear_fuente = fabrica_fuente(args.fuente, args.archivo, args.velocidad or None, canales)
+    
+    if args.pipeline:
+        # Primero el pipeline: el Arduino se reinicia en el proceso de
+        # adquisición mientras aquí se conecta el ESP32
+        pipeline = Pipeline(PUERTO_ARDUINO, BAUD_RATE, N, CAMPOS_PIPELINE, analizar_ventana,
+                            directorio_grabacion=directorio_grabacion, fs=fs,
+                            crear_fuente=crear_fuente, funcion_ajuste=ajustar_analisis)
+        pipeline.iniciar()
+        print("✓ Pipeline iniciado: adquisición y DSP en procesos separados")
+    
+    # Conectar puertos (sin hardware no se abre ninguno: los botones no hacen nada)
+    if crear_fuente is None and not conectar_puertos(abrir_arduino=not args.pipeline):
         print("\n❌ No se pudieron conectar los dispositivos")
+        if pipeline:
+            pipeline.detener()
         sys.exit(1)
     
-    # Iniciar hilo de lectura
-    hilo_lectura = threading.Thread(target=leer_serial, daemon=True)
-    hilo_lectura.start()
+    if not args.pipeline:
+        if directorio_grabacion:
+            grabador = Grabador(directorio_grabacion, fs=fs)
+            print(f"✓ Grabando en {directorio_grabacion}")
+        if crear_fuente is None:
+            # Lee todo lo pendiente en el puerto y lo parsea en bloque
+            fuente = IngestaSerial(ser_arduino, buffer, grabador, canales, fs=fs)
+        else:
+            fuente = crear_fuente(buffer, grabador=grabador)
+            print(f"✓ Fuente: {args.fuente}")
+        # Iniciar hilo de lectura
+        hilo_lectura = threading.Thread(target=leer_fuente, daemon=True)
+        hilo_lectura.start()
     
     # Crear aplicación
-    app = QApplication(sys.argv)
-    ventana = VentanaPrincipal()
+    app = QApplication([sys.argv[0]] + argv_qt)
+    ventana = VentanaPrincipal(pipeline)
     ventana.show()
     
     print("\n✓ Interfaz gráfica iniciada")
@@ -484,9 +742,15 @@ if __name__ == "__main__":
         print("\n\nCerrando...")
     finally:
         running = False
+        if pipeline:
+            pipeline.detener()
         if ser_esp32:
             ser_esp32.write(b"STOP\n")
             ser_esp32.close()
         if ser_arduino:
             ser_arduino.close()
-        print("✓ Puertos seriales cerrados")
\ No newline at end of file
+        print("✓ Puertos seriales cerrados")
+        if grabador:
+            hilo_lectura.join(timeout=1)  # Que no quede un bloque a medio escribir
+            grabador.cerrar()
+            print(f"✓ Grabación cerrada ({grabador.total} muestras)")
\ No newline at end of file
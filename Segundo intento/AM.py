@@ -1,9 +1,14 @@
+import os
+import sys
+
 import numpy as np
-import serial
-import time
-import struct
 import matplotlib.pyplot as plt
 
+# Módulos compartidos en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from arranque import abrir_puerto
+from transferencia import TransferenciaVentana, resumen
+
 # Parámetros de la señal
 SAMPLE_RATE = 5000            # Hz
 MOD_FREQ = 10              # Hz
@@ -16,7 +21,8 @@ VOLTAGE_OFFSET = 2.0           # Offset de 2V
 # Configuración del puerto serial
 SERIAL_PORT = 'COM7'
 BAUD_RATE = 921600
-CHUNK_SIZE = 256
+TAM_TRAMA = 1024               # Bytes por trama (con CRC y ACK, ver transferencia.py)
+VENTANA = 8                    # Tramas en vuelo sin confirmar
 
 def generate_am_signal_no_filter():
     """Genera señal AM con offset de 2V"""
@@ -64,27 +70,20 @@ def plot_comparison(original, normalized):
     plt.show()
 
 def send_to_esp32(signal):
-    """Envía la señal por puerto serial con delimitadores"""
+    """Sube la señal al ESP32 en tramas confirmadas y la deja reproduciéndose"""
     try:
-        with serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1) as ser:
-            time.sleep(2.5)
-            print(f"Transmitiendo {len(signal)} muestras...")
-
-            # Encabezado de inicio
-            ser.write(b'\xAA\x55')
-            packed = struct.pack(f'{len(signal)}B', *signal)
-
-            chunk_delay = CHUNK_SIZE / (BAUD_RATE / 10)
-            for i in range(0, len(packed), CHUNK_SIZE):
-                ser.write(packed[i:i+CHUNK_SIZE])
-                ser.flush()
-                time.sleep(chunk_delay)
-
-            # Final
-            ser.write(b'\x55\xAA')
-            print("Transmisión completada con éxito")
+        ser = abrir_puerto(SERIAL_PORT, BAUD_RATE, senal_listo=b'Listo', espera_max=2.5)
+    except Exception as e:
+        print(f"❌ Error abriendo {SERIAL_PORT}: {e}")
+        return
+    try:
+        print(f"Transmitiendo {len(signal)} muestras...")
+        informe = TransferenciaVentana(ser, TAM_TRAMA, VENTANA).enviar(signal, SAMPLE_RATE)
+        print(f"✓ Transmisión completada: {resumen(informe)}")
     except Exception as e:
-        print(f"Error en transmisión: {str(e)}")
+        print(f"❌ Error en transmisión: {str(e)}")
+    finally:
+        ser.close()
 
 if __name__ == "__main__":
     am_filtered, am_original = generate_am_signal_no_filter()
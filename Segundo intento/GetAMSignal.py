@@ -1,21 +1,33 @@
 # am_gui_real_time.py
+import os
 import sys
 import time
 import threading
-from collections import deque
 
 import numpy as np
 import serial
 import pyqtgraph as pg
 from PyQt5.QtWidgets import QApplication
-from scipy.signal import butter, filtfilt, sosfiltfilt
+from scipy.signal import sosfiltfilt
+
+# Módulos compartidos en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from buffer_circular import BufferCircular
+from ingesta_serial import adc_a_voltaje
+from protocolo_binario import DecodificadorTramas
+from espectro import espectro_magnitud
+from picos import encontrar_picos, estimar_picos
+from grabador import Grabador
+from decimacion import minmax_columnas
+from filtros import disenar
 
 # ---------------- Configuración ----------------
 PORT = 'COM6'          # Cambia por tu puerto, p.ej. '/dev/ttyUSB0'
-BAUD = 115200
+BAUD = 921600          # Tramas binarias (ver ReadAnalogInputBinary.ino)
 fs = 5000              # Debe coincidir con Arduino -> 5000 Hz
 N = 8192               # Tamaño del buffer / FFT (aprox 1.6 s a 5 kHz)
-buffer = deque([0.0]*N, maxlen=N)
+buffer = BufferCircular.para_ventana(N)
+GRABAR_EN = None       # Directorio para guardar el ADC crudo (p.ej. 'grabaciones/prueba1'), None = no grabar
 
 # Filtro envolvente (pasa-bajas)
 fc_envolvente = 120.0  # cutoff para suavizar la envolvente (Hz). tu envolvente es 50 Hz -> 120 está bien
@@ -51,27 +63,24 @@ label_peaks = pg.TextItem(anchor=(0,1), color='y')
 p2.addItem(label_peaks)
 
 # ---------------- Funciones DSP ----------------
-def make_sos_bp(low, high, fs, order=4):
-    return butter(order, [low/(fs/2), high/(fs/2)], btype='band', output='sos')
-
-def make_ba_lp(fc, fs, order=4):
-    return butter(order, fc/(fs/2), btype='low', output='ba')
-
-sos_bp = make_sos_bp(bp_low, bp_high, fs, order=4)
-b_lp, a_lp = make_ba_lp(fc_envolvente, fs, orden_lp)
+# Diseños en SOS desde la caché de filtros.py: cambiar bp_low/bp_high o
+# fc_envolvente en marcha no rediseña si el ajuste ya se usó antes
 
 # ---------------- Hilo de lectura Serial ----------------
+decodificador = DecodificadorTramas()
+grabador = Grabador(GRABAR_EN, fs=fs) if GRABAR_EN else None
+
 def leer_serial():
     while True:
         try:
-            data = ser.read(2)  # leemos 2 bytes (little-endian)
-            if len(data) == 2:
-                valor = int.from_bytes(data, byteorder='little', signed=False)
-                volt = (valor / 1023.0) * 5.0
-                buffer.append(volt)
-            else:
-                # si se recibe menos de 2 bytes, esperar un poco
-                time.sleep(0.0005)
+            # Leer todo lo pendiente (mínimo 1 byte, bloquea hasta el timeout)
+            data = ser.read(max(1, ser.in_waiting))
+            perdidas_antes = decodificador.muestras_perdidas
+            muestras = decodificador.alimentar(data)
+            if grabador is not None:
+                grabador.escribir(muestras, perdidas=decodificador.muestras_perdidas - perdidas_antes)
+            if muestras.size:
+                buffer.escribir(adc_a_voltaje(muestras))
         except Exception as e:
             # no romper la hebra por excepciones momentáneas
             # print("Serial read error:", e)
@@ -82,10 +91,10 @@ threading.Thread(target=leer_serial, daemon=True).start()
 # ---------------- Procesamiento para cada actualización ----------------
 def procesar(datos):
     # 1) Filtrado banda (centro portadora) para aislar la portadora
-    datos_bp = sosfiltfilt(sos_bp, datos)
+    datos_bp = sosfiltfilt(disenar('band', 4, (bp_low, bp_high), fs), datos)
 
     # 2) Envolvente: abs + filtro pasa-bajas (suavizado)
-    envol = filtfilt(b_lp, a_lp, np.abs(datos_bp))
+    envol = sosfiltfilt(disenar('low', orden_lp, fc_envolvente, fs), np.abs(datos_bp))
 
     return datos_bp, envol
 
@@ -93,28 +102,23 @@ def obtener_fft_db(signal):
     n = len(signal)
     if n < 4:
         return np.array([]), np.array([])
-    windowed = (signal - np.mean(signal)) * np.hanning(n)
-    fft = np.fft.rfft(windowed)
-    fft_mag = np.abs(fft)
+    # Ventana y eje de frecuencias en caché por longitud
+    freqs, fft_mag = espectro_magnitud(signal, fs)
     fft_mag[fft_mag == 0] = 1e-12
     fft_db = 20 * np.log10(fft_mag / np.max(fft_mag))
-    freqs = np.fft.rfftfreq(n, d=1.0/fs)
     return freqs, fft_db
 
 def top_n_peaks(freqs, fft_mag_db, n=3, min_freq=1.0):
-    # devuelve las n frecuencias con mayor magnitud (ignorando DC si min_freq>0)
-    valid = freqs >= min_freq
-    if not np.any(valid):
-        return []
-    mags = fft_mag_db.copy()
-    mags[~valid] = -1e6
-    idx = np.argsort(mags)[-n:][::-1]
-    peaks = [(freqs[i], mags[i]) for i in idx]
-    return peaks
+    # devuelve los n picos más altos (ignorando DC si min_freq>0), de mayor a menor
+    bin_min = int(np.searchsorted(freqs, min_freq))
+    idx = encontrar_picos(fft_mag_db, num_picos=n, bin_min=bin_min)
+    f_est, mag_est = estimar_picos(fft_mag_db, freqs, idx, 'parabolica')
+    orden = np.argsort(mag_est)[::-1]
+    return [(f_est[i], mag_est[i]) for i in orden]
 
 # ---------------- Actualización gráfica ----------------
 def actualizar():
-    datos_np = np.array(buffer)
+    datos_np = buffer.ultimos(N)
     if len(datos_np) < 256:
         return
 
@@ -128,8 +132,9 @@ def actualizar():
     peaks = top_n_peaks(freqs, fft_db, n=3, min_freq=5.0)
 
     # Actualizar curvas
-    curve_signal.setData(signal_bp)
-    curve_env.setData(envolvente)
+    ancho = p1.getViewBox().width()  # Min/max por píxel en lugar de todas las muestras
+    curve_signal.setData(*minmax_columnas(signal_bp, ancho))
+    curve_env.setData(*minmax_columnas(envolvente, ancho))
     curve_fft.setData(freqs, fft_db)
 
     # Labels
@@ -137,6 +142,9 @@ def actualizar():
     label_rms.setPos(0, np.max(signal_bp))
 
     txt_peaks = "Top-3 frecuencias (Hz, dB):\n" + "\n".join([f"{f:.1f} Hz, {amp:.1f} dB" for f, amp in peaks])
+    txt_peaks += (f"\nTramas: {decodificador.tramas_validas} | "
+                  f"Perdidas: {decodificador.tramas_perdidas} | "
+                  f"Corruptas: {decodificador.tramas_corruptas}")
     label_peaks.setText(txt_peaks)
     label_peaks.setPos(freqs.max()*0.02, -10)
 
@@ -145,5 +153,8 @@ timer = pg.QtCore.QTimer()
 timer.timeout.connect(actualizar)
 timer.start(40)  # ~25 fps de actualización de GUI
 
+if grabador is not None:
+    app.aboutToQuit.connect(grabador.cerrar)
+
 win.show()
 sys.exit(app.exec_())
@@ -1,36 +1,180 @@
+// ============================================
+// REPRODUCTOR DE FORMA DE ONDA ARBITRARIA - ESP32
+// ============================================
+// Recibe la forma de onda completa desde el host (transferencia.py) y la
+// reproduce en ciclo por el DAC con un Timer hardware.
+//
+// Protocolo (protocolo_binario.py, tramas de comando):
+//   SYNC 5A A5 | codigo | n uint16 | payload | crc16 (CCITT, little-endian)
+//   'I' largo uint32, fs uint32   reserva la forma de onda
+//   'D' desplazamiento uint32 + bytes
+//   'F' crc32 de toda la forma     la reproduce si coincide
+// Cada trama se responde con 'A' (ok) o 'N' (error) y payload
+// comando uint8 + desplazamiento uint32: el host reenvía solo esa trama.
+
 #include "driver/dac.h"
 
-#define DAC_PIN 25      // GPIO25 (DAC1)
-#define BUFFER_SIZE 512 // Buffer circular
-#define SAMPLE_DELAY 200 // Microsegundos (5kHz)
+#define DAC_PIN 25               // GPIO25 (DAC1)
+#define MAX_TRAMA 4096           // Bytes de datos por trama 'D'
+#define MAX_FORMA 131072         // Bytes máximos de forma de onda
+#define RX_BUFFER 16384          // Ventana del host (8 tramas de 1 KiB) con margen
+
+const uint8_t SYNC_COMANDO[2] = {0x5A, 0xA5};
+const uint8_t CMD_INICIO = 'I';
+const uint8_t CMD_DATOS = 'D';
+const uint8_t CMD_FIN = 'F';
+const uint8_t RESP_OK = 'A';
+const uint8_t RESP_ERROR = 'N';
+
+uint8_t trama[MAX_TRAMA + 8];
+uint8_t *forma = NULL;
+volatile uint32_t largo = 0;
+uint32_t fs_forma = 0;
+volatile uint32_t posicion = 0;
+volatile bool reproduciendo = false;
+
+hw_timer_t *timer = NULL;
+
+// ============================================
+// REPRODUCCIÓN
+// ============================================
+void IRAM_ATTR onTimer() {
+  if (!reproduciendo) return;
+  dac_output_voltage(DAC_CHANNEL_1, forma[posicion]);
+  if (++posicion >= largo) posicion = 0;
+}
+
+void detener() {
+  reproduciendo = false;
+  if (timer != NULL) {
+    timerEnd(timer);
+    timer = NULL;
+  }
+}
+
+void reproducir(uint32_t fs) {
+  posicion = 0;
+  timer = timerBegin(1000000);  // 1 MHz: el periodo va en microsegundos
+  timerAttachInterrupt(timer, &onTimer);
+  timerAlarm(timer, 1000000 / fs, true, 0);
+  reproduciendo = true;
+}
+
+// ============================================
+// TRAMAS DE COMANDO
+// ============================================
+uint16_t crc16(uint16_t crc, const uint8_t *datos, size_t n) {
+  while (n--) {
+    crc ^= (uint16_t)(*datos++) << 8;
+    for (int i = 0; i < 8; i++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// CRC-32 (zlib.crc32): polinomio reflejado 0xEDB88320
+uint32_t crc32(const uint8_t *datos, size_t n) {
+  uint32_t crc = 0xFFFFFFFF;
+  while (n--) {
+    crc ^= *datos++;
+    for (int i = 0; i < 8; i++) {
+      crc = (crc & 1) ? (crc >> 1) ^ 0xEDB88320 : crc >> 1;
+    }
+  }
+  return ~crc;
+}
+
+uint32_t leerU32(const uint8_t *p) {
+  return p[0] | (p[1] << 8) | ((uint32_t)p[2] << 16) | ((uint32_t)p[3] << 24);
+}
+
+bool leerExacto(uint8_t *destino, size_t n) {
+  return Serial.readBytes(destino, n) == n;
+}
+
+void responder(uint8_t codigo, uint8_t comando, uint32_t valor) {
+  uint8_t r[12] = {SYNC_COMANDO[0], SYNC_COMANDO[1], codigo, 5, 0, comando,
+                   (uint8_t)valor, (uint8_t)(valor >> 8), (uint8_t)(valor >> 16),
+                   (uint8_t)(valor >> 24)};
+  uint16_t crc = crc16(0xFFFF, r + 2, 8);
+  r[10] = crc & 0xFF;
+  r[11] = crc >> 8;
+  Serial.write(r, sizeof(r));
+}
+
+// Lee una trama ya sincronizada (SYNC consumido) y la procesa
+void procesarTrama() {
+  uint8_t cabecera[3];  // codigo, n(2)
+  uint8_t crc_recibido[2];
+  if (!leerExacto(cabecera, sizeof(cabecera))) return;
+  uint8_t codigo = cabecera[0];
+  uint16_t n = cabecera[1] | (cabecera[2] << 8);
+  if (n > sizeof(trama) || !leerExacto(trama, n) || !leerExacto(crc_recibido, 2)) {
+    return;  // Cabecera falsa o trama cortada: el host reenvía por tiempo
+  }
+
+  uint16_t crc = crc16(crc16(0xFFFF, cabecera, 3), trama, n);
+  // La respuesta lleva lo que el host espera: desplazamiento (D), largo (F) o 0 (I)
+  uint32_t desp = (codigo == CMD_DATOS && n >= 4) ? leerU32(trama) : (codigo == CMD_FIN) ? largo : 0;
+  if (crc != (crc_recibido[0] | (crc_recibido[1] << 8))) {
+    responder(RESP_ERROR, codigo, desp);
+    return;
+  }
 
-byte rxBuffer[BUFFER_SIZE];
-volatile uint16_t bufIndex = 0;
-bool dataReady = false;
+  if (codigo == CMD_INICIO && n == 8) {
+    uint32_t nuevo_largo = leerU32(trama);
+    uint32_t fs = leerU32(trama + 4);
+    detener();
+    free(forma);
+    forma = (nuevo_largo > 0 && nuevo_largo <= MAX_FORMA && fs > 0 && fs <= 1000000)
+              ? (uint8_t *)malloc(nuevo_largo) : NULL;
+    if (forma == NULL) {
+      responder(RESP_ERROR, codigo, 0);
+      return;
+    }
+    largo = nuevo_largo;
+    fs_forma = fs;
+    responder(RESP_OK, codigo, 0);
+  } else if (codigo == CMD_DATOS && n > 4 && forma != NULL && desp + (n - 4) <= largo) {
+    memcpy(forma + desp, trama + 4, n - 4);
+    responder(RESP_OK, codigo, desp);
+  } else if (codigo == CMD_FIN && n == 4 && forma != NULL) {
+    if (crc32(forma, largo) != leerU32(trama)) {
+      responder(RESP_ERROR, codigo, largo);
+      return;
+    }
+    responder(RESP_OK, codigo, largo);
+    reproducir(fs_forma);
+  } else {
+    responder(RESP_ERROR, codigo, desp);
+  }
+}
 
+// ============================================
+// SETUP Y LOOP
+// ============================================
 void setup() {
+  Serial.setRxBufferSize(RX_BUFFER);  // Antes de begin()
   Serial.begin(921600);
-  while(!Serial); 
-  
-  // Configurar DAC
+  Serial.setTimeout(100);
+  while (!Serial);
+
   dac_output_enable(DAC_CHANNEL_1);
-  pinMode(DAC_PIN, OUTPUT);
-  
-  Serial.println("ESP32 Listo para recibir AM @800Hz");
+
+  Serial.println("ESP32 Listo para recibir forma de onda");
 }
 
 void loop() {
-  // Recepción serial no bloqueante
-  while(Serial.available()) {
-    rxBuffer[bufIndex] = Serial.read();
-    bufIndex = (bufIndex + 1) % BUFFER_SIZE;
-    dataReady = true;
+  // Sincronizar con el SYNC de la siguiente trama
+  static uint8_t anterior = 0;
+  while (Serial.available()) {
+    uint8_t byte_rx = Serial.read();
+    if (anterior == SYNC_COMANDO[0] && byte_rx == SYNC_COMANDO[1]) {
+      anterior = 0;
+      procesarTrama();
+    } else {
+      anterior = byte_rx;
+    }
   }
-  
-  // Reproducción constante desde buffer
-  if(dataReady) {
-    dac_output_voltage(DAC_CHANNEL_1, rxBuffer[bufIndex]);
-    delayMicroseconds(SAMPLE_DELAY);
-    bufIndex = (bufIndex + 1) % BUFFER_SIZE;
-    }
-}
\ No newline at end of file
+}
@@ -1,7 +1,7 @@
-import subprocess
+# Generador (AMsignalESP32.py) y analizador (GetAMSignal.py) juntos, ahora
+# bajo supervisor.py: el analizador espera a que el ESP32 esté generando,
+# los procesos caídos se reinician y ninguno queda huérfano con un COM.
+from supervisor import main
 
-# Ejecuta script1.py en segundo plano
-subprocess.Popen(["python", "AMsignalESP32.py"])
-
-# Ejecuta script2.py también en segundo plano
-subprocess.Popen(["python", "GetAMSignal.py"])
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import numpy as np
+
+from envolvente import EnvolventeIncremental
+from filtros import BancoFiltros
+from espectro import EspectroWelch, espectro_magnitud, frecuencias_rfft
+from picos import identificar_am
+from seguidor_tonos import SeguidorTonos
+from calibracion import cargar_calibracion
+
+# ============================================
+# NÚCLEO DE ANÁLISIS AM (sin GUI)
+# ============================================
+# La cadena que antes vivía en ReadNWriteAMSignal.py: quitar DC, envolvente
+# (Hilbert FIR + pasa-bajos), RMS, espectro de Welch con picos sub-bin,
+# seguidor de tonos y distancia calibrada. La usan la GUI (hilo o proceso
+# DSP del pipeline) y el análisis por lotes (analisis_lotes.py).
+#
+# AnalizadorMulticanal hace envolvente, RMS y FFT de varios canales
+# (ventana C x n) con una sola llamada NumPy por etapa.
+#
+# Los filtros viven en un BancoFiltros (filtros.py): el pasa-bajos de la
+# envolvente se resintoniza en marcha (resintonizar_envolvente) sin saltos.
+
+FC_ENVOLVENTE = 80               # Hz - pasa-bajos de la envolvente
+ORDEN_ENVOLVENTE = 6
+ARCHIVO_CALIBRACION = 'fotodetector.json'
+FILAS_RECIENTES = 8              # Espectros por resultado para la cascada de la GUI
+CAMBIO_FS = 1e-4                 # Cambio relativo de fs que obliga a rediseñar (0.5 Hz a 5 kHz)
+
+
+def calcular_rms(datos):
+    """RMS de una señal, o de cada fila si datos es C x n"""
+    return np.sqrt(np.mean(datos**2, axis=-1))
+
+
+def rms_movil(datos, n):
+    """RMS sobre las últimas n muestras, para cada muestra (suma acumulada)"""
+    acumulada = np.concatenate(([0.0], np.cumsum(np.square(datos, dtype=np.float64))))
+    inicio = np.maximum(np.arange(1, len(datos) + 1) - n, 0)
+    cuenta = np.arange(1, len(datos) + 1) - inicio
+    return np.sqrt((acumulada[1:] - acumulada[inicio]) / cuenta)
+
+
+class AnalizadorAM:
+    def __init__(self, fs, n, fc, fm, fc_envolvente=FC_ENVOLVENTE, orden=ORDEN_ENVOLVENTE,
+                 modo_envolvente='causal', n_segmento=4096, salto=1024, n_promedios=8,
+                 calibracion=ARCHIVO_CALIBRACION):
+        self.fs = fs
+        self.n = n
+        self.fc = fc
+        self.fm = fm
+        self.fc_envolvente = fc_envolvente
+        self.orden = orden
+        self.filtros = BancoFiltros(fs)
+        pasabajos = self.filtros.agregar('envolvente', 'low', orden, fc_envolvente)
+
+        # Envolvente incremental: solo procesa las muestras nuevas de cada llamada
+        self.detector_envolvente = EnvolventeIncremental(pasabajos, fs, n, modo=modo_envolvente)
+        # Espectro: Welch deslizante (4096 a 5 kHz = 1.2 Hz/bin)
+        self.espectro_welch = EspectroWelch(fs, n_segmento=n_segmento, salto=salto,
+                                            n_promedios=n_promedios)
+        # Seguidor de tonos en fc y fc±fm: amplitudes y m por muestra, sin FFT
+        self.seguidor_tonos = SeguidorTonos.para_am(fs, fc, fm)
+        # Modelos RMS -> distancia (ver calibracion.py)
+        self.modelos_distancia = cargar_calibracion(calibracion)
+
+    def campos(self):
+        """Forma y tipo de cada resultado (para BloqueResultados del pipeline)"""
+        return {
+            'datos_centrados': ((self.n,), np.float32),
+            'envolvente': ((self.n,), np.float64),
+            'rms_am': ((), np.float64),
+            'rms_envolvente': ((), np.float64),
+            'distancia_log': ((), np.float64),
+            'distancia_poli': ((), np.float64),
+            'fft_vals': ((self.espectro_welch.n_bins,), np.float64),
+            'picos_freq': ((3,), np.float64),   # [portadora, LSB, USB], NaN si falta
+            'picos_amp': ((3,), np.float64),
+            'm_estimado': ((), np.float64),
+            'tonos_amp': ((3,), np.float64),    # Seguidor: [portadora, LSB, USB]
+            'm_tonos': ((), np.float64),
+            'distancia_traza': ((self.n,), np.float64),
+            'espectro_reciente': ((FILAS_RECIENTES, self.espectro_welch.n_bins), np.float64),
+            'segmentos': ((), np.int64),        # Contador de EspectroWelch (filas nuevas)
+            'fs': ((), np.float64),             # fs con la que se analizó (eje de frecuencias)
+        }
+
+    @property
+    def sos_envolvente(self):
+        return self.filtros.sos('envolvente')
+
+    def resintonizar_envolvente(self, fc_envolvente=None, orden=None):
+        """Cambia el pasa-bajos de la envolvente en marcha; devuelve True si cambió"""
+        if fc_envolvente is not None:
+            self.fc_envolvente = fc_envolvente
+        if orden is not None:
+            self.orden = orden
+        return self.filtros.resintonizar('envolvente', corte=self.fc_envolvente, orden=self.orden)
+
+    def reiniciar(self):
+        self.detector_envolvente.reiniciar()
+        self.espectro_welch.reiniciar()
+        self.seguidor_tonos.reiniciar()
+
+    def ajustar_fs(self, fs):
+        """Adopta la fs medida si se movió más de CAMBIO_FS: rediseña el pasa-bajos
+        (en caché) y cambia los ejes de frecuencia. Devuelve True si cambió."""
+        if fs is None or abs(fs / self.fs - 1) < CAMBIO_FS:
+            return False
+        fs = round(fs, 1)  # Rediseños en caché para fs casi iguales
+        self.fs = fs
+        self.filtros.ajustar_fs(fs)
+        self.detector_envolvente.ajustar_fs(fs)
+        self.espectro_welch.ajustar_fs(fs)
+        self.seguidor_tonos.ajustar_fs(fs)
+        return True
+
+    def alimentar(self, datos, n_nuevos=None):
+        """Pasa las muestras nuevas al detector de envolvente, al espectro y al seguidor de tonos.
+
+        Con n_nuevos=None (primer frame) o si se perdieron muestras, se
+        reinician y procesan la ventana completa una vez.
+        """
+        if n_nuevos is None or n_nuevos >= len(datos):
+            self.reiniciar()
+            nuevos = datos
+        else:
+            nuevos = datos[len(datos) - n_nuevos:]
+        if len(nuevos):
+            self.detector_envolvente.procesar(nuevos)
+            self.espectro_welch.agregar(nuevos)
+            self.seguidor_tonos.procesar(nuevos)
+
+    def distancia_logaritmica(self, voltaje_rms):
+        """Distancia con el modelo 'logaritmica' (escalar o arreglo de voltajes RMS)"""
+        return self.modelos_distancia['logaritmica'].evaluar(voltaje_rms)
+
+    def distancia_polinomica(self, voltaje_rms):
+        """Distancia con el modelo 'polinomica' (escalar o arreglo de voltajes RMS)"""
+        return self.modelos_distancia['polinomica'].evaluar(voltaje_rms)
+
+    def analizar(self, datos, n_nuevos=None, con_fft=True):
+        """Procesa una ventana de muestras y devuelve un dict de resultados"""
+        # Remover DC y procesar
+        datos_centrados = datos - np.mean(datos)
+
+        # Envolvente y espectro: solo muestras nuevas
+        self.alimentar(datos, n_nuevos)
+        envolvente = self.detector_envolvente.ventana(len(datos))
+
+        rms_am = calcular_rms(datos_centrados)
+        rms_envolvente = calcular_rms(envolvente)
+        tonos = self.seguidor_tonos
+
+        resultados = {
+            'datos_centrados': datos_centrados,
+            'envolvente': envolvente,
+            'rms_am': rms_am,
+            'rms_envolvente': rms_envolvente,
+            'distancia_log': self.distancia_logaritmica(rms_envolvente),
+            'distancia_poli': self.distancia_polinomica(rms_envolvente),
+            # Distancia por muestra: modelo sobre el RMS de un periodo de la moduladora
+            'distancia_traza': self.distancia_logaritmica(
+                rms_movil(envolvente, int(self.fs / self.fm))),
+            'tonos_amp': tonos.ultimo[:3].copy(),
+            'm_tonos': (SeguidorTonos.indice_modulacion(tonos.ultimo)
+                        if tonos.listo else np.nan),
+            # Últimos espectros de Welch (uno por salto) para la cascada
+            'espectro_reciente': self.espectro_welch.recientes(FILAS_RECIENTES),
+            'segmentos': self.espectro_welch.segmentos,
+            'fs': self.fs,
+        }
+
+        if con_fft and self.espectro_welch.listo:
+            # Magnitud del promedio de Welch (ya actualizado por alimentar)
+            fft_vals = self.espectro_welch.magnitud()
+
+            # Portadora y bandas laterales con interpolación sub-bin
+            picos_freq, picos_amp, m_estimado = identificar_am(
+                fft_vals, self.espectro_welch.frecuencias, fc=self.fc, fm=self.fm)
+
+            resultados['fft_vals'] = fft_vals
+            resultados['picos_freq'] = picos_freq
+            resultados['picos_amp'] = picos_amp
+            resultados['m_estimado'] = m_estimado
+
+        return resultados
+
+
+class AnalizadorMulticanal:
+    def __init__(self, fs, n, canales, fc, fm, fc_envolvente=FC_ENVOLVENTE, orden=ORDEN_ENVOLVENTE,
+                 modo_envolvente='causal', calibracion=ARCHIVO_CALIBRACION):
+        self.fs = fs
+        self.n = n
+        self.canales = canales
+        self.fc = fc
+        self.fm = fm
+        self.fc_envolvente = fc_envolvente
+        self.orden = orden
+        self.filtros = BancoFiltros(fs)
+        pasabajos = self.filtros.agregar('envolvente', 'low', orden, fc_envolvente, canales=canales)
+        # Un solo detector para todos los canales (filtros sobre el último eje)
+        self.detector_envolvente = EnvolventeIncremental(pasabajos, fs, n,
+                                                         modo=modo_envolvente, canales=canales)
+        self.frecuencias = frecuencias_rfft(n, fs)
+        self.modelos_distancia = cargar_calibracion(calibracion)
+
+    @property
+    def sos_envolvente(self):
+        return self.filtros.sos('envolvente')
+
+    def resintonizar_envolvente(self, fc_envolvente=None, orden=None):
+        """Igual que AnalizadorAM.resintonizar_envolvente (todos los canales)"""
+        if fc_envolvente is not None:
+            self.fc_envolvente = fc_envolvente
+        if orden is not None:
+            self.orden = orden
+        return self.filtros.resintonizar('envolvente', corte=self.fc_envolvente, orden=self.orden)
+
+    def reiniciar(self):
+        self.detector_envolvente.reiniciar()
+
+    def ajustar_fs(self, fs):
+        """Igual que AnalizadorAM.ajustar_fs"""
+        if fs is None or abs(fs / self.fs - 1) < CAMBIO_FS:
+            return False
+        fs = round(fs, 1)
+        self.fs = fs
+        self.filtros.ajustar_fs(fs)
+        self.detector_envolvente.ajustar_fs(fs)
+        self.frecuencias = frecuencias_rfft(self.n, fs)
+        return True
+
+    def analizar(self, datos, n_nuevos=None, con_fft=True):
+        """datos: C x n; devuelve un dict con un valor (o una fila) por canal"""
+        n = datos.shape[-1]
+        datos_centrados = datos - np.mean(datos, axis=-1, keepdims=True)
+
+        # Envolvente de todos los canales: solo las muestras nuevas
+        if n_nuevos is None or n_nuevos >= n:
+            self.reiniciar()
+            nuevos = datos
+        else:
+            nuevos = datos[..., n - n_nuevos:]
+        if nuevos.shape[-1]:
+            self.detector_envolvente.procesar(nuevos)
+        envolvente = self.detector_envolvente.ventana(n)
+
+        rms_envolvente = calcular_rms(envolvente)
+        resultados = {
+            'datos_centrados': datos_centrados,
+            'envolvente': envolvente,
+            'rms_am': calcular_rms(datos_centrados),
+            'rms_envolvente': rms_envolvente,
+            'distancia_log': self.modelos_distancia['logaritmica'].evaluar(rms_envolvente),
+        }
+
+        if con_fft:
+            # Una rfft para todos los canales; los picos se buscan fila por fila
+            _, fft_vals = espectro_magnitud(datos_centrados, self.fs)
+            picos = [identificar_am(fila, self.frecuencias, fc=self.fc, fm=self.fm)
+                     for fila in fft_vals]
+            resultados['fft_vals'] = fft_vals
+            resultados['picos_freq'] = np.array([p[0] for p in picos])
+            resultados['picos_amp'] = np.array([p[1] for p in picos])
+            resultados['m_estimado'] = np.array([p[2] for p in picos])
+
+        return resultados
@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from analisis_am import AnalizadorAM, ARCHIVO_CALIBRACION
+from grabador import LectorGrabacion
+from ingesta_serial import adc_a_voltaje
+
+# ============================================
+# ANÁLISIS POR LOTES DE GRABACIONES (sin GUI)
+# ============================================
+# Corta cada grabación en ventanas solapadas, reparte grupos de ventanas
+# entre procesos (ProcessPoolExecutor) y guarda una fila de métricas por
+# ventana en un archivo columnar (.npz, una columna por arreglo) o .csv.
+#
+# Cada proceso abre las grabaciones por su cuenta (np.memmap): a las tareas
+# solo viajan (archivo, inicio) y no las muestras. Antes de cada ventana se
+# alimentan `calentamiento` segundos previos para que el removedor de DC y
+# los filtros de la envolvente ya estén en régimen.
+
+COLUMNAS = ('archivo', 't_inicio', 'rms_am', 'rms_envolvente', 'distancia_log', 'distancia_poli',
+            'f_portadora', 'f_lsb', 'f_usb', 'a_portadora', 'a_lsb', 'a_usb',
+            'm_estimado', 'm_tonos', 'perdidas')
+VENTANAS_POR_TAREA = 32
+
+_analizador = None   # Uno por proceso trabajador
+_entradas = {}       # ruta -> Entrada abierta en este proceso
+
+
+class Entrada:
+    """Grabación de grabador.py (directorio) o .npy (valores ADC enteros o voltios)"""
+
+    def __init__(self, ruta, fs=None):
+        self.ruta = ruta
+        self.lector = None
+        self._huecos = np.zeros(0, dtype=np.int64)
+        self._perdidas = np.zeros(0, dtype=np.int64)
+        if os.path.isdir(ruta):
+            self.lector = LectorGrabacion(ruta)
+            self.total = self.lector.total
+            self.fs = self.lector.fs or fs
+            huecos = self.lector.huecos()
+            self._huecos = np.asarray(huecos['muestra'])
+            self._perdidas = np.asarray(huecos['perdidas'])
+        else:
+            self.datos = np.load(ruta, mmap_mode='r')
+            self.total = len(self.datos)
+            self.fs = fs
+        if not self.fs:
+            raise ValueError(f"no se conoce fs para {ruta} (usar --fs)")
+
+    def voltajes(self, inicio, n):
+        crudos = self.lector.leer(inicio, n) if self.lector else self.datos[inicio:inicio + n]
+        if np.issubdtype(crudos.dtype, np.integer):
+            return adc_a_voltaje(crudos)
+        return np.asarray(crudos, dtype=np.float32)
+
+    def perdidas(self, inicio, fin):
+        """Muestras perdidas en huecos que caen dentro de [inicio, fin)"""
+        a, b = np.searchsorted(self._huecos, [inicio, fin])
+        return int(self._perdidas[a:b].sum())
+
+
+def _inicializar(parametros):
+    global _analizador
+    _analizador = AnalizadorAM(**parametros)
+
+
+def _entrada(ruta, fs):
+    if ruta not in _entradas:
+        _entradas[ruta] = Entrada(ruta, fs)
+    return _entradas[ruta]
+
+
+def analizar_tarea(tarea):
+    """Métricas de un grupo de ventanas: tarea = (i_archivo, ruta, fs, inicios, n, calentamiento)"""
+    i_archivo, ruta, fs, inicios, n, calentamiento = tarea
+    entrada = _entrada(ruta, fs)
+    filas = np.full((len(inicios), len(COLUMNAS)), np.nan)
+
+    for k, inicio in enumerate(inicios):
+        previo = min(calentamiento, inicio)
+        datos = entrada.voltajes(inicio - previo, previo + n)
+        _analizador.alimentar(datos)            # Reinicia y procesa margen + ventana
+        r = _analizador.analizar(datos[previo:], n_nuevos=0)
+        freqs = r.get('picos_freq', np.full(3, np.nan))
+        amps = r.get('picos_amp', np.full(3, np.nan))
+        filas[k] = (i_archivo, inicio / entrada.fs, r['rms_am'], r['rms_envolvente'],
+                    r['distancia_log'], r['distancia_poli'], *freqs, *amps,
+                    r.get('m_estimado', np.nan), r['m_tonos'],
+                    entrada.perdidas(inicio, inicio + n))
+    return filas
+
+
+def planificar(rutas, fs, ventana, salto, calentamiento, ventanas_por_tarea=VENTANAS_POR_TAREA):
+    """Lista de tareas (grupos de ventanas consecutivas) para todas las grabaciones"""
+    tareas = []
+    fs_comun = None
+    for i, ruta in enumerate(rutas):
+        entrada = Entrada(ruta, fs)
+        if fs_comun is None:
+            fs_comun = entrada.fs
+        elif abs(entrada.fs - fs_comun) > 1e-6 * fs_comun:
+            raise ValueError(f"{ruta}: fs={entrada.fs} distinta de {fs_comun}")
+        n = int(round(ventana * entrada.fs))
+        paso = max(1, int(round(salto * entrada.fs)))
+        margen = int(round(calentamiento * entrada.fs))
+        inicios = np.arange(0, entrada.total - n + 1, paso)
+        for j in range(0, len(inicios), ventanas_por_tarea):
+            tareas.append((i, ruta, fs, inicios[j:j + ventanas_por_tarea], n, margen))
+    return tareas, fs_comun
+
+
+def guardar(ruta, columnas, rutas):
+    if ruta.endswith('.csv'):
+        tabla = np.column_stack([columnas[c] for c in COLUMNAS])
+        np.savetxt(ruta, tabla, delimiter=',', header=','.join(COLUMNAS), comments='', fmt='%.6g')
+    else:
+        np.savez(ruta, archivos=np.array(rutas), **columnas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Métricas AM por ventana de grabaciones largas, en paralelo")
+    parser.add_argument('entradas', nargs='+', help="Directorios de grabador.py o archivos .npy")
+    parser.add_argument('--salida', required=True, help=".npz (columnar) o .csv")
+    parser.add_argument('--fs', type=float, default=None, help="fs de los .npy (Hz)")
+    parser.add_argument('--fc', type=float, default=1000, help="Portadora (Hz)")
+    parser.add_argument('--fm', type=float, default=50, help="Moduladora (Hz)")
+    parser.add_argument('--ventana', type=float, default=2.0, help="Largo de ventana (s)")
+    parser.add_argument('--salto', type=float, default=1.0, help="Avance entre ventanas (s)")
+    parser.add_argument('--calentamiento', type=float, default=1.0,
+                        help="Segundos previos para asentar filtros (s)")
+    parser.add_argument('--procesos', type=int, default=None, help="Por defecto: núcleos")
+    parser.add_argument('--calibracion', default=ARCHIVO_CALIBRACION)
+    args = parser.parse_args(argv)
+
+    tareas, fs = planificar(args.entradas, args.fs, args.ventana, args.salto, args.calentamiento)
+    if not tareas:
+        print("❌ Las grabaciones son más cortas que una ventana")
+        return 1
+    parametros = {'fs': fs, 'n': int(round(args.ventana * fs)), 'fc': args.fc, 'fm': args.fm,
+                  'calibracion': args.calibracion}
+
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.procesos, initializer=_inicializar,
+                             initargs=(parametros,)) as ejecutor:
+        bloques = list(ejecutor.map(analizar_tarea, tareas))
+    tabla = np.concatenate(bloques)
+    transcurrido = time.perf_counter() - inicio
+
+    columnas = {nombre: tabla[:, j] for j, nombre in enumerate(COLUMNAS)}
+    columnas['archivo'] = columnas['archivo'].astype(np.int32)
+    guardar(args.salida, columnas, args.entradas)
+
+    segundos = len(tabla) * args.salto
+    print(f"✓ {len(tabla)} ventanas en {transcurrido:.1f} s "
+          f"(~{segundos / transcurrido:.0f}x tiempo real) -> {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
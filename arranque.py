@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ============================================
+# ARRANQUE RÁPIDO DE LOS PUERTOS SERIALES
+# ============================================
+# Abrir un puerto reinicia la placa (DTR) y antes se esperaba un
+# time.sleep(2) fijo por dispositivo, uno después del otro. Aquí:
+#   - Se espera solo hasta que la placa da señales de vida: el Arduino
+#     empieza a transmitir muestras apenas arranca y el ESP32 imprime su
+#     menú ("Esperando comandos..."). ESPERA_RESET queda como tope.
+#   - abrir_puertos() abre varios puertos a la vez en hilos y devuelve
+#     futuros: el que llama puede seguir (importar la GUI, armar gráficas)
+#     mientras las placas se reinician y pedir .result() recién al usarlos.
+#
+# pyserial se importa dentro de las funciones, como en fuentes.py.
+
+ESPERA_RESET = 2.0                    # s - tope de espera al reinicio
+LISTO_ESP32 = b'Esperando comandos'   # Fin del menú de GetAMSignalESP32.ino
+CUALQUIER_DATO = b''                  # Listo con el primer byte (Arduino transmitiendo)
+
+
+def esperar_listo(ser, senal_listo=None, espera_max=ESPERA_RESET):
+    """Espera a que la placa reinicie: hasta recibir senal_listo o espera_max s.
+
+    senal_listo=None conserva la espera fija. Devuelve True si llegó la señal.
+    """
+    if senal_listo is None:
+        time.sleep(espera_max)
+        return False
+    limite = time.perf_counter() + espera_max
+    cola = b''
+    while time.perf_counter() < limite:
+        pendientes = ser.in_waiting
+        if not pendientes:
+            time.sleep(0.005)
+            continue
+        recibido = cola + ser.read(pendientes)
+        if senal_listo in recibido:
+            return True
+        cola = recibido[-len(senal_listo):] if senal_listo else b''
+    return False
+
+
+def abrir_puerto(puerto, baud, timeout=1, senal_listo=None, espera_max=ESPERA_RESET):
+    """Abre el puerto, espera el reinicio de la placa y vacía la entrada"""
+    import serial
+    ser = serial.Serial(puerto, baud, timeout=timeout)
+    try:
+        ser.reset_input_buffer()  # Bytes de antes del reinicio
+        esperar_listo(ser, senal_listo, espera_max)
+        ser.reset_input_buffer()
+    except Exception:
+        ser.close()
+        raise
+    return ser
+
+
+def abrir_puertos(especificaciones):
+    """Abre varios puertos en paralelo sin bloquear.
+
+    especificaciones: {nombre: kwargs de abrir_puerto}. Devuelve {nombre: futuro};
+    futuro.result() entrega el serial.Serial o relanza el error de apertura.
+    """
+    ejecutor = ThreadPoolExecutor(max_workers=max(1, len(especificaciones)))
+    futuros = {nombre: ejecutor.submit(abrir_puerto, **kwargs)
+               for nombre, kwargs in especificaciones.items()}
+    ejecutor.shutdown(wait=False)
+    return futuros
@@ -0,0 +1,310 @@
+import sys
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from analisis_am import AnalizadorAM, ARCHIVO_CALIBRACION
+from buffer_circular import BufferCircular
+from ingesta_serial import IngestaSerial
+from fuentes import FuenteSintetica
+from arranque import abrir_puertos, LISTO_ESP32, CUALQUIER_DATO
+from sintetizador_tabla import compilar_am, enviar_tabla
+
+# ============================================
+# BARRIDO DE PARÁMETROS AM (LAZO CERRADO)
+# ============================================
+# Antes, variar fc/fm/m era editar las globales de ReadNWriteAMSignal.py /
+# AMsignalESP32.py y reiniciar. Aquí, para cada punto de una rejilla:
+#   1. El ESP32 pasa a generar el punto (tabla compilada en el host, como
+#      iniciar_generacion; la compilación queda en caché).
+#   2. Se descartan `asentamiento` s del Arduino y se captura
+#      calentamiento + ventana. La captura vale si el RMS de sus dos
+#      mitades coincide (TOLERANCIA_ASENTADO); si no, se repite.
+#   3. La captura va a un ProcessPoolExecutor con el núcleo de análisis
+#      (AnalizadorAM, como analisis_lotes.py) y el lazo sigue con el
+#      siguiente punto: el análisis se solapa con la adquisición.
+# El resultado es una tabla (.npz columnar o .csv) con una fila por punto:
+# lo medido frente a lo teórico (frecuencias que emite la tabla DDS, m,
+# nivel de bandas laterales y RMS a la salida del DAC).
+#
+# --simular reemplaza las placas por FuenteSintetica (sin hardware).
+
+COLUMNAS = ('fc', 'fm', 'm', 'fc_real', 'fm_real', 'fs_medida',
+            'f_portadora', 'f_lsb', 'f_usb', 'error_fc', 'error_fm',
+            'a_portadora', 'a_lsb', 'a_usb', 'lsb_db', 'usb_db', 'banda_teorica_db',
+            'm_estimado', 'm_tonos', 'error_m',
+            'rms_am', 'rms_envolvente', 'rms_teorico_dac', 'intentos', 'asentado', 'perdidas')
+TOLERANCIA_ASENTADO = 0.05   # Diferencia relativa de RMS entre mitades de la ventana
+MAX_INTENTOS = 3             # Capturas por punto antes de aceptarla sin asentar
+
+_parametros = {}             # Del analizador, uno por proceso trabajador
+
+
+# ============================================
+# BANCOS: GENERAR UN PUNTO Y CAPTURAR
+# ============================================
+class BancoAM:
+    """ESP32 que genera + Arduino que mide, con la interfaz del barrido"""
+
+    def __init__(self, ser_esp32, ser_arduino, fs, offset, amplitud):
+        self.ser_esp32 = ser_esp32
+        self.offset = offset
+        self.amplitud = amplitud
+        self.buffer = BufferCircular.para_ventana(1 << 16)
+        self.fuente = IngestaSerial(ser_arduino, self.buffer, fs=fs)
+        self.fs = fs
+
+    def generar(self, fc, fm, m):
+        """Lleva el ESP32 al punto; devuelve la TablaDDS emitida"""
+        tabla = compilar_am(fc, fm, m, self.offset, self.amplitud)
+        self.ser_esp32.timeout = 0.1
+        ok, respuesta = enviar_tabla(self.ser_esp32, tabla)
+        if not ok:
+            raise RuntimeError(f"ESP32: {respuesta}")
+        return tabla
+
+    def detener(self):
+        self.ser_esp32.write(b"STOP\n")
+
+    def capturar(self, n, descartar):
+        """n muestras posteriores a las primeras `descartar` desde ahora.
+
+        Devuelve (voltajes, fs efectiva, muestras perdidas en huecos).
+        """
+        self.fuente.leer()  # Lo pendiente es de antes del cambio de punto
+        inicio = self.buffer.total_escrito
+        perdidas = self.fuente.reloj.perdidas
+        limite = time.perf_counter() + 5 * (n + descartar) / self.fs + 1
+        while self.buffer.total_escrito < inicio + descartar + n:
+            if time.perf_counter() > limite:
+                raise RuntimeError("el Arduino dejó de enviar muestras")
+            if self.fuente.leer() == 0:
+                time.sleep(0.001)
+        total = self.buffer.total_escrito
+        reloj = self.fuente.reloj
+        datos = np.array(self.buffer.ultimos(total - inicio - descartar, hasta=total)[:n])
+        return datos, (reloj.fs if reloj.listo else self.fs), reloj.perdidas - perdidas
+
+    def cerrar(self):
+        self.fuente.ser.close()
+        self.ser_esp32.close()
+
+
+class BancoSimulado:
+    """Misma interfaz con FuenteSintetica: la AM que emitiría la tabla, con ruido"""
+
+    def __init__(self, fs, offset, amplitud, ruido=0.005, semilla=None):
+        self.fs = fs
+        self.offset = offset
+        self.amplitud = amplitud
+        self.ruido = ruido
+        self.semilla = semilla
+        self.fuente = None
+
+    def generar(self, fc, fm, m):
+        tabla = compilar_am(fc, fm, m, self.offset, self.amplitud)
+        self.buffer = BufferCircular.para_ventana(1 << 16)
+        self.fuente = FuenteSintetica(self.buffer, self.fs, tabla.fc_real, tabla.fm_real, m,
+                                      self.offset, self.amplitud, ruido=self.ruido,
+                                      velocidad=None, semilla=self.semilla)
+        return tabla
+
+    def detener(self):
+        self.fuente = None
+
+    def capturar(self, n, descartar):
+        inicio = self.buffer.total_escrito
+        while self.buffer.total_escrito < inicio + descartar + n:
+            self.fuente.leer()
+        total = self.buffer.total_escrito
+        datos = np.array(self.buffer.ultimos(total - inicio - descartar, hasta=total)[:n])
+        return datos, float(self.fs), 0
+
+    def cerrar(self):
+        pass
+
+
+def asentada(datos, tolerancia=TOLERANCIA_ASENTADO):
+    """True si el RMS (sin DC) de las dos mitades difiere menos que tolerancia"""
+    mitad = len(datos) // 2
+    rms = [np.std(datos[:mitad]), np.std(datos[mitad:])]
+    return abs(rms[0] - rms[1]) <= tolerancia * max(max(rms), 1e-12)
+
+
+def capturar_asentada(banco, n, calentamiento, descartar):
+    """Captura calentamiento + n; repite si la ventana no está asentada.
+
+    Devuelve (datos, fs, perdidas, intentos, asentado).
+    """
+    for intento in range(1, MAX_INTENTOS + 1):
+        datos, fs, perdidas = banco.capturar(calentamiento + n, descartar)
+        if asentada(datos[calentamiento:]):
+            return datos, fs, perdidas, intento, True
+        descartar = 0  # Reintento: a continuación, ya con más tiempo asentado
+    return datos, fs, perdidas, MAX_INTENTOS, False
+
+
+# ============================================
+# ANÁLISIS DE UN PUNTO (PROCESO TRABAJADOR)
+# ============================================
+def _inicializar(parametros):
+    _parametros.update(parametros)
+
+
+def analizar_punto(tarea):
+    """Fila de COLUMNAS para una captura (tarea = dict, ver barrer)"""
+    fs, n, margen = tarea['fs'], tarea['n'], tarea['margen']
+    fc_real, fm_real, m = tarea['fc_real'], tarea['fm_real'], tarea['m']
+    analizador = AnalizadorAM(fs, n, fc_real, fm_real, **_parametros)
+    datos = tarea['datos']
+    analizador.alimentar(datos)                     # Filtros en régimen con el margen
+    r = analizador.analizar(datos[margen:], n_nuevos=0)
+
+    freqs = r.get('picos_freq', np.full(3, np.nan))
+    amps = r.get('picos_amp', np.full(3, np.nan))
+    m_estimado = r.get('m_estimado', np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lsb_db, usb_db = 20 * np.log10(amps[1:] / amps[0])
+    amplitud = tarea['amplitud']
+    return (tarea['fc'], tarea['fm'], m, fc_real, fm_real, fs,
+            *freqs, freqs[0] - fc_real, (freqs[2] - freqs[1]) / 2 - fm_real,
+            *amps, lsb_db, usb_db, 20 * np.log10(m / 2) if m > 0 else -np.inf,
+            m_estimado, r['m_tonos'], m_estimado - m,
+            r['rms_am'], r['rms_envolvente'], amplitud * np.sqrt((1 + m**2 / 2) / 2),
+            tarea['intentos'], tarea['asentado'], tarea['perdidas'])
+
+
+# ============================================
+# BARRIDO
+# ============================================
+def rejilla(fcs, fms, ms, fs):
+    """Puntos (fc, fm, m) medibles: fm < fc y la banda superior bajo Nyquist del Arduino"""
+    puntos = []
+    for fc, fm, m in itertools.product(fcs, fms, ms):
+        if not 0 < fm < fc or fc + fm >= fs / 2:
+            print(f"⚠ Punto fuera de rango omitido: fc={fc}, fm={fm}")
+            continue
+        puntos.append((fc, fm, m))
+    return puntos
+
+
+def barrer(banco, puntos, ventana, calentamiento, asentamiento, procesos=None,
+           calibracion=ARCHIVO_CALIBRACION):
+    """Recorre los puntos y devuelve la tabla (puntos x COLUMNAS)"""
+    fs = banco.fs
+    n = int(round(ventana * fs))
+    margen = int(round(calentamiento * fs))
+    descartar = int(round(asentamiento * fs))
+
+    futuros = []
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar,
+                             initargs=({'calibracion': calibracion},)) as ejecutor:
+        try:
+            for i, (fc, fm, m) in enumerate(puntos, 1):
+                try:
+                    tabla = banco.generar(fc, fm, m)
+                except (ValueError, RuntimeError) as e:
+                    print(f"❌ [{i}/{len(puntos)}] fc={fc}, fm={fm}, m={m}: {e}")
+                    continue
+                datos, fs_medida, perdidas, intentos, estable = \
+                    capturar_asentada(banco, n, margen, descartar)
+                # El análisis corre en otro proceso mientras se adquiere el siguiente punto
+                futuros.append(ejecutor.submit(analizar_punto, {
+                    'fc': fc, 'fm': fm, 'm': m, 'fc_real': tabla.fc_real, 'fm_real': tabla.fm_real,
+                    'amplitud': banco.amplitud, 'fs': fs_medida, 'n': n, 'margen': margen,
+                    'datos': datos, 'perdidas': perdidas, 'intentos': intentos,
+                    'asentado': estable}))
+                aviso = "" if estable else " ⚠ sin asentar"
+                print(f"✓ [{i}/{len(puntos)}] fc={fc} Hz, fm={fm} Hz, m={m}: capturado "
+                      f"en {intentos} intento(s){aviso}")
+        finally:
+            banco.detener()
+        filas = []
+        for futuro in futuros:
+            try:
+                filas.append(futuro.result())
+            except Exception as e:
+                print(f"❌ Error en el análisis: {e}")
+    return np.array(filas, dtype=np.float64).reshape(-1, len(COLUMNAS))
+
+
+def guardar(ruta, tabla):
+    columnas = {nombre: tabla[:, j] for j, nombre in enumerate(COLUMNAS)}
+    if ruta.endswith('.csv'):
+        np.savetxt(ruta, tabla, delimiter=',', header=','.join(COLUMNAS), comments='', fmt='%.6g')
+    else:
+        np.savez(ruta, **columnas)
+
+
+def valores(texto):
+    """'a,b,c' o 'inicio:fin:paso' (fin incluido) -> lista de floats"""
+    if ':' in texto:
+        inicio, fin, paso = (float(v) for v in texto.split(':'))
+        return list(np.round(np.arange(inicio, fin + paso / 2, paso), 9))
+    return [float(v) for v in texto.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Barrido fc/fm/m: genera con el ESP32, mide con el Arduino y tabula")
+    parser.add_argument('--fc', type=valores, default=[1000], help="Portadoras (Hz): a,b,c o ini:fin:paso")
+    parser.add_argument('--fm', type=valores, default=[50], help="Moduladoras (Hz)")
+    parser.add_argument('--m', type=valores, default=[0.5], help="Índices de modulación")
+    parser.add_argument('--salida', required=True, help=".npz (columnar) o .csv")
+    parser.add_argument('--esp32', default='COM9')
+    parser.add_argument('--arduino', default='COM7')
+    parser.add_argument('--baud', type=int, default=115200)
+    parser.add_argument('--fs', type=float, default=5000, help="fs nominal del Arduino (Hz)")
+    parser.add_argument('--offset', type=float, default=1.65, help="Offset DC del DAC (V)")
+    parser.add_argument('--amplitud', type=float, default=1.0, help="Amplitud de portadora (V)")
+    parser.add_argument('--ventana', type=float, default=2.0, help="Ventana analizada (s)")
+    parser.add_argument('--calentamiento', type=float, default=1.0,
+                        help="Segundos previos para asentar filtros (s)")
+    parser.add_argument('--asentamiento', type=float, default=0.5,
+                        help="Segundos descartados tras cambiar de punto (s)")
+    parser.add_argument('--procesos', type=int, default=None, help="Por defecto: núcleos")
+    parser.add_argument('--calibracion', default=ARCHIVO_CALIBRACION)
+    parser.add_argument('--simular', action='store_true', help="Sin hardware (FuenteSintetica)")
+    args = parser.parse_args(argv)
+
+    puntos = rejilla(args.fc, args.fm, args.m, args.fs)
+    if not puntos:
+        print("❌ Ningún punto de la rejilla es medible")
+        return 1
+
+    if args.simular:
+        banco = BancoSimulado(args.fs, args.offset, args.amplitud)
+    else:
+        especificaciones = {
+            'ESP32': dict(puerto=args.esp32, baud=args.baud, senal_listo=LISTO_ESP32),
+            'Arduino': dict(puerto=args.arduino, baud=args.baud, senal_listo=CUALQUIER_DATO),
+        }
+        abiertos = {}
+        for nombre, futuro in abrir_puertos(especificaciones).items():
+            try:
+                abiertos[nombre] = futuro.result()
+            except Exception as e:
+                print(f"❌ Error al conectar {nombre}: {e}")
+        if len(abiertos) < len(especificaciones):
+            for ser in abiertos.values():
+                ser.close()
+            return 1
+        banco = BancoAM(abiertos['ESP32'], abiertos['Arduino'], args.fs, args.offset, args.amplitud)
+
+    inicio = time.perf_counter()
+    try:
+        tabla = barrer(banco, puntos, args.ventana, args.calentamiento, args.asentamiento,
+                       args.procesos, args.calibracion)
+    finally:
+        banco.cerrar()
+    guardar(args.salida, tabla)
+    print(f"✓ {len(tabla)} de {len(puntos)} puntos en {time.perf_counter() - inicio:.1f} s "
+          f"-> {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import numpy as np
+
+# ============================================
+# BUFFER CIRCULAR DE MUESTRAS (float32)
+# ============================================
+# Reemplaza a deque(maxlen=N): un solo productor (hilo leer_serial) escribe
+# y un solo consumidor (timer de la GUI) lee, sin locks.
+#
+# El productor copia primero los datos y SOLO DESPUÉS avanza el contador
+# total_escrito, así el consumidor nunca ve muestras a medio escribir.
+# La capacidad se reserva con holgura sobre N para que el productor pueda
+# seguir escribiendo mientras el consumidor procesa la ventana leída.
+#
+# Con canales=C el anillo es 2-D (C x capacidad): se escriben bloques C x k
+# y ultimos() devuelve C x n. Todos los índices van sobre el último eje.
+
+HOLGURA_POR_DEFECTO = 0.5  # 50% extra sobre la ventana pedida
+
+
+class BufferCircular:
+    def __init__(self, capacidad, dtype=np.float32, datos=None, estado=None, canales=None):
+        """Crea el buffer; datos/estado permiten usar memoria externa (ej. compartida).
+
+        canales=None: una sola señal (1-D); canales=C: anillo C x capacidad.
+        """
+        self.capacidad = int(capacidad)
+        self.canales = canales
+        forma = (self.capacidad,) if canales is None else (int(canales), self.capacidad)
+        if datos is None:
+            datos = np.zeros(forma, dtype=dtype)
+        if estado is None:
+            estado = np.zeros(1, dtype=np.int64)
+        self._datos = datos
+        self._estado = estado            # [0] = total de muestras escritas (por canal)
+        self._temporal = np.empty(forma, dtype=self._datos.dtype)
+
+    @classmethod
+    def para_ventana(cls, n, holgura=HOLGURA_POR_DEFECTO, dtype=np.float32, canales=None):
+        """Crea un buffer capaz de entregar las últimas n muestras con holgura"""
+        return cls(int(n * (1 + holgura)), dtype=dtype, canales=canales)
+
+    # ---------- Memoria externa (multiprocessing.shared_memory) ----------
+    # Disposición: [int64 total_escrito][canales * capacidad * dtype]
+    @staticmethod
+    def bytes_necesarios(capacidad, dtype=np.float32, canales=None):
+        return 8 + (canales or 1) * int(capacidad) * np.dtype(dtype).itemsize
+
+    @classmethod
+    def desde_memoria(cls, memoria, capacidad, dtype=np.float32, canales=None):
+        """Crea el buffer sobre un bloque de memoria ya reservado (ej. shm.buf)"""
+        forma = (int(capacidad),) if canales is None else (int(canales), int(capacidad))
+        estado = np.ndarray((1,), dtype=np.int64, buffer=memoria, offset=0)
+        datos = np.ndarray(forma, dtype=dtype, buffer=memoria, offset=8)
+        return cls(capacidad, dtype=dtype, datos=datos, estado=estado, canales=canales)
+
+    # ---------- Lado productor ----------
+    @property
+    def indice_escritura(self):
+        """Posición donde se escribirá la próxima muestra"""
+        return int(self._estado[0] % self.capacidad)
+
+    @property
+    def total_escrito(self):
+        return int(self._estado[0])
+
+    def agregar(self, valor):
+        """Agrega una sola muestra"""
+        total = int(self._estado[0])
+        self._datos[..., total % self.capacidad] = valor
+        self._estado[0] = total + 1
+
+    def escribir(self, valores):
+        """Agrega un bloque de muestras (como máximo una partición por el wraparound).
+
+        Con canales, valores es C x k (una fila por canal).
+        """
+        valores = np.asarray(valores, dtype=self._datos.dtype)
+        n = valores.shape[-1]
+        if n == 0:
+            return
+        if n > self.capacidad:
+            # Solo sobreviven las más recientes
+            valores = valores[..., -self.capacidad:]
+            total = int(self._estado[0]) + (n - self.capacidad)
+            n = self.capacidad
+        else:
+            total = int(self._estado[0])
+
+        inicio = total % self.capacidad
+        primera = min(n, self.capacidad - inicio)
+        self._datos[..., inicio:inicio + primera] = valores[..., :primera]
+        if primera < n:
+            self._datos[..., :n - primera] = valores[..., primera:]
+        self._estado[0] = total + n
+
+    # ---------- Lado consumidor ----------
+    @property
+    def disponibles(self):
+        """Muestras válidas guardadas (crece hasta la capacidad)"""
+        return min(int(self._estado[0]), self.capacidad)
+
+    def desde(self, total_anterior):
+        """Muestras escritas desde que total_escrito valía total_anterior.
+
+        Devuelve (muestras, total_actual, perdidas): si el productor dio más
+        de una vuelta, solo se entregan las últimas `capacidad` muestras y
+        perdidas indica cuántas se sobrescribieron antes de leerlas.
+        """
+        total = int(self._estado[0])
+        nuevas = total - int(total_anterior)
+        perdidas = max(0, nuevas - self.capacidad)
+        nuevas = min(nuevas, self.capacidad)
+        if nuevas <= 0:
+            return self._datos[..., :0], total, 0
+        return self._hasta(total, nuevas), total, perdidas
+
+    def ultimos(self, n, hasta=None):
+        """Devuelve las últimas n muestras en orden cronológico.
+
+        Si la ventana es contigua en memoria devuelve una vista (sin copia);
+        si cruza el final del arreglo hace una sola copia a un buffer temporal.
+        El resultado es válido hasta la siguiente llamada a ultimos()/desde().
+        hasta fija el final de la ventana en un total_escrito ya leído, para
+        que la ventana coincida con un conteo de muestras nuevas.
+        """
+        if hasta is None:
+            hasta = self._estado[0]
+        return self._hasta(int(hasta), n)
+
+    def _hasta(self, total, n):
+        """Las n muestras que terminan en la posición absoluta total"""
+        n = min(int(n), self.capacidad)
+        fin = total % self.capacidad
+        if fin >= n:
+            return self._datos[..., fin - n:fin]
+        if fin == 0:
+            return self._datos[..., self.capacidad - n:]
+
+        resto = n - fin
+        temporal = self._temporal[..., :n]
+        temporal[..., :resto] = self._datos[..., self.capacidad - resto:]
+        temporal[..., resto:] = self._datos[..., :fin]
+        return temporal
@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+
+# ============================================
+# CALIBRACIÓN RMS -> DISTANCIA
+# ============================================
+# Los modelos se leen de un archivo JSON en lugar de estar escritos en el
+# código, así se cambia de sensor sin editar los scripts:
+#
+# {
+#   "sensor": "...", "unidades": "cm",
+#   "modelos": {
+#     "logaritmica": {"tipo": "logaritmico", "a": -2.802, "b": -1.927, "rango": [0.05, 3.0]},
+#     "polinomica":  {"tipo": "polinomico", "coeficientes": [57.077, -44.634, 8.9461], "rango": [0, 3]}
+#   }
+# }
+#
+# Tipos: logaritmico (a*ln(x)+b), polinomico (np.polyval), lineal_tramos
+# (np.interp sobre nodos x/y) y spline (spline cúbico natural sobre nodos).
+# Todos se evalúan vectorizados; dentro de "rango" se usa una tabla densa
+# (LUT) con interpolación lineal, fuera de él la fórmula exacta.
+
+PUNTOS_LUT = 4096
+DIRECTORIO_CALIBRACIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'calibraciones')
+TIPOS = ('logaritmico', 'polinomico', 'lineal_tramos', 'spline')
+
+
+class ModeloCalibracion:
+    def __init__(self, tipo, rango=None, minimo=0.0, puntos_lut=PUNTOS_LUT, **parametros):
+        if tipo not in TIPOS:
+            raise ValueError(f"tipo de modelo desconocido: {tipo}")
+        self.tipo = tipo
+        self.parametros = parametros
+        self.minimo = minimo  # Distancia mínima permitida (None = sin límite)
+        self._spline = None
+        if tipo == 'spline':
+            from scipy.interpolate import CubicSpline
+            self._spline = CubicSpline(parametros['x'], parametros['y'], bc_type='natural')
+        if rango is None and tipo in ('lineal_tramos', 'spline'):
+            rango = (min(parametros['x']), max(parametros['x']))
+        self.rango = tuple(rango) if rango is not None else None
+
+        # Tabla densa precalculada sobre el rango de trabajo
+        self._lut_x = self._lut_y = None
+        if self.rango is not None and puntos_lut:
+            self._lut_x = np.linspace(self.rango[0], self.rango[1], int(puntos_lut))
+            self._lut_y = self._formula(self._lut_x)
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(**datos)
+
+    def a_dict(self):
+        datos = {'tipo': self.tipo, **self.parametros, 'minimo': self.minimo}
+        if self.rango is not None:
+            datos['rango'] = [float(v) for v in self.rango]
+        return datos
+
+    def _formula(self, x):
+        p = self.parametros
+        if self.tipo == 'logaritmico':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                y = p['a'] * np.log(x) + p['b']
+            return np.where(x > 0, y, np.inf)  # Sin voltaje: distancia infinita
+        if self.tipo == 'polinomico':
+            return np.polyval(p['coeficientes'], x)
+        if self.tipo == 'lineal_tramos':
+            return np.interp(x, p['x'], p['y'])
+        return self._spline(x)
+
+    def evaluar(self, x):
+        """Distancia para un escalar o un arreglo de voltajes RMS"""
+        escalar = np.ndim(x) == 0
+        x = np.asarray(x, dtype=np.float64)
+        if self._lut_x is None:
+            y = self._formula(x)
+        else:
+            y = np.interp(x, self._lut_x, self._lut_y)
+            fuera = (x < self.rango[0]) | (x > self.rango[1])
+            if np.any(fuera):
+                y = np.where(fuera, self._formula(x), y)
+        if self.minimo is not None:
+            y = np.maximum(y, self.minimo)  # No permitir distancias negativas
+        return float(y) if escalar else y
+
+    __call__ = evaluar
+
+    def descripcion(self):
+        """Fórmula legible para el panel de la GUI"""
+        p = self.parametros
+        if self.tipo == 'logaritmico':
+            return f"y = {p['a']:.3f}·ln(x) {p['b']:+.3f}"
+        if self.tipo == 'polinomico':
+            grado = len(p['coeficientes']) - 1
+            terminos = []
+            for k, c in enumerate(p['coeficientes']):
+                potencia = grado - k
+                x = '' if potencia == 0 else ('x' if potencia == 1 else f'x^{potencia}')
+                terminos.append(f"{c:+.4g}{x}")
+            return "y = " + " ".join(terminos)
+        return f"{self.tipo} ({len(p['x'])} nodos)"
+
+
+# ============================================
+# ARCHIVOS DE CALIBRACIÓN
+# ============================================
+def cargar_calibracion(ruta):
+    """Lee un archivo JSON y devuelve {nombre: ModeloCalibracion}"""
+    if not os.path.isabs(ruta) and not os.path.exists(ruta):
+        ruta = os.path.join(DIRECTORIO_CALIBRACIONES, ruta)
+    with open(ruta, encoding='utf-8') as f:
+        datos = json.load(f)
+    return {nombre: ModeloCalibracion.desde_dict(modelo)
+            for nombre, modelo in datos['modelos'].items()}
+
+
+def guardar_calibracion(ruta, modelos, sensor='', unidades='cm'):
+    datos = {
+        'sensor': sensor,
+        'unidades': unidades,
+        'modelos': {nombre: modelo.a_dict() for nombre, modelo in modelos.items()},
+    }
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+
+
+# ============================================
+# AJUSTE A PARTIR DE MEDICIONES (RMS, DISTANCIA)
+# ============================================
+def ajustar(rms, distancia, tipo, grado=2):
+    """Ajusta un modelo a pares medidos (rms, distancia)"""
+    rms = np.asarray(rms, dtype=np.float64)
+    distancia = np.asarray(distancia, dtype=np.float64)
+    rango = [float(rms.min()), float(rms.max())]
+
+    if tipo == 'logaritmico':
+        validos = rms > 0
+        a, b = np.polyfit(np.log(rms[validos]), distancia[validos], 1)
+        rango = [float(rms[validos].min()), rango[1]]  # ln(x) no existe en 0
+        return ModeloCalibracion('logaritmico', rango=rango, a=float(a), b=float(b))
+    if tipo == 'polinomico':
+        coeficientes = np.polyfit(rms, distancia, grado)
+        return ModeloCalibracion('polinomico', rango=rango, coeficientes=coeficientes.tolist())
+
+    # Nodos: promedio de las distancias medidas en cada RMS repetido
+    x, inverso = np.unique(rms, return_inverse=True)
+    y = np.bincount(inverso, weights=distancia) / np.bincount(inverso)
+    if tipo in ('lineal_tramos', 'spline'):
+        return ModeloCalibracion(tipo, x=x.tolist(), y=y.tolist())
+    raise ValueError(f"tipo de modelo desconocido: {tipo}")
+
+
+def error_rms(modelo, rms, distancia):
+    return float(np.sqrt(np.mean((modelo.evaluar(np.asarray(rms)) - distancia) ** 2)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Ajusta un modelo RMS -> distancia a partir de un CSV (columnas: rms, distancia)")
+    parser.add_argument('csv', help="Archivo CSV con mediciones")
+    parser.add_argument('--tipo', choices=TIPOS, default='polinomico')
+    parser.add_argument('--grado', type=int, default=2, help="Grado del polinomio")
+    parser.add_argument('--nombre', default=None, help="Nombre del modelo dentro del archivo")
+    parser.add_argument('--salida', required=True, help="Archivo JSON de calibración")
+    parser.add_argument('--sensor', default='')
+    args = parser.parse_args(argv)
+
+    datos = np.genfromtxt(args.csv, delimiter=',', names=True)
+    modelo = ajustar(datos['rms'], datos['distancia'], args.tipo, args.grado)
+
+    # Agregar al archivo existente sin borrar los otros modelos
+    modelos = cargar_calibracion(args.salida) if os.path.exists(args.salida) else {}
+    modelos[args.nombre or args.tipo] = modelo
+    guardar_calibracion(args.salida, modelos, sensor=args.sensor)
+
+    print(f"✓ Modelo '{args.nombre or args.tipo}' guardado en {args.salida}")
+    print(f"  {modelo.descripcion()}")
+    print(f"  Error RMS del ajuste: {error_rms(modelo, datos['rms'], datos['distancia']):.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
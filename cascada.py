@@ -0,0 +1,105 @@
+import numpy as np
+import pyqtgraph as pg
+
+# ============================================
+# CASCADA (ESPECTROGRAMA DESPLAZABLE)
+# ============================================
+# Historia de espectros en un anillo uint8 preasignado, dibujada con un
+# solo pg.ImageItem y una LUT de colores calculada una vez (nada de curvas
+# por espectro):
+#   - Cada espectro nuevo (un salto de EspectroWelch) se pasa a dB relativos
+#     a su máximo, se cuantiza a 0..255 y ocupa UNA fila.
+#   - El anillo tiene el doble de las filas visibles y cada fila se escribe
+#     dos veces (i e i + filas): las últimas `filas` quedan siempre contiguas
+#     y se entregan a la imagen como vista, sin np.roll ni arreglos nuevos.
+#   - Solo se guardan los bins hasta f_max (lo que se ve en la gráfica).
+
+FILAS = 1500          # Espectros visibles (a 5 kHz con salto 1024: ~5 min)
+RANGO_DB = 60.0       # dB bajo el máximo de cada espectro que cubre la escala
+PARADAS_LUT = (       # Posición en la escala -> color RGB
+    (0.00, (0, 0, 0)),
+    (0.25, (40, 0, 110)),
+    (0.50, (190, 30, 90)),
+    (0.75, (250, 140, 0)),
+    (1.00, (255, 255, 200)),
+)
+
+
+def crear_lut(paradas=PARADAS_LUT, n=256):
+    """LUT n x 3 (uint8) interpolando linealmente entre las paradas"""
+    posiciones = [p for p, _ in paradas]
+    x = np.linspace(0.0, 1.0, n)
+    lut = np.empty((n, 3), dtype=np.uint8)
+    for canal in range(3):
+        lut[:, canal] = np.round(np.interp(x, posiciones, [color[canal] for _, color in paradas]))
+    return lut
+
+
+class AnilloCascada:
+    def __init__(self, n_bins, filas=FILAS, rango_db=RANGO_DB):
+        self.n_bins = int(n_bins)
+        self.filas = int(filas)
+        self.rango_db = rango_db
+        self._anillo = np.zeros((2 * self.filas, self.n_bins), dtype=np.uint8)
+        self.total = 0
+
+    def reiniciar(self):
+        self._anillo[:] = 0
+        self.total = 0
+
+    def agregar(self, potencias):
+        """potencias: filas (k x >= n_bins) en orden cronológico"""
+        p = np.atleast_2d(potencias)[-self.filas:, :self.n_bins]
+        k = len(p)
+        if k == 0:
+            return
+        # dB relativos al máximo de cada fila: [-rango_db, 0] -> [0, 255]
+        maximos = np.maximum(p.max(axis=1, keepdims=True), 1e-24)
+        db = 10 * np.log10(p / maximos + 1e-12)
+        niveles = np.clip((db / self.rango_db + 1.0) * 255, 0, 255).astype(np.uint8)
+        indices = (self.total + np.arange(k)) % self.filas
+        self._anillo[indices] = niveles
+        self._anillo[indices + self.filas] = niveles
+        self.total += k
+
+    def vista(self):
+        """Últimas `filas` filas contiguas (la primera es la más vieja), sin copia"""
+        i = self.total % self.filas
+        return self._anillo[i:i + self.filas]
+
+
+class VistaCascada:
+    """Cascada en una gráfica de pyqtgraph: x = frecuencia (Hz), y = tiempo (s, 0 = ahora)"""
+
+    def __init__(self, plot, frecuencias, f_max, segundos_por_fila, filas=FILAS, rango_db=RANGO_DB):
+        self.n_bins = int(np.searchsorted(frecuencias, f_max, side='right'))
+        self.anillo = AnilloCascada(self.n_bins, filas, rango_db)
+        self._ultimo_segmento = 0
+
+        self.imagen = pg.ImageItem(axisOrder='row-major')
+        self.imagen.setImage(self.anillo.vista(), autoLevels=False, levels=(0, 255), lut=crear_lut())
+        plot.addItem(self.imagen)
+
+        # Un píxel = un bin x un salto; la fila más nueva termina en t = 0
+        df = frecuencias[1] - frecuencias[0]
+        duracion = filas * segundos_por_fila
+        self.imagen.setRect(pg.QtCore.QRectF(-df / 2, -duracion, self.n_bins * df, duracion))
+        plot.setXRange(0, f_max)
+        plot.setYRange(-duracion, 0)
+
+    def actualizar(self, recientes, segmentos):
+        """Agrega los espectros nuevos; recientes = últimas filas de potencia
+        (la última es la más nueva) y segmentos = contador de EspectroWelch.
+
+        Devuelve True si la imagen cambió.
+        """
+        nuevos = segmentos - self._ultimo_segmento
+        if nuevos < 0:
+            nuevos = segmentos  # El espectro se reinició
+        self._ultimo_segmento = segmentos
+        nuevos = min(nuevos, len(recientes))
+        if nuevos <= 0:
+            return False
+        self.anillo.agregar(recientes[-nuevos:])
+        self.imagen.setImage(self.anillo.vista(), autoLevels=False)
+        return True
@@ -0,0 +1,194 @@
+import numpy as np
+
+# ============================================
+# DIEZMADO MIN/MAX PARA GRÁFICAS
+# ============================================
+# datos[::step] hace aliasing de la portadora de 1 kHz (aparecen batidos
+# falsos) y aun así manda más puntos que píxeles. Aquí cada columna de
+# píxeles se dibuja con el mínimo y el máximo de sus muestras, en el orden
+# en que ocurren: la traza queda fiel con ~2 puntos por píxel sin importar
+# el largo de la ventana o fs.
+#
+# PiramideMinMax guarda (min, max, max_primero) por cubeta para tamaños
+# base, 2*base, 4*base... en anillos alineados al contador absoluto de
+# muestras. Al llegar muestras nuevas solo se recalculan las cubetas que
+# las contienen; al dibujar se toma el nivel más cercano al tamaño de
+# columna y se agrupa con reshape.
+
+BASE = 8          # Muestras por cubeta en el nivel 0
+ANCHO_MIN = 64    # Columnas mínimas que debe poder dar el nivel más alto
+
+
+def _combinar(mn_a, mx_a, f_a, mn_b, mx_b, f_b, existe_b):
+    """Une cubetas consecutivas a (izquierda) y b (derecha)"""
+    min_der = existe_b & (mn_b < mn_a)
+    max_der = existe_b & (mx_b > mx_a)
+    mn = np.where(min_der, mn_b, mn_a)
+    mx = np.where(max_der, mx_b, mx_a)
+    # Si min y max salen de la misma cubeta se hereda su orden;
+    # si no, el máximo va primero cuando está a la izquierda
+    f = np.where(min_der == max_der, np.where(min_der, f_b, f_a), ~max_der)
+    return mn, mx, f
+
+
+def _agrupar(mn, mx, f, g):
+    """Reduce grupos de g cubetas consecutivas (el último puede quedar incompleto)"""
+    if g <= 1:
+        return mn, mx, f
+    resto = (-len(mn)) % g
+    if resto:
+        # Repetir la última cubeta no cambia ni el min ni el max del grupo
+        mn = np.concatenate((mn, np.repeat(mn[-1:], resto)))
+        mx = np.concatenate((mx, np.repeat(mx[-1:], resto)))
+        f = np.concatenate((f, np.repeat(f[-1:], resto)))
+    mn, mx, f = mn.reshape(-1, g), mx.reshape(-1, g), f.reshape(-1, g)
+    i_min = np.argmin(mn, axis=1)
+    i_max = np.argmax(mx, axis=1)
+    filas = np.arange(len(mn))
+    primero = np.where(i_min == i_max, f[filas, i_max], i_max < i_min)
+    return mn[filas, i_min], mx[filas, i_max], primero
+
+
+def _intercalar(mn, mx, f, centros, desplazamiento=0.0):
+    """(x, y) con dos puntos por columna en orden temporal"""
+    y = np.empty(2 * len(mn))
+    y[0::2] = np.where(f, mx, mn)
+    y[1::2] = np.where(f, mn, mx)
+    x = np.repeat(centros, 2)
+    return x, y - desplazamiento
+
+
+def minmax_columnas(datos, ancho, desplazamiento=0.0):
+    """Diezma un arreglo completo a como mucho `ancho` columnas min/max.
+
+    Devuelve (x, y) con x en índices de muestra; si hay menos muestras que
+    2*ancho se devuelven tal cual.
+    """
+    datos = np.asarray(datos)
+    n = len(datos)
+    ancho = max(1, int(ancho))
+    if n <= 2 * ancho:
+        return np.arange(n), datos - desplazamiento
+    k = -(-n // ancho)               # Muestras por columna (techo)
+    completas = n // k
+    filas = datos[:completas * k].reshape(completas, k)
+    i_min = np.argmin(filas, axis=1)
+    i_max = np.argmax(filas, axis=1)
+    indices = np.arange(completas)
+    mn, mx, f = filas[indices, i_min], filas[indices, i_max], i_max < i_min
+    if completas * k < n:
+        cola = datos[completas * k:]
+        mn = np.append(mn, cola.min())
+        mx = np.append(mx, cola.max())
+        f = np.append(f, np.argmax(cola) < np.argmin(cola))
+    centros = np.minimum(np.arange(len(mn)) * k + k / 2, n - 1)
+    return _intercalar(mn, mx, f, centros, desplazamiento)
+
+
+class PiramideMinMax:
+    def __init__(self, capacidad, base=BASE):
+        """capacidad = muestras más recientes que se pueden dibujar"""
+        self.capacidad = int(capacidad)
+        self.base = int(base)
+        self.tamanos = [self.base]
+        while self.capacidad // self.tamanos[-1] > ANCHO_MIN:
+            self.tamanos.append(2 * self.tamanos[-1])
+        self.reiniciar()
+
+    def reiniciar(self, total=0):
+        self.total = total
+        self._valido_desde = total   # Antes de esto las cubetas no tienen datos
+        self._niveles = []
+        for tamano in self.tamanos:
+            largo = self.capacidad // tamano + 2
+            # +inf/-inf: una cubeta vacía nunca gana al combinar
+            self._niveles.append((np.full(largo, np.inf), np.full(largo, -np.inf),
+                                  np.zeros(largo, dtype=bool)))
+
+    def agregar(self, muestras):
+        """Actualiza solo las cubetas que tocan las muestras nuevas"""
+        x = np.asarray(muestras, dtype=np.float64)
+        if x.size > self.capacidad:
+            # Lo anterior ya no se puede dibujar: empezar de nuevo
+            self.reiniciar(self.total + x.size - self.capacidad)
+            x = x[-self.capacidad:]
+        n = x.size
+        if n == 0:
+            return
+        inicio = self.total
+        self._agregar_base(x, inicio)
+        self.total += n
+
+        # Niveles superiores: cada cubeta es la unión de dos del nivel de abajo
+        for j in range(1, len(self.tamanos)):
+            primera = inicio // self.tamanos[j]
+            ultima = (self.total - 1) // self.tamanos[j]
+            cubetas = np.arange(primera, ultima + 1)
+            hijos_izq = 2 * cubetas
+            hijos_der = 2 * cubetas + 1
+            ultimo_hijo = (self.total - 1) // self.tamanos[j - 1]
+            mn_h, mx_h, f_h = self._niveles[j - 1]
+            largo_h = len(mn_h)
+            iz, de = hijos_izq % largo_h, hijos_der % largo_h
+            mn, mx, f = _combinar(mn_h[iz], mx_h[iz], f_h[iz],
+                                  mn_h[de], mx_h[de], f_h[de], hijos_der <= ultimo_hijo)
+            nivel_mn, nivel_mx, nivel_f = self._niveles[j]
+            destino = cubetas % len(nivel_mn)
+            nivel_mn[destino], nivel_mx[destino], nivel_f[destino] = mn, mx, f
+
+    def _agregar_base(self, x, inicio):
+        s = self.base
+        mn_0, mx_0, f_0 = self._niveles[0]
+        largo = len(mn_0)
+        pos = 0
+        parcial = inicio % s
+        if parcial:
+            # Completar la cubeta que quedó a medias
+            k = min(s - parcial, x.size)
+            tramo = x[:k]
+            b = (inicio // s) % largo
+            mn, mx, f = _combinar(mn_0[b:b + 1], mx_0[b:b + 1], f_0[b:b + 1],
+                                  tramo.min(keepdims=True), tramo.max(keepdims=True),
+                                  np.array([np.argmax(tramo) < np.argmin(tramo)]), np.array([True]))
+            mn_0[b], mx_0[b], f_0[b] = mn[0], mx[0], f[0]
+            pos = k
+        resto = x[pos:]
+        if resto.size == 0:
+            return
+        n_cubetas = -(-resto.size // s)
+        relleno = n_cubetas * s - resto.size
+        if relleno:
+            # La última cubeta queda incompleta: repetir su última muestra no
+            # cambia min/max y la próxima llamada la completa
+            resto = np.concatenate((resto, np.repeat(resto[-1:], relleno)))
+        filas = resto.reshape(n_cubetas, s)
+        i_min = np.argmin(filas, axis=1)
+        i_max = np.argmax(filas, axis=1)
+        indices = np.arange(n_cubetas)
+        destino = ((inicio + pos) // s + indices) % largo
+        mn_0[destino] = filas[indices, i_min]
+        mx_0[destino] = filas[indices, i_max]
+        f_0[destino] = i_max < i_min
+
+    def columnas(self, n, ancho, desplazamiento=0.0):
+        """(x, y) de las últimas n muestras en como mucho ~ancho columnas.
+
+        x va de 0 a n (posición dentro de la ventana). Devuelve None si la
+        ventana pide menos de base muestras por columna (usar los datos crudos).
+        """
+        n = min(int(n), self.total - self._valido_desde, self.capacidad)
+        ancho = max(1, int(ancho))
+        por_columna = n / ancho
+        if n == 0 or por_columna < self.base:
+            return None
+        j = max(i for i, tamano in enumerate(self.tamanos) if tamano <= por_columna)
+        s = self.tamanos[j]
+        inicio = self.total - n
+        primera, ultima = inicio // s, (self.total - 1) // s
+        cubetas = np.arange(primera, ultima + 1)
+        mn_j, mx_j, f_j = self._niveles[j]
+        indices = cubetas % len(mn_j)
+        g = max(1, int(np.ceil(len(cubetas) / ancho)))
+        mn, mx, f = _agrupar(mn_j[indices], mx_j[indices], f_j[indices], g)
+        centros = np.clip(primera * s + (np.arange(len(mn)) * g + g / 2) * s - inicio, 0, n - 1)
+        return _intercalar(mn, mx, f, centros, desplazamiento)
@@ -0,0 +1,140 @@
+import numpy as np
+from scipy.signal import convolve, lfilter, sosfiltfilt
+
+from buffer_circular import BufferCircular
+from filtros import FiltroSOS
+
+# ============================================
+# DETECTOR DE ENVOLVENTE INCREMENTAL
+# ============================================
+# Procesa solo los bloques nuevos en lugar de recalcular hilbert() +
+# sosfiltfilt() sobre toda la ventana en cada frame:
+#   1) Quita DC con un promedio exponencial (estado continuo entre bloques)
+#   2) Transformador de Hilbert FIR con overlap-save (se guardan taps-1 muestras)
+#   3) |señal analítica| y pasa-bajos causal (FiltroSOS, estado persistente)
+# La envolvente se guarda en un buffer circular de n_ventana muestras.
+#
+# modo='fase_cero' reemplaza el paso 3 por sosfiltfilt sobre el bloque más
+# un margen de `latencia` muestras a cada lado: sin distorsión de fase a
+# cambio de una latencia fija.
+#
+# Con canales=C los bloques son C x k y cada paso corre sobre todos los
+# canales en una sola llamada (filtros y FIR sobre el último eje).
+#
+# El pasa-bajos puede ser un arreglo SOS o un FiltroSOS de un BancoFiltros:
+# en ese caso resintonizarlo desde el banco cambia la envolvente sin saltos.
+
+TAPS_HILBERT = 101           # Impar (FIR tipo III)
+FC_DC = 0.5                  # Hz - corte del removedor de DC
+LATENCIA_FASE_CERO = 512     # Muestras de margen en modo fase_cero
+
+
+def disenar_hilbert(taps=TAPS_HILBERT):
+    """FIR de Hilbert por ventana (Blackman): h[n] = 2/(pi*n) para n impar"""
+    if taps % 2 == 0:
+        raise ValueError("taps debe ser impar")
+    n = np.arange(taps) - (taps - 1) // 2
+    h = np.zeros(taps)
+    impares = n % 2 != 0
+    h[impares] = 2.0 / (np.pi * n[impares])
+    return h * np.blackman(taps)
+
+
+class EnvolventeIncremental:
+    def __init__(self, pasabajos, fs, n_ventana, taps_hilbert=TAPS_HILBERT,
+                 modo='causal', latencia=LATENCIA_FASE_CERO, fc_dc=FC_DC, canales=None):
+        if modo not in ('causal', 'fase_cero'):
+            raise ValueError(f"modo desconocido: {modo}")
+        self.fs = fs
+        self.n_ventana = n_ventana
+        self.canales = canales
+        if not isinstance(pasabajos, FiltroSOS):
+            pasabajos = FiltroSOS(pasabajos, canales)
+        self.pasabajos = pasabajos
+        self._forma = () if canales is None else (int(canales),)
+        self.modo = modo
+        self.latencia = int(latencia) if modo == 'fase_cero' else 0
+        self._h = disenar_hilbert(taps_hilbert)
+        self._fc_dc = fc_dc
+        self._alfa = 1.0 - np.exp(-2 * np.pi * fc_dc / fs)
+        self.reiniciar()
+
+    @property
+    def retardo(self):
+        """Retardo total (muestras) entre la entrada y la envolvente emitida"""
+        return (len(self._h) - 1) // 2 + self.latencia
+
+    @property
+    def sos(self):
+        return self.pasabajos.sos
+
+    def cambiar_filtro(self, sos):
+        """Nuevo pasa-bajos sin saltos en la envolvente"""
+        self.pasabajos.cambiar(sos)
+
+    def ajustar_fs(self, fs, sos=None):
+        """Cambia fs (y el pasa-bajos, si se da uno rediseñado) sin perder el estado.
+
+        Para cambios chicos de fs el estado de los filtros sigue siendo válido.
+        """
+        self.fs = fs
+        if sos is not None:
+            self.cambiar_filtro(sos)
+        self._alfa = 1.0 - np.exp(-2 * np.pi * self._fc_dc / fs)
+
+    def reiniciar(self):
+        """Descarta el estado (usar si se perdieron muestras)"""
+        self._historia = np.zeros(self._forma + (len(self._h) - 1,))
+        self._zi_dc = None
+        self.pasabajos.reiniciar()
+        self._cola = None
+        self.buffer = BufferCircular.para_ventana(self.n_ventana, dtype=np.float64,
+                                                  canales=self.canales)
+
+    def procesar(self, bloque):
+        """Agrega un bloque de muestras nuevas (C x k con canales) y devuelve su envolvente"""
+        x = np.asarray(bloque, dtype=np.float64)
+        k = x.shape[-1]
+        if k == 0:
+            return x
+
+        # 1) Remover DC: y[n] = a*x[n] + (1-a)*y[n-1]
+        if self._zi_dc is None:
+            self._zi_dc = (1 - self._alfa) * x[..., :1]
+        dc, self._zi_dc = lfilter([self._alfa], [1.0, self._alfa - 1.0], x, zi=self._zi_dc)
+        x = x - dc
+
+        # 2) Hilbert FIR: la historia hace de solapamiento entre bloques
+        extendida = np.concatenate((self._historia, x), axis=-1)
+        if extendida.ndim == 1:
+            imaginaria = np.convolve(extendida, self._h, mode='valid')
+        else:
+            imaginaria = convolve(extendida, self._h[np.newaxis], mode='valid')
+        m = (len(self._h) - 1) // 2
+        real = extendida[..., m:m + k]  # Misma demora que el FIR
+        self._historia = extendida[..., -(len(self._h) - 1):]
+        crudo = np.hypot(real, imaginaria)
+
+        # 3) Pasa-bajos de la envolvente
+        if self.modo == 'causal':
+            envolvente = self.pasabajos.filtrar(crudo)
+        else:
+            envolvente = self._filtrar_fase_cero(crudo)
+
+        self.buffer.escribir(envolvente)
+        return envolvente
+
+    def _filtrar_fase_cero(self, crudo):
+        """sosfiltfilt con `latencia` muestras de contexto a cada lado"""
+        lat = self.latencia
+        if self._cola is None:
+            self._cola = np.repeat(crudo[..., :1], 2 * lat, axis=-1)
+        extendida = np.concatenate((self._cola, crudo), axis=-1)
+        filtrada = sosfiltfilt(self.sos, extendida)
+        self._cola = extendida[..., -2 * lat:]
+        # Se emiten las muestras que ya tienen `lat` de contexto futuro
+        return filtrada[..., lat:lat + crudo.shape[-1]]
+
+    def ventana(self, n=None):
+        """Últimas n muestras de envolvente (por defecto n_ventana)"""
+        return self.buffer.ultimos(self.n_ventana if n is None else n)
@@ -0,0 +1,128 @@
+from functools import lru_cache
+
+import numpy as np
+
+# ============================================
+# MOTOR DE ESPECTRO (rfft + Welch deslizante)
+# ============================================
+# - Ventanas de Hanning y ejes de frecuencia se calculan una vez por longitud
+# - rfft en lugar de fft: no se calcula la mitad negativa del espectro
+# - EspectroWelch recibe bloques de muestras; cada `salto` muestras calcula
+#   el espectro de un segmento y actualiza un promedio móvil de los últimos
+#   n_promedios segmentos (suma acumulada: se resta el más viejo y se suma
+#   el nuevo). Los mismos segmentos alimentan un historial para espectrograma.
+
+
+@lru_cache(maxsize=16)
+def ventana_hanning(n):
+    ventana = np.hanning(n)
+    ventana.setflags(write=False)
+    return ventana
+
+
+@lru_cache(maxsize=16)
+def frecuencias_rfft(n, fs):
+    freqs = np.fft.rfftfreq(n, d=1.0 / fs)
+    freqs.setflags(write=False)
+    return freqs
+
+
+def espectro_magnitud(datos, fs):
+    """|rfft| de datos (sin DC, con ventana de Hanning) y su eje de frecuencias.
+
+    Con datos C x n se calcula el espectro de cada fila en una sola rfft.
+    """
+    datos = np.asarray(datos)
+    n = datos.shape[-1]
+    ventaneados = (datos - np.mean(datos, axis=-1, keepdims=True)) * ventana_hanning(n)
+    return frecuencias_rfft(n, fs), np.abs(np.fft.rfft(ventaneados, axis=-1))
+
+
+class EspectroWelch:
+    def __init__(self, fs, n_segmento=4096, salto=1024, n_promedios=8, n_historia=64):
+        self.fs = fs
+        self.n_segmento = int(n_segmento)
+        self.salto = int(salto)
+        self.n_promedios = int(n_promedios)
+        self.n_historia = int(n_historia)
+        self.frecuencias = frecuencias_rfft(self.n_segmento, fs)
+        self.n_bins = len(self.frecuencias)
+        self._ventana = ventana_hanning(self.n_segmento)
+        self.reiniciar()
+
+    def ajustar_fs(self, fs):
+        """Nueva fs: solo cambia el eje de frecuencias (las potencias siguen valiendo)"""
+        self.fs = fs
+        self.frecuencias = frecuencias_rfft(self.n_segmento, fs)
+
+    def reiniciar(self):
+        self._entrada = np.zeros(self.n_segmento)      # Último segmento completo
+        self._pendientes = np.empty(0)                 # Muestras sin completar salto
+        self._llenas = 0                               # Muestras reales en _entrada
+        self._potencias = np.zeros((self.n_promedios, self.n_bins))
+        self._suma = np.zeros(self.n_bins)
+        self._historia = np.zeros((self.n_historia, self.n_bins))
+        self.segmentos = 0                             # Segmentos calculados
+
+    def agregar(self, bloque):
+        """Agrega muestras; devuelve las filas de potencia nuevas (k x n_bins)"""
+        datos = np.concatenate((self._pendientes, np.asarray(bloque, dtype=np.float64)))
+        n_saltos = len(datos) // self.salto
+        self._pendientes = datos[n_saltos * self.salto:]
+        filas = []
+
+        for k in range(n_saltos):
+            self._entrada[:-self.salto] = self._entrada[self.salto:]
+            self._entrada[-self.salto:] = datos[k * self.salto:(k + 1) * self.salto]
+            self._llenas = min(self._llenas + self.salto, self.n_segmento)
+            if self._llenas == self.n_segmento:  # Ya hay un segmento completo
+                filas.append(self._agregar_segmento())
+        return np.array(filas).reshape(-1, self.n_bins)
+
+    def _agregar_segmento(self):
+        segmento = (self._entrada - np.mean(self._entrada)) * self._ventana
+        potencia = np.abs(np.fft.rfft(segmento)) ** 2
+
+        fila = self.segmentos % self.n_promedios
+        self._suma += potencia - self._potencias[fila]
+        self._potencias[fila] = potencia
+        self._historia[self.segmentos % self.n_historia] = potencia
+        self.segmentos += 1
+        if fila == self.n_promedios - 1:
+            # Recalcular la suma cada vuelta para no acumular error de redondeo
+            self._suma = self._potencias.sum(axis=0)
+        return potencia
+
+    @property
+    def listo(self):
+        return self.segmentos > 0
+
+    def potencia_promedio(self):
+        """Promedio de Welch de los segmentos disponibles"""
+        n = min(self.segmentos, self.n_promedios)
+        if n == 0:
+            return np.zeros(self.n_bins)
+        return self._suma / n
+
+    def magnitud(self):
+        """Magnitud promediada (raíz de la potencia de Welch)"""
+        return np.sqrt(np.maximum(self.potencia_promedio(), 0.0))
+
+    def recientes(self, k):
+        """Últimas k filas de potencia (la última es la más nueva; ceros si aún no hay)"""
+        k = min(int(k), self.n_historia)
+        indices = (self.segmentos - k + np.arange(k)) % self.n_historia
+        filas = self._historia[indices]
+        faltan = k - min(self.segmentos, k)
+        if faltan:
+            filas[:faltan] = 0.0
+        return filas
+
+    def espectrograma(self, db=True):
+        """Historial de espectros (filas en orden cronológico, la última es la más nueva)"""
+        n = min(self.segmentos, self.n_historia)
+        inicio = self.segmentos % self.n_historia
+        filas = np.roll(self._historia, -inicio, axis=0)[self.n_historia - n:]
+        if db:
+            return 10 * np.log10(filas + 1e-24)
+        return filas
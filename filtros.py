@@ -0,0 +1,146 @@
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import butter, sosfilt, sosfilt_zi
+
+from buffer_circular import BufferCircular
+
+# ============================================
+# BANCO DE FILTROS CON DISEÑO EN CACHÉ
+# ============================================
+# - disenar(tipo, orden, corte, fs): butter() en SOS memoizado por
+#   (tipo, orden, corte, fs). Volver a un ajuste ya usado no rediseña nada.
+# - FiltroSOS: sosfilt por bloques con estado persistente. cambiar(sos)
+#   reemplaza el diseño sin saltos: el estado nuevo se obtiene pasando las
+#   últimas muestras de entrada por el filtro nuevo, como si siempre
+#   hubiera estado filtrando.
+# - BancoFiltros: filtros con nombre que comparten fs; se resintonizan en
+#   tiempo de ejecución (corte, orden, tipo o fs) sin reiniciar el programa.
+#
+# Todo en SOS: b, a de orden alto pierden precisión (polos cerca de z=1
+# con cortes bajos respecto de fs) y filtfilt con b, a puede volverse inestable.
+
+TIPOS = ('low', 'high', 'band', 'bandstop')
+CICLOS_HISTORIA = 20     # Periodos del corte más bajo que se guardan para el cambio
+HISTORIA_MIN = 256
+HISTORIA_MAX = 1 << 16
+
+
+@lru_cache(maxsize=64)
+def _disenar(tipo, orden, corte, fs):
+    frecuencias = np.asarray(corte, dtype=np.float64) / (fs / 2)
+    return butter(orden, frecuencias, btype=tipo, output='sos')
+
+
+def disenar(tipo, orden, corte, fs):
+    """Butterworth en SOS, en caché (compartido: no modificar el arreglo devuelto).
+
+    corte: Hz, o (bajo, alto) para 'band'/'bandstop'. No se marca de solo
+    lectura porque sosfilt exige un arreglo escribible.
+    """
+    if tipo not in TIPOS:
+        raise ValueError(f"tipo de filtro desconocido: {tipo}")
+    if np.ndim(corte):
+        corte = tuple(float(c) for c in corte)
+    else:
+        corte = float(corte)
+    return _disenar(tipo, int(orden), corte, float(fs))
+
+
+def zi_estacionario(sos, x0):
+    """Estado del filtro en régimen para una entrada constante x0 (escalar o un valor por canal)"""
+    x0 = np.asarray(x0, dtype=np.float64)
+    zi = sosfilt_zi(sos).reshape((len(sos),) + (1,) * x0.ndim + (2,))
+    return zi * x0[np.newaxis, ..., np.newaxis]
+
+
+def largo_historia(corte, fs):
+    """Muestras de entrada a guardar: CICLOS_HISTORIA periodos del corte más bajo"""
+    minimo = float(np.min(corte))
+    return int(np.clip(CICLOS_HISTORIA * fs / minimo, HISTORIA_MIN, HISTORIA_MAX))
+
+
+class FiltroSOS:
+    def __init__(self, sos, canales=None, historia=HISTORIA_MIN):
+        """Filtro causal por bloques (C x k con canales); historia = muestras para cambiar()"""
+        self.sos = sos
+        self.canales = canales
+        self._historia = BufferCircular(historia, dtype=np.float64, canales=canales)
+        self._zi = None
+
+    def reiniciar(self):
+        self._zi = None
+        self._historia = BufferCircular(self._historia.capacidad, dtype=np.float64,
+                                        canales=self.canales)
+
+    def filtrar(self, bloque):
+        x = np.asarray(bloque, dtype=np.float64)
+        if x.shape[-1] == 0:
+            return x
+        if self._zi is None:
+            self._zi = zi_estacionario(self.sos, x[..., 0])
+        y, self._zi = sosfilt(self.sos, x, zi=self._zi)
+        self._historia.escribir(x)
+        return y
+
+    def cambiar(self, sos, historia=None):
+        """Nuevo diseño conservando la continuidad de la salida"""
+        self.sos = sos
+        if historia is not None and historia != self._historia.capacidad:
+            previas = np.array(self._historia.ultimos(min(historia, self._historia.disponibles)))
+            self._historia = BufferCircular(historia, dtype=np.float64, canales=self.canales)
+            self._historia.escribir(previas)
+        if self._zi is None or self._historia.disponibles == 0:
+            return
+        # Calentar el filtro nuevo con la entrada reciente: su transitorio
+        # se apaga dentro de la historia y el estado final es el de régimen
+        previas = self._historia.ultimos(self._historia.disponibles)
+        _, self._zi = sosfilt(sos, previas, zi=zi_estacionario(sos, previas[..., 0]))
+
+
+class BancoFiltros:
+    """Filtros con nombre y fs común: banco['envolvente'].filtrar(bloque)"""
+
+    def __init__(self, fs):
+        self.fs = fs
+        self._especificaciones = {}   # nombre -> (tipo, orden, corte)
+        self._filtros = {}
+
+    def agregar(self, nombre, tipo, orden, corte, canales=None):
+        sos = disenar(tipo, orden, corte, self.fs)
+        self._especificaciones[nombre] = (tipo, orden, corte)
+        self._filtros[nombre] = FiltroSOS(sos, canales, largo_historia(corte, self.fs))
+        return self._filtros[nombre]
+
+    def __getitem__(self, nombre):
+        return self._filtros[nombre]
+
+    def __contains__(self, nombre):
+        return nombre in self._filtros
+
+    def especificacion(self, nombre):
+        """(tipo, orden, corte) actuales del filtro"""
+        return self._especificaciones[nombre]
+
+    def sos(self, nombre):
+        """Diseño actual (para sosfiltfilt sobre una ventana completa)"""
+        return self._filtros[nombre].sos
+
+    def resintonizar(self, nombre, corte=None, orden=None, tipo=None):
+        """Cambia el diseño de un filtro en marcha; devuelve True si cambió"""
+        tipo_actual, orden_actual, corte_actual = self._especificaciones[nombre]
+        nueva = (tipo or tipo_actual, orden or orden_actual,
+                 corte_actual if corte is None else corte)
+        if nueva == self._especificaciones[nombre]:
+            return False
+        self._especificaciones[nombre] = nueva
+        self._filtros[nombre].cambiar(disenar(*nueva, self.fs), largo_historia(nueva[2], self.fs))
+        return True
+
+    def ajustar_fs(self, fs):
+        """Rediseña todos los filtros para otra fs (manteniendo su estado)"""
+        if fs == self.fs:
+            return
+        self.fs = fs
+        for nombre, (tipo, orden, corte) in self._especificaciones.items():
+            self._filtros[nombre].cambiar(disenar(tipo, orden, corte, fs), largo_historia(corte, fs))
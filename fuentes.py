@@ -0,0 +1,186 @@
+import os
+import time
+
+import numpy as np
+
+from ingesta_serial import IngestaSerial, adc_a_voltaje, ADC_MAX, VREF
+from grabador import LectorGrabacion
+from arranque import abrir_puerto, ESPERA_RESET, CUALQUIER_DATO
+
+# ============================================
+# FUENTES DE MUESTRAS
+# ============================================
+# Todas las fuentes tienen la interfaz de IngestaSerial, así el hilo de
+# lectura, el DSP y la GUI no saben de dónde vienen las muestras:
+#
+#   leer()            agrega al buffer lo disponible; devuelve cuántas muestras
+#                     (0 = nada pendiente, el que llama duerme un poco)
+#   datos_recibidos   muestras entregadas (por canal en las multicanal)
+#   errores_lectura   errores de parseo / lectura
+#   terminada         True cuando ya no llegarán más muestras (fin de archivo)
+#   t_ultimo_bloque   time.perf_counter() de la última entrega (para latencia)
+#   reloj             EstimadorFs con la fs efectiva y los huecos del enlace
+#                     (None si la fs es exacta, como en archivo y sintética)
+#
+# Backends: serial (IngestaSerial), reproducción de una grabación
+# (grabador.py o .npy) y señal AM sintética. Las dos últimas van a tiempo
+# real, a N veces tiempo real (velocidad=N) o tan rápido como se pueda
+# (velocidad=None, de a `bloque` muestras por llamada).
+
+BLOQUE = 1024         # Muestras por llamada sin control de tiempo
+MAX_ATRASO = 0.5      # s: si el consumidor se atrasa más, se salta en lugar de ráfaga
+
+
+class FuenteSerial(IngestaSerial):
+    """Abre el puerto y lee como IngestaSerial"""
+
+    def __init__(self, puerto, baud, buffer, grabador=None, espera_reset=ESPERA_RESET, canales=1, fs=None):
+        # Listo con el primer byte del Arduino; espera_reset es el tope
+        ser = abrir_puerto(puerto, baud, senal_listo=CUALQUIER_DATO, espera_max=espera_reset)
+        super().__init__(ser, buffer, grabador, canales, fs)
+
+    def cerrar(self):
+        self.ser.close()
+
+
+class FuenteTemporizada:
+    """Base de las fuentes sin hardware: entrega muestras ADC a ritmo de fs*velocidad"""
+
+    def __init__(self, buffer, fs, velocidad=1.0, bloque=BLOQUE, grabador=None):
+        self.buffer = buffer
+        self.fs = fs
+        self.velocidad = velocidad
+        self.bloque = int(bloque)
+        self.grabador = grabador
+        self.datos_recibidos = 0
+        self.errores_lectura = 0
+        self.terminada = False
+        self.t_ultimo_bloque = None
+        self.reloj = None             # fs exacta: no hay nada que estimar
+        self._t0 = None
+        self._entregadas_reloj = 0   # Muestras contadas por el reloj (sin saltos)
+
+    def _generar(self, n):
+        """Hasta n valores ADC siguientes (menos si se acaban); C x n si hay canales"""
+        raise NotImplementedError
+
+    def _pendientes(self):
+        ahora = time.perf_counter()
+        if self._t0 is None:
+            self._t0 = ahora
+        if not self.velocidad:
+            return self.bloque
+        debidas = int((ahora - self._t0) * self.fs * self.velocidad) - self._entregadas_reloj
+        maximo = int(MAX_ATRASO * self.fs * self.velocidad)
+        if debidas > maximo:
+            # El lector estuvo detenido: no entregar una ráfaga gigante
+            self._entregadas_reloj += debidas - maximo
+            debidas = maximo
+        return debidas
+
+    def leer(self):
+        if self.terminada:
+            return 0
+        n = self._pendientes()
+        if n <= 0:
+            return 0
+        valores = np.asarray(self._generar(n))
+        self._entregadas_reloj += n
+        entregadas = valores.shape[-1]
+        if entregadas == 0:
+            return 0
+        if self.grabador is not None:
+            self.grabador.escribir(valores)
+        self.buffer.escribir(adc_a_voltaje(valores))
+        self.datos_recibidos += entregadas
+        self.t_ultimo_bloque = time.perf_counter()
+        return entregadas
+
+    def tasa(self):
+        """Muestras por segundo entregadas desde el inicio"""
+        if self._t0 is None or self.t_ultimo_bloque is None:
+            return 0.0
+        transcurrido = self.t_ultimo_bloque - self._t0
+        return self.datos_recibidos / transcurrido if transcurrido > 0 else 0.0
+
+    def cerrar(self):
+        self.terminada = True
+
+
+class FuenteArchivo(FuenteTemporizada):
+    """Reproduce una grabación de grabador.py (directorio) o un .npy de valores ADC"""
+
+    def __init__(self, buffer, ruta, fs=None, velocidad=1.0, repetir=False,
+                 bloque=BLOQUE, grabador=None):
+        if os.path.isdir(ruta):
+            self._lector = LectorGrabacion(ruta)
+            self._total = self._lector.total
+            fs = self._lector.fs or fs  # Manda la fs guardada en la sesión
+        else:
+            datos = np.load(ruta, mmap_mode='r')  # Mapeado: no se carga entero
+            self._lector = None
+            self._datos = datos
+            self._total = len(datos)
+        if not fs:
+            raise ValueError(f"no se conoce fs para {ruta}")
+        super().__init__(buffer, fs, velocidad, bloque, grabador)
+        self.ruta = ruta
+        self.repetir = repetir
+        self.posicion = 0
+
+    def _leer_tramo(self, inicio, n):
+        if self._lector is not None:
+            return self._lector.leer(inicio, n)
+        return self._datos[inicio:inicio + n]
+
+    def _generar(self, n):
+        if self.posicion >= self._total:
+            if not self.repetir or self._total == 0:
+                self.terminada = True
+                return np.empty(0, dtype=np.int64)
+            self.posicion = 0
+        valores = self._leer_tramo(self.posicion, n)
+        self.posicion += len(valores)
+        return valores
+
+    def ir_a(self, segundos):
+        """Salta a un instante de la grabación"""
+        if self._lector is not None:
+            self.posicion = self._lector.muestra_en_tiempo(segundos)
+        else:
+            self.posicion = min(self._total, int(segundos * self.fs))
+        self.terminada = False
+
+
+class FuenteSintetica(FuenteTemporizada):
+    """Señal AM como la que genera el ESP32 (AMsignalESP32.py), cuantizada al ADC.
+
+    Con canales=C genera C señales (bloques C x n); m, offset y amplitud
+    pueden ser un valor por canal.
+    """
+
+    def __init__(self, buffer, fs, fc=1000, fm=50, m=0.5, offset=1.65, amplitud=1.0,
+                 ruido=0.0, velocidad=1.0, bloque=BLOQUE, grabador=None, semilla=None, canales=1):
+        if canales > 1 and grabador is not None:
+            raise ValueError("la grabación multicanal no está soportada")
+        super().__init__(buffer, fs, velocidad, bloque, grabador)
+        self.canales = canales
+        self.fc = fc
+        self.fm = fm
+        por_canal = (lambda v: v) if canales == 1 else \
+            (lambda v: np.broadcast_to(np.asarray(v, dtype=np.float64), (canales,))[:, np.newaxis])
+        self.m = por_canal(m)
+        self.offset = por_canal(offset)
+        self.amplitud = por_canal(amplitud)
+        self.ruido = ruido  # Desviación estándar del ruido gaussiano (V)
+        self._rng = np.random.default_rng(semilla)
+        self._n = 0  # Índice de la próxima muestra (fase continua entre bloques)
+
+    def _generar(self, n):
+        t = (self._n + np.arange(n)) / self.fs
+        self._n += n
+        senal = self.amplitud * (1 + self.m * np.sin(2 * np.pi * self.fm * t)) * np.sin(2 * np.pi * self.fc * t)
+        voltaje = senal + self.offset
+        if self.ruido:
+            voltaje = voltaje + self._rng.normal(0.0, self.ruido, voltaje.shape)
+        return np.clip(np.rint(voltaje * (ADC_MAX / VREF)), 0, ADC_MAX).astype(np.int64)
@@ -0,0 +1,93 @@
+import math
+import time
+
+import numpy as np
+
+from reloj_muestras import EstimadorFs
+
+# ============================================
+# GENERADOR DESDE EL HOST CON PLAZOS
+# ============================================
+# Reemplaza el "write por muestra + time.sleep(1/fs)": con la granularidad
+# del sleep (hasta ~15 ms en Windows) y una llamada al sistema por muestra,
+# la tasa real quedaba muy por debajo de la nominal y derivaba.
+#   - La tabla (tabla_onda.py) se repite en un bytes ya armado y cada
+#     escritura es un slice de memoryview: BLOQUE muestras binarias, sin
+#     formatear texto ni copiar.
+#   - Cada bloque tiene un plazo absoluto en el reloj monotónico:
+#     t0 + (enviadas - ADELANTO) / fs. Se duerme hasta el plazo (un sleep
+#     por bloque); si un sleep se pasa, el siguiente plazo no se corre, así
+#     el error no se acumula.
+#   - El dispositivo reproduce a fs desde su propio anillo (AMsignal.ino);
+#     ADELANTO muestras enviadas por delante lo mantienen lleno a la mitad.
+#   - La tasa lograda se mide con EstimadorFs sobre la hora de cada
+#     escritura (regresión, no primera/última muestra).
+
+BLOQUE = 64        # Muestras por escritura
+ADELANTO = 128     # Muestras por delante del reloj (mitad del anillo del Arduino)
+
+
+class GeneradorTabla:
+    def __init__(self, ser, tabla, fs, bloque=BLOQUE, adelanto=ADELANTO):
+        self.ser = ser
+        self.tabla = np.ascontiguousarray(tabla, dtype=np.uint8)
+        self.fs = fs
+        self.bloque = int(bloque)
+        self.adelanto = int(adelanto)
+        # Tabla repetida lo suficiente para que cualquier bloque sea contiguo
+        n = len(self.tabla)
+        repeticiones = -(-(n + self.bloque) // n)
+        self._datos = np.tile(self.tabla, repeticiones).tobytes()
+        self._vista = memoryview(self._datos)
+
+    def transmitir(self, n_muestras=None, detener=None):
+        """Escribe la tabla en ciclo a fs; n_muestras=None = hasta que detener (threading.Event) se active.
+
+        Devuelve un dict con la tasa pedida y la lograda.
+        """
+        # Sin detección de huecos: una escritura tarde es déficit de tasa, no muestras perdidas
+        reloj = EstimadorFs(umbral_hueco=math.inf)
+        n = len(self.tabla)
+        posicion = 0
+        enviadas = 0
+        registradas = 0
+        atraso_max = 0.0
+        t0 = time.perf_counter()
+        while n_muestras is None or enviadas < n_muestras:
+            if detener is not None and detener.is_set():
+                break
+            k = self.bloque if n_muestras is None else min(self.bloque, n_muestras - enviadas)
+            espera = t0 + (enviadas - self.adelanto) / self.fs - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            elif enviadas >= self.adelanto:  # El adelanto inicial sale sin esperar a propósito
+                atraso_max = max(atraso_max, -espera)
+            self.ser.write(self._vista[posicion:posicion + k])
+            if enviadas >= self.adelanto:
+                # El plazo es el de la PRIMERA muestra del bloque: se registran las anteriores
+                reloj.registrar(enviadas - registradas, time.perf_counter())
+                registradas = enviadas
+            posicion = (posicion + k) % n
+            enviadas += k
+        duracion = time.perf_counter() - t0
+
+        # Sin regresión (menos de SPAN_MIN s): muestras después del adelanto / tiempo
+        fs_lograda = reloj.fs if reloj.listo else \
+            max(enviadas - self.adelanto, 0) / duracion if duracion > 0 else float('nan')
+        return {
+            'muestras': enviadas,
+            'duracion': duracion,
+            'fs_pedida': self.fs,
+            'fs_lograda': fs_lograda,
+            'error_ppm': (fs_lograda / self.fs - 1) * 1e6,
+            'atraso_max': atraso_max,       # s - peor plazo incumplido
+            'jitter': reloj.jitter,         # s - dispersión de la hora de escritura
+            'escrituras': -(-enviadas // self.bloque),
+        }
+
+
+def resumen(informe):
+    """Una línea para imprimir el informe de transmitir()"""
+    return (f"fs pedida {informe['fs_pedida']:.1f} Hz, lograda {informe['fs_lograda']:.2f} Hz "
+            f"({informe['error_ppm']:+.0f} ppm), {informe['muestras']} muestras en "
+            f"{informe['escrituras']} escrituras, atraso máx {informe['atraso_max'] * 1000:.1f} ms")
@@ -0,0 +1,233 @@
+import os
+import json
+import time
+
+import numpy as np
+
+# ============================================
+# GRABADOR DE CAPTURAS (archivos mapeados en memoria)
+# ============================================
+# Guarda las muestras ADC crudas de leer_serial en disco sin crecer en RAM:
+#
+#   <directorio>/sesion.json        fs, dtype y lista de archivos de datos
+#   <directorio>/captura_0000.raw   muestras crudas (np.memmap, preasignado)
+#   <directorio>/indice.bin         un registro por bloque recibido:
+#                                   (muestra, n, tiempo, perdidas)
+#
+# "muestra" es la posición absoluta del primer valor del bloque (contando
+# todos los archivos), "tiempo" la hora del host al recibirlo (≈ última
+# muestra del bloque) y "perdidas" las muestras que faltan justo antes
+# (huecos de secuencia del protocolo binario; no se rellenan en el archivo).
+# Al llenar un archivo (o pasar segundos_por_archivo) se trunca al tamaño
+# escrito y se abre el siguiente. LectorGrabacion devuelve vistas np.memmap
+# sin copia y ubica un instante por búsqueda binaria en el índice.
+
+MUESTRAS_POR_ARCHIVO = 2 ** 24  # 32 MB en uint16 (~56 min a 5 kHz, ~5.6 min a 50 kHz)
+ARCHIVO_SESION = 'sesion.json'
+ARCHIVO_INDICE = 'indice.bin'
+INDICE = np.dtype([('muestra', '<i8'), ('n', '<i8'), ('tiempo', '<f8'), ('perdidas', '<i8')])
+
+
+class Grabador:
+    def __init__(self, directorio, fs=None, dtype=np.uint16,
+                 muestras_por_archivo=MUESTRAS_POR_ARCHIVO, segundos_por_archivo=None,
+                 prefijo='captura'):
+        self.directorio = directorio
+        self.fs = fs
+        self.dtype = np.dtype(dtype)
+        self.muestras_por_archivo = int(muestras_por_archivo)
+        self.segundos_por_archivo = segundos_por_archivo
+        self.prefijo = prefijo
+        os.makedirs(directorio, exist_ok=True)
+        if os.path.exists(os.path.join(directorio, ARCHIVO_SESION)):
+            raise FileExistsError(f"ya existe una grabación en {directorio}")
+
+        self.archivos = []          # Entradas de sesion.json
+        self.total = 0              # Muestras escritas en todos los archivos
+        self._mapa = None           # np.memmap del archivo actual
+        self._escritas = 0          # Muestras en el archivo actual
+        self._t_archivo = None      # Hora de apertura del archivo actual
+        self._indice = open(os.path.join(directorio, ARCHIVO_INDICE), 'ab')
+        self._abrir_archivo()
+
+    def _abrir_archivo(self):
+        nombre = f"{self.prefijo}_{len(self.archivos):04d}.raw"
+        # w+ reserva el archivo completo (disperso en disco hasta que se escribe)
+        self._mapa = np.memmap(os.path.join(self.directorio, nombre), dtype=self.dtype,
+                               mode='w+', shape=(self.muestras_por_archivo,))
+        self._escritas = 0
+        self._t_archivo = time.time()
+        self.archivos.append({'nombre': nombre, 'inicio': self.total, 'muestras': None})
+        self._guardar_sesion()
+
+    def _cerrar_archivo(self):
+        """Vacía el mapa y recorta el archivo a las muestras escritas"""
+        self._mapa.flush()
+        ruta = self._mapa.filename
+        del self._mapa
+        self._mapa = None
+        os.truncate(ruta, self._escritas * self.dtype.itemsize)
+        self.archivos[-1]['muestras'] = self._escritas
+
+    def _guardar_sesion(self):
+        datos = {
+            'fs': self.fs,
+            'dtype': self.dtype.str,
+            'muestras_por_archivo': self.muestras_por_archivo,
+            'archivos': self.archivos,
+        }
+        ruta = os.path.join(self.directorio, ARCHIVO_SESION)
+        with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=2)
+        os.replace(ruta + '.tmp', ruta)  # Nunca queda un sesion.json a medias
+
+    def rotar(self):
+        """Cierra el archivo actual y abre uno nuevo"""
+        self._cerrar_archivo()
+        self._indice.flush()
+        self._abrir_archivo()
+
+    def escribir(self, valores, perdidas=0, tiempo=None):
+        """Agrega un bloque de muestras crudas y su registro de índice"""
+        valores = np.asarray(valores, dtype=self.dtype)
+        n = len(valores)
+        if n == 0 and perdidas == 0:
+            return
+        if tiempo is None:
+            tiempo = time.time()
+        if (self.segundos_por_archivo is not None and self._escritas
+                and tiempo - self._t_archivo >= self.segundos_por_archivo):
+            self.rotar()
+
+        registro = np.array([(self.total, n, tiempo, perdidas)], dtype=INDICE)
+        self._indice.write(registro.tobytes())
+
+        # Un bloque puede repartirse entre el final de un archivo y el siguiente
+        while len(valores):
+            if self._escritas == self.muestras_por_archivo:
+                self.rotar()
+            k = min(len(valores), self.muestras_por_archivo - self._escritas)
+            self._mapa[self._escritas:self._escritas + k] = valores[:k]
+            self._escritas += k
+            self.total += k
+            valores = valores[k:]
+
+    def cerrar(self):
+        if self._mapa is None:
+            return
+        self._cerrar_archivo()
+        self._indice.close()
+        self._guardar_sesion()
+
+
+# ============================================
+# LECTURA Y BÚSQUEDA POR TIEMPO
+# ============================================
+class LectorGrabacion:
+    def __init__(self, directorio):
+        self.directorio = directorio
+        with open(os.path.join(directorio, ARCHIVO_SESION), encoding='utf-8') as f:
+            sesion = json.load(f)
+        self.dtype = np.dtype(sesion['dtype'])
+
+        ruta_indice = os.path.join(directorio, ARCHIVO_INDICE)
+        n_registros = os.path.getsize(ruta_indice) // INDICE.itemsize
+        if n_registros:
+            self.indice = np.memmap(ruta_indice, dtype=INDICE, mode='r', shape=(n_registros,))
+        else:
+            self.indice = np.zeros(0, dtype=INDICE)
+        self.total = int(self.indice['muestra'][-1] + self.indice['n'][-1]) if n_registros else 0
+
+        # Un archivo sin "muestras" sigue abierto (sesión en curso o cortada):
+        # su tamaño sale del índice
+        self._mapas = []
+        self._inicios = []
+        for archivo in sesion['archivos']:
+            muestras = archivo['muestras']
+            if muestras is None:
+                muestras = max(0, self.total - archivo['inicio'])
+            if muestras == 0:
+                continue
+            self._inicios.append(archivo['inicio'])
+            self._mapas.append(np.memmap(os.path.join(directorio, archivo['nombre']),
+                                         dtype=self.dtype, mode='r', shape=(muestras,)))
+        self._inicios = np.array(self._inicios, dtype=np.int64)
+
+        self.fs = sesion['fs'] or self.estimar_fs()
+
+    @property
+    def t_inicio(self):
+        """Hora del host estimada para la primera muestra"""
+        if len(self.indice) == 0:
+            return 0.0
+        adelanto = self.indice['n'][0] / self.fs if self.fs else 0.0
+        return float(self.indice['tiempo'][0] - adelanto)
+
+    @property
+    def duracion(self):
+        """Segundos de reloj del host entre el primer y el último bloque"""
+        if len(self.indice) == 0:
+            return 0.0
+        return float(self.indice['tiempo'][-1] - self.indice['tiempo'][0])
+
+    def estimar_fs(self):
+        """Frecuencia de muestreo efectiva según el reloj del host"""
+        if len(self.indice) < 2 or self.duracion <= 0:
+            return None
+        return (self.total - self.indice['n'][0]) / self.duracion
+
+    def huecos(self):
+        """Registros de índice con muestras perdidas antes del bloque"""
+        return self.indice[self.indice['perdidas'] > 0]
+
+    def muestra_en_tiempo(self, t):
+        """Posición de la muestra registrada t segundos después de la primera.
+
+        Búsqueda binaria en el índice (mapeado, no se carga entero) y
+        interpolación lineal entre los dos bloques vecinos.
+        """
+        if len(self.indice) == 0:
+            return 0
+        tiempos = self.indice['tiempo']
+        objetivo = self.t_inicio + t
+        k = int(np.searchsorted(tiempos, objetivo, side='right'))
+        if k == 0:
+            # Dentro del primer bloque
+            return int(min(round(t * self.fs), self.indice['n'][0])) if self.fs else 0
+        if k == len(tiempos):
+            return self.total
+        # Cada registro marca el final de su bloque
+        t0, t1 = tiempos[k - 1], tiempos[k]
+        m0 = self.indice['muestra'][k - 1] + self.indice['n'][k - 1]
+        m1 = self.indice['muestra'][k] + self.indice['n'][k]
+        fraccion = (objetivo - t0) / (t1 - t0) if t1 > t0 else 1.0
+        return int(round(m0 + fraccion * (m1 - m0)))
+
+    def leer(self, inicio, n):
+        """n muestras desde la posición absoluta inicio.
+
+        Si caen en un solo archivo devuelve una vista np.memmap (sin copia);
+        si cruzan una rotación concatena los trozos.
+        """
+        inicio = max(0, int(inicio))
+        fin = min(self.total, inicio + int(n))
+        if fin <= inicio or len(self._mapas) == 0:
+            return np.empty(0, dtype=self.dtype)
+
+        k = int(np.searchsorted(self._inicios, inicio, side='right')) - 1
+        local = inicio - self._inicios[k]
+        if local + (fin - inicio) <= len(self._mapas[k]):
+            return self._mapas[k][local:local + (fin - inicio)]
+
+        partes = []
+        while inicio < fin:
+            local = inicio - self._inicios[k]
+            trozo = self._mapas[k][local:local + (fin - inicio)]
+            partes.append(trozo)
+            inicio += len(trozo)
+            k += 1
+        return np.concatenate(partes)
+
+    def en_tiempo(self, t, duracion):
+        """Muestras desde t segundos después del inicio durante duracion segundos"""
+        return self.leer(self.muestra_en_tiempo(t), int(round(duracion * self.fs)))
@@ -0,0 +1,173 @@
+import time
+
+import numpy as np
+
+from reloj_muestras import EstimadorFs
+
+# ============================================
+# INGESTA SERIAL EN BLOQUE (ASCII -> VOLTIOS)
+# ============================================
+# En lugar de un readline() + int() por muestra, se lee todo lo que haya en
+# in_waiting de una vez y se convierten todas las líneas con NumPy.
+# Formato esperado: un valor ADC en decimal por línea ("512\n" o "512\r\n").
+# Multicanal: un cuadro por línea con los canales separados por comas
+# ("512,300,87\n"), demultiplexado a un bloque canales x muestras.
+# Cada bloque leído se marca con el reloj del host para estimar la fs real
+# y detectar huecos (ver reloj_muestras.py).
+
+ADC_MAX = 1023     # Arduino: ADC de 10 bits
+VREF = 5.0         # Voltaje de referencia del ADC
+MAX_DIGITOS = 15   # Más dígitos no caben exactos en float64 (y están fuera de rango)
+MAX_RESIDUO = 64   # Una línea incompleta más larga que esto es basura
+
+
+def parsear_bloque(bloque):
+    """Convierte un bloque de líneas completas en valores ADC.
+
+    Reproduce la validación de leer_serial(): se ignoran las líneas vacías,
+    cuentan como error las que no son solo dígitos (tras strip) o están
+    fuera de 0-ADC_MAX. Devuelve (valores int64, errores).
+    """
+    a = np.frombuffer(bloque, dtype=np.uint8)
+    if a.size == 0:
+        return np.empty(0, dtype=np.int64), 0
+    valores, validas, con_contenido = _valores_lineas(a)
+    errores = int(np.count_nonzero(con_contenido & ~validas))
+    return valores[validas].astype(np.int64), errores
+
+
+def parsear_bloque_multicanal(bloque, canales):
+    """Convierte líneas "v0,v1,...,vC-1" en valores ADC canales x k.
+
+    Una línea vale solo si tiene exactamente `canales` campos válidos; si no,
+    cuenta como un error y se descarta entera, así los canales nunca se
+    desalinean. Devuelve (valores int64 canales x k, errores).
+    """
+    a = np.frombuffer(bloque, dtype=np.uint8)
+    if a.size == 0:
+        return np.empty((canales, 0), dtype=np.int64), 0
+
+    # Cada campo se valida como si fuera una línea: las comas pasan a '\n'
+    es_nl = a == 10
+    es_coma = a == 44
+    campos = a.copy()
+    campos[es_coma] = 10
+    valores, validas, con_contenido = _valores_lineas(campos)
+
+    # Línea original de cada campo (según el separador que lo cierra)
+    cierra_linea = es_nl[es_nl | es_coma]
+    if len(cierra_linea) < len(valores):
+        cierra_linea = np.append(cierra_linea, True)  # Último campo sin separador
+    linea = np.cumsum(cierra_linea) - cierra_linea
+    n_lineas = int(linea[-1]) + 1
+    n_campos = np.bincount(linea, minlength=n_lineas)
+    n_validos = np.bincount(linea, weights=validas, minlength=n_lineas)
+    vacias = np.bincount(linea, weights=con_contenido, minlength=n_lineas) == 0
+
+    buenas = (n_campos == canales) & (n_validos == canales)
+    errores = int(np.count_nonzero(~buenas & ~vacias))
+    return valores[buenas[linea]].astype(np.int64).reshape(-1, canales).T, errores
+
+
+def _valores_lineas(a):
+    """Valor de cada línea de a (bytes uint8), sin filtrar.
+
+    Devuelve (valores float64, validas, con_contenido) con un elemento por línea.
+    """
+    es_nl = a == 10
+    n_lineas = int(np.count_nonzero(es_nl))
+    if not es_nl[-1]:
+        n_lineas += 1  # última línea sin '\n'
+    linea = np.cumsum(es_nl) - es_nl  # línea a la que pertenece cada byte
+
+    es_digito = (a >= 48) & (a <= 57)
+    es_espacio = (a == 32) | ((a >= 9) & (a <= 13) & ~es_nl)
+    es_otro = ~(es_digito | es_espacio | es_nl)
+
+    malas = np.bincount(linea[es_otro], minlength=n_lineas) > 0
+
+    # Posición del primer y último dígito de cada línea
+    pos = np.flatnonzero(es_digito)
+    lin_dig = linea[pos]
+    n_digitos = np.bincount(lin_dig, minlength=n_lineas)
+    primero = np.zeros(n_lineas, dtype=np.int64)
+    ultimo = np.zeros(n_lineas, dtype=np.int64)
+    if pos.size:
+        cambio = np.empty(pos.size + 1, dtype=bool)
+        cambio[0] = cambio[-1] = True
+        cambio[1:-1] = lin_dig[1:] != lin_dig[:-1]
+        primero[lin_dig[cambio[:-1]]] = pos[cambio[:-1]]
+        ultimo[lin_dig[cambio[1:]]] = pos[cambio[1:]]
+
+    # Espacios entre dígitos ("51 2") invalidan la línea, igual que isdigit()
+    con_digitos = n_digitos > 0
+    huecos = con_digitos & (ultimo - primero + 1 != n_digitos)
+
+    # Valor = suma de dígito * 10^(dígitos restantes en la línea)
+    exponente = np.minimum(ultimo[lin_dig] - pos, MAX_DIGITOS + 1)
+    pesos = (a[pos] - 48) * 10.0 ** exponente
+    valores = np.bincount(lin_dig, weights=pesos, minlength=n_lineas)
+
+    validas = (con_digitos & ~malas & ~huecos
+               & (n_digitos <= MAX_DIGITOS) & (valores <= ADC_MAX))
+    return valores, validas, con_digitos | malas
+
+
+def adc_a_voltaje(valores):
+    """Convierte valores ADC (0-ADC_MAX) a voltios en float32"""
+    return valores.astype(np.float32) * np.float32(VREF / ADC_MAX)
+
+
+class IngestaSerial:
+    def __init__(self, ser, buffer, grabador=None, canales=1, fs=None):
+        """canales > 1: líneas "v0,v1,..." hacia un BufferCircular con esos canales.
+
+        fs = frecuencia nominal del Arduino; la efectiva queda en reloj.fs.
+        """
+        if canales > 1 and grabador is not None:
+            raise ValueError("la grabación multicanal no está soportada")
+        self.ser = ser
+        self.buffer = buffer
+        self.grabador = grabador  # Opcional: grabador.Grabador para guardar el ADC crudo
+        self.canales = canales
+        self.residuo = b''  # Línea incompleta del bloque anterior
+        self.datos_recibidos = 0
+        self.errores_lectura = 0
+        self.terminada = False        # Interfaz de fuentes.py: el puerto no "termina"
+        self.t_ultimo_bloque = None   # perf_counter() de la última entrega
+        self.reloj = EstimadorFs(fs)  # fs efectiva y huecos según el reloj del host
+
+    def leer(self):
+        """Lee todo lo pendiente en el puerto; devuelve cuántas muestras válidas agregó"""
+        pendientes = self.ser.in_waiting
+        if pendientes <= 0:
+            return 0
+        bloque = self.ser.read(pendientes)
+        return self.procesar(bloque, time.perf_counter())
+
+    def procesar(self, bloque, t=None):
+        """Parsea un bloque crudo (recibido en t, perf_counter) y agrega las muestras al buffer"""
+        datos = self.residuo + bloque
+        corte = datos.rfind(b'\n')
+        if corte < 0:
+            self.residuo = datos
+            if len(self.residuo) > MAX_RESIDUO:
+                self.residuo = b''
+                self.errores_lectura += 1
+            return 0
+
+        self.residuo = datos[corte + 1:]
+        if self.canales > 1:
+            valores, errores = parsear_bloque_multicanal(datos[:corte + 1], self.canales)
+        else:
+            valores, errores = parsear_bloque(datos[:corte + 1])
+        self.errores_lectura += errores
+        n = valores.shape[-1]  # Muestras por canal
+        if n:
+            perdidas = self.reloj.registrar(n, t)
+            if self.grabador is not None:
+                self.grabador.escribir(valores, perdidas=perdidas)
+            self.buffer.escribir(adc_a_voltaje(valores))
+            self.datos_recibidos += n
+            self.t_ultimo_bloque = time.perf_counter()
+        return n
@@ -0,0 +1,133 @@
+import math
+import time
+
+import pyqtgraph as pg
+from PyQt5.QtWidgets import QWidget, QLabel, QGridLayout
+
+# ============================================
+# PANEL DE MÉTRICAS CON ETIQUETAS PERSISTENTES
+# ============================================
+# En lugar de armar un documento HTML y llamar setHtml() en cada frame (Qt
+# vuelve a parsear y maquetar todo), cada valor es un QLabel creado y
+# estilizado una sola vez. En cada actualización solo se llama setText()
+# en los campos cuyo TEXTO cambió: un valor que se movió menos que la
+# precisión mostrada no toca Qt. Además las actualizaciones se limitan a
+# una cada `intervalo_min` segundos (las que llegan antes quedan pendientes).
+
+INTERVALO_MIN = 0.25  # s entre actualizaciones visibles
+SIN_VALOR = '—'
+
+
+def formatear(formato, valor):
+    """Texto del valor; NaN/None se muestran como SIN_VALOR"""
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return SIN_VALOR
+    try:
+        return formato.format(valor)
+    except (TypeError, ValueError):
+        return str(valor)
+
+
+class PanelMetricas(QWidget):
+    def __init__(self, intervalo_min=INTERVALO_MIN, parent=None):
+        super().__init__(parent)
+        self.intervalo_min = intervalo_min
+        self._layout = QGridLayout()
+        self._layout.setColumnStretch(1, 1)
+        self.setLayout(self._layout)
+        self._fila = 0
+        self._campos = {}        # clave -> (etiqueta, QLabel valor, formato, texto actual)
+        self._pendientes = {}
+        self._ultima = 0.0
+        self.setStyleSheet("background-color: #1a1a1a; font-family: 'Courier New', monospace;")
+
+    def seccion(self, titulo, color):
+        encabezado = QLabel(titulo)
+        encabezado.setStyleSheet(f"color: {color}; font-size: 12pt; font-weight: bold; "
+                                 f"border-bottom: 2px solid {color}; margin-top: 12px;")
+        self._layout.addWidget(encabezado, self._fila, 0, 1, 2)
+        self._fila += 1
+
+    def agregar(self, clave, etiqueta, formato='{:.3f}', color='#00ff00', tamano=11):
+        """Fila 'etiqueta: valor'; el estilo se fija aquí una sola vez"""
+        nombre = QLabel(etiqueta)
+        valor = QLabel(SIN_VALOR)
+        estilo = f"color: {color}; font-size: {tamano}pt;"
+        nombre.setStyleSheet(estilo)
+        valor.setStyleSheet(estilo + " font-weight: bold;")
+        self._layout.addWidget(nombre, self._fila, 0)
+        self._layout.addWidget(valor, self._fila, 1)
+        self._fila += 1
+        self._campos[clave] = [nombre, valor, formato, SIN_VALOR]
+
+    def nota(self, texto, color='gray'):
+        """Texto fijo (ej. una fórmula); devuelve el QLabel por si hay que cambiarlo"""
+        etiqueta = QLabel(texto)
+        etiqueta.setWordWrap(True)
+        etiqueta.setStyleSheet(f"color: {color}; font-size: 9pt; font-style: italic;")
+        self._layout.addWidget(etiqueta, self._fila, 0, 1, 2)
+        self._fila += 1
+        return etiqueta
+
+    def terminar(self):
+        """Empuja las filas hacia arriba (llamar después de agregar todo)"""
+        self._layout.setRowStretch(self._fila, 1)
+
+    def actualizar(self, valores, forzar=False):
+        """Actualiza los campos dados; devuelve cuántos QLabel cambiaron"""
+        self._pendientes.update(valores)
+        ahora = time.perf_counter()
+        if not forzar and ahora - self._ultima < self.intervalo_min:
+            return 0
+        self._ultima = ahora
+
+        cambiados = 0
+        for clave, valor in self._pendientes.items():
+            campo = self._campos.get(clave)
+            if campo is None:
+                continue
+            texto = formatear(campo[2], valor)
+            if texto != campo[3]:
+                campo[1].setText(texto)
+                campo[3] = texto
+                cambiados += 1
+        self._pendientes.clear()
+        return cambiados
+
+
+# ============================================
+# MISMA IDEA SOBRE UNA GRÁFICA DE PYQTGRAPH
+# ============================================
+class TextosGrafica:
+    """Líneas pg.TextItem apiladas en una gráfica; setText() solo si cambió el texto"""
+
+    def __init__(self, plot, colores, pos=(0, 0), separacion=0.06):
+        """colores: uno por línea; separacion en fracción de la altura visible"""
+        self.plot = plot
+        self.pos = pos
+        self.separacion = separacion
+        self._items = []
+        self._textos = []
+        for color in colores:
+            item = pg.TextItem(color=color, anchor=(0, 0), fill=pg.mkBrush(0, 0, 0, 150))
+            plot.addItem(item)
+            self._items.append(item)
+            self._textos.append(None)
+        self.colocar()
+
+    def colocar(self, pos=None):
+        """Reubica las líneas (solo hace falta si cambia el rango de la gráfica)"""
+        if pos is not None:
+            self.pos = pos
+        (_, _), (y_min, y_max) = self.plot.getViewBox().viewRange()
+        paso = (y_max - y_min) * self.separacion
+        for i, item in enumerate(self._items):
+            item.setPos(self.pos[0], self.pos[1] - i * paso)
+
+    def actualizar(self, textos):
+        """textos: lista (una por línea); None deja la línea como está"""
+        for i, texto in enumerate(textos):
+            if texto is None or texto == self._textos[i]:
+                continue
+            self._items[i].setText(texto)
+            self._textos[i] = texto
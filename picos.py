@@ -0,0 +1,140 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.ndimage import maximum_filter1d
+
+# ============================================
+# DETECCIÓN DE PICOS EN EL ESPECTRO
+# ============================================
+# Reemplaza el ciclo argmax + "poner en cero ±25 bins" de encontrar_picos_fft
+# y el argsort completo de top_n_peaks:
+#   1) Supresión de no-máximos en una sola pasada (maximum_filter1d): un bin es
+#      candidato si es el máximo en ±distancia_min bins
+#   2) Prominencia opcional contra el mínimo de cada lado (ventana ±distancia_min)
+#   3) Los k mayores con argpartition (O(n), sin ordenar todo el espectro)
+#   4) Frecuencia y amplitud sub-bin por interpolación parabólica o gaussiana
+
+DISTANCIA_MIN = 25  # bins
+BIN_MIN = 5         # Ignorar DC y primeros bins
+
+
+def encontrar_picos(valores, num_picos=3, distancia_min=DISTANCIA_MIN,
+                    prominencia_min=0.0, bin_min=BIN_MIN):
+    """Índices (ordenados por frecuencia) de los num_picos máximos locales más altos"""
+    v = np.asarray(valores, dtype=np.float64)
+    if v.size < 3:
+        return np.empty(0, dtype=np.int64)
+    distancia_min = max(1, int(distancia_min))
+
+    es_pico = v == maximum_filter1d(v, size=2 * distancia_min + 1, mode='nearest')
+    es_pico[1:] &= v[1:] > v[:-1]  # En una meseta solo cuenta el primer bin
+    es_pico[:bin_min] = False
+    candidatos = np.flatnonzero(es_pico)
+
+    if prominencia_min > 0 and candidatos.size:
+        candidatos = candidatos[prominencias(v, candidatos, distancia_min) >= prominencia_min]
+
+    if candidatos.size > num_picos:
+        mayores = np.argpartition(v[candidatos], -num_picos)[-num_picos:]
+        candidatos = candidatos[mayores]
+    return np.sort(candidatos)
+
+
+def prominencias(valores, indices, ventana):
+    """Altura de cada pico sobre el mayor de los mínimos a izquierda y derecha"""
+    v = np.asarray(valores, dtype=np.float64)
+    extendido = np.pad(v, ventana, mode='edge')
+    tramos = sliding_window_view(extendido, ventana + 1)  # Vista, sin copia
+    izquierda = tramos[indices].min(axis=1)               # v[i-ventana .. i]
+    derecha = tramos[indices + ventana].min(axis=1)       # v[i .. i+ventana]
+    return v[indices] - np.maximum(izquierda, derecha)
+
+
+def interpolar_picos(valores, indices, metodo='parabolica'):
+    """Desplazamiento sub-bin (-0.5..0.5) y altura interpolada de cada pico.
+
+    'parabolica' ajusta una parábola a los 3 bins; 'gaussiana' hace lo mismo
+    sobre el logaritmo (más exacta para ventanas tipo Hanning en magnitud
+    lineal). Para espectros en dB usar 'parabolica'.
+    """
+    v = np.asarray(valores, dtype=np.float64)
+    indices = np.asarray(indices, dtype=np.int64)
+    if metodo not in ('parabolica', 'gaussiana'):
+        raise ValueError(f"método desconocido: {metodo}")
+    y = np.log(np.maximum(v, 1e-300)) if metodo == 'gaussiana' else v
+
+    interior = (indices > 0) & (indices < len(v) - 1)
+    i = np.clip(indices, 1, len(v) - 2)
+    a, b, c = y[i - 1], y[i], y[i + 1]
+    denominador = a - 2 * b + c
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = np.where(interior & (denominador != 0), 0.5 * (a - c) / denominador, 0.0)
+    delta = np.clip(delta, -0.5, 0.5)
+    altura = np.where(interior, b - 0.25 * (a - c) * delta, y[indices])
+
+    if metodo == 'gaussiana':
+        altura = np.exp(altura)
+    return delta, altura
+
+
+def estimar_picos(valores, frecuencias, indices, metodo='parabolica'):
+    """Frecuencias y amplitudes sub-bin de los picos dados"""
+    delta, altura = interpolar_picos(valores, indices, metodo)
+    df = frecuencias[1] - frecuencias[0]
+    return frecuencias[indices] + delta * df, altura
+
+
+# ============================================
+# IDENTIFICACIÓN PORTADORA / BANDAS LATERALES
+# ============================================
+def identificar_am(magnitudes, frecuencias, fc=None, fm=None, num_candidatos=6,
+                   tolerancia_hz=None, metodo='gaussiana'):
+    """Identifica portadora, banda lateral inferior y superior de una señal AM.
+
+    Devuelve (frecuencias[3], amplitudes[3], m) en el orden
+    [portadora, LSB, USB], con NaN donde no se encontró el pico.
+    Si se conocen fc/fm se buscan los picos cerca de fc y fc±fm; si no, la
+    portadora es el pico más alto y las bandas el par más simétrico a su alrededor.
+    """
+    freqs_am = np.full(3, np.nan)
+    amps_am = np.full(3, np.nan)
+    df = frecuencias[1] - frecuencias[0]
+    tolerancia = 3 * df if tolerancia_hz is None else tolerancia_hz
+
+    # Separación mínima: media distancia entre portadora y banda lateral
+    distancia = DISTANCIA_MIN if fm is None else max(1, int(0.5 * fm / df))
+    indices = encontrar_picos(magnitudes, num_candidatos, distancia_min=distancia)
+    if indices.size == 0:
+        return freqs_am, amps_am, np.nan
+    f_est, a_est = estimar_picos(magnitudes, frecuencias, indices, metodo)
+
+    # Portadora
+    ic = int(np.argmax(a_est))
+    if fc is not None:
+        cercano = int(np.argmin(np.abs(f_est - fc)))
+        if abs(f_est[cercano] - fc) <= max(tolerancia, 0.05 * fc):
+            ic = cercano
+    freqs_am[0], amps_am[0] = f_est[ic], a_est[ic]
+    otros = np.delete(np.arange(indices.size), ic)
+    if otros.size == 0:
+        return freqs_am, amps_am, np.nan
+
+    # Bandas laterales
+    if fm is not None:
+        for k, objetivo in ((1, f_est[ic] - fm), (2, f_est[ic] + fm)):
+            j = otros[np.argmin(np.abs(f_est[otros] - objetivo))]
+            if abs(f_est[j] - objetivo) <= tolerancia:
+                freqs_am[k], amps_am[k] = f_est[j], a_est[j]
+    else:
+        inferiores = otros[f_est[otros] < f_est[ic]]
+        superiores = otros[f_est[otros] > f_est[ic]]
+        if inferiores.size and superiores.size:
+            # Par (LSB, USB) cuyo punto medio queda más cerca de la portadora
+            asimetria = np.abs((f_est[inferiores][:, None] + f_est[superiores][None, :]) / 2 - f_est[ic])
+            i, j = np.unravel_index(np.argmin(asimetria), asimetria.shape)
+            if asimetria[i, j] <= tolerancia:
+                freqs_am[1], amps_am[1] = f_est[inferiores[i]], a_est[inferiores[i]]
+                freqs_am[2], amps_am[2] = f_est[superiores[j]], a_est[superiores[j]]
+
+    # Cada banda lateral tiene amplitud m/2 respecto a la portadora
+    m = (amps_am[1] + amps_am[2]) / amps_am[0] if amps_am[0] > 0 else np.nan
+    return freqs_am, amps_am, m
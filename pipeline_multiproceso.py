@@ -0,0 +1,293 @@
+import time
+import queue
+import multiprocessing as mp
+from functools import partial
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from buffer_circular import BufferCircular, HOLGURA_POR_DEFECTO
+from grabador import Grabador
+from fuentes import FuenteSerial
+
+# ============================================
+# PIPELINE ADQUISICIÓN / DSP / GUI EN PROCESOS
+# ============================================
+# Proceso de adquisición: fuente (serial, archivo, sintética) -> buffer circular compartido
+# Proceso DSP:            últimas N muestras -> funcion_analisis -> resultados
+# Proceso GUI (el que llama a Pipeline): lee el último resultado y dibuja
+#
+# Cada proceso tiene su propio GIL, así el DSP pesado no frena ni la
+# lectura serial ni el dibujado.
+
+
+# ============================================
+# BLOQUE DE RESULTADOS CON NÚMERO DE SECUENCIA
+# ============================================
+class BloqueResultados:
+    """Campos de tamaño fijo en memoria compartida protegidos por un seqlock.
+
+    El escritor pone la secuencia en impar, copia los campos y la deja en par.
+    El lector reintenta si la ve impar o si cambió mientras copiaba.
+    campos: {nombre: (forma, dtype)}
+    """
+
+    def __init__(self, campos, nombre=None):
+        self.campos = campos
+        tam = 8
+        for forma, dtype in campos.values():
+            tam += int(np.prod(forma, dtype=np.int64)) * np.dtype(dtype).itemsize
+            tam += -tam % 8  # Mantener alineación de 8 bytes
+        if nombre is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=tam)
+        else:
+            self.shm = shared_memory.SharedMemory(name=nombre)
+        self.nombre = self.shm.name
+
+        self._seq = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        self._arreglos = {}
+        offset = 8
+        for campo, (forma, dtype) in campos.items():
+            arreglo = np.ndarray(forma, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            self._arreglos[campo] = arreglo
+            offset += arreglo.nbytes
+            offset += -offset % 8
+        self._ultimo_leido = 0
+
+    @property
+    def secuencia(self):
+        return int(self._seq[0])
+
+    def escribir(self, valores):
+        """Publica un resultado (un solo escritor)"""
+        self._seq[0] += 1
+        for campo, valor in valores.items():
+            destino = self._arreglos[campo]
+            if destino.ndim == 0:
+                destino[()] = valor
+            else:
+                n = min(len(valor), len(destino))
+                destino[:n] = valor[:n]
+        self._seq[0] += 1
+
+    def leer(self, solo_nuevos=True):
+        """Devuelve una copia coherente de los campos, o None si no hay nada nuevo"""
+        while True:
+            inicio = int(self._seq[0])
+            if inicio == 0 or (solo_nuevos and inicio == self._ultimo_leido):
+                return None
+            if inicio % 2:
+                time.sleep(0)
+                continue
+            copia = {campo: arreglo.copy() for campo, arreglo in self._arreglos.items()}
+            if int(self._seq[0]) == inicio:
+                self._ultimo_leido = inicio
+                return {campo: (valor[()] if valor.ndim == 0 else valor)
+                        for campo, valor in copia.items()}
+
+    def cerrar(self, liberar=False):
+        # Soltar las vistas antes de cerrar la memoria compartida
+        self._arreglos = {}
+        self._seq = None
+        self.shm.close()
+        if liberar:
+            self.shm.unlink()
+
+
+# ============================================
+# PROCESOS DE TRABAJO
+# ============================================
+def proceso_adquisicion(puerto, baud, nombre_muestras, capacidad, contadores, evento_fin,
+                        directorio_grabacion=None, fs=None, crear_fuente=None, fs_medida=None):
+    """Lee la fuente y escribe voltajes en el buffer compartido (y opcionalmente a disco).
+
+    crear_fuente(buffer, grabador=...) construye una fuente de fuentes.py;
+    None = el Arduino en puerto/baud. fs_medida (mp.Value) recibe la fs
+    efectiva estimada por el reloj de la fuente.
+    """
+    shm = shared_memory.SharedMemory(name=nombre_muestras)
+    buffer = BufferCircular.desde_memoria(shm.buf, capacidad)
+    grabador = None
+    if directorio_grabacion:
+        grabador = Grabador(directorio_grabacion, fs=fs)
+        print(f"✓ Grabando en {directorio_grabacion}")
+    try:
+        if crear_fuente is None:
+            crear_fuente = partial(FuenteSerial, puerto, baud, fs=fs)
+        fuente = crear_fuente(buffer, grabador=grabador)
+    except Exception as e:
+        print(f"❌ Error al abrir la fuente ({puerto}): {e}")
+        evento_fin.set()
+        if grabador:
+            grabador.cerrar()
+        del buffer
+        shm.close()
+        return
+
+    print(f"✓ Proceso de adquisición leyendo {type(fuente).__name__}")
+    while not evento_fin.is_set():
+        try:
+            if fuente.leer() == 0:
+                time.sleep(0.01 if fuente.terminada else 0.001)
+        except Exception:
+            fuente.errores_lectura += 1
+            time.sleep(0.001)
+        contadores[0] = fuente.datos_recibidos
+        contadores[1] = fuente.errores_lectura
+        reloj = fuente.reloj
+        if reloj is not None:
+            contadores[2] = reloj.huecos
+            contadores[3] = reloj.perdidas
+            if fs_medida is not None and reloj.listo:
+                fs_medida.value = reloj.fs
+
+    fuente.cerrar()
+    if grabador:
+        grabador.cerrar()
+    del buffer
+    shm.close()
+
+
+def proceso_dsp(nombre_muestras, capacidad, n, nombre_resultados, campos,
+                funcion_analisis, evento_fin, fs_medida=None, periodo_min=0.02,
+                ajustes=None, funcion_ajuste=None):
+    """Analiza la ventana más reciente cada vez que llegan muestras nuevas.
+
+    periodo_min limita la tasa de análisis para no ocupar un núcleo entero
+    recalculando por cada puñado de muestras. fs_medida (mp.Value, 0 = aún
+    no hay estimación) se pasa a funcion_analisis como fs. Los dicts que
+    lleguen por ajustes (mp.Queue) se aplican con funcion_ajuste(**ajuste)
+    entre dos análisis.
+    """
+    shm = shared_memory.SharedMemory(name=nombre_muestras)
+    buffer = BufferCircular.desde_memoria(shm.buf, capacidad)
+    resultados = BloqueResultados(campos, nombre=nombre_resultados)
+
+    ultimo_total = -1
+    while not evento_fin.is_set():
+        if ajustes is not None:
+            aplicar_ajustes(ajustes, funcion_ajuste)
+        total = buffer.total_escrito
+        if total == ultimo_total:
+            time.sleep(0.001)
+            continue
+        n_nuevos = total - ultimo_total if ultimo_total >= 0 else None
+        ultimo_total = total
+        inicio = time.perf_counter()
+        # Copia local: el productor puede sobrescribir mientras se analiza
+        datos = np.array(buffer.ultimos(n, hasta=total))
+        try:
+            fs = fs_medida.value if fs_medida is not None else 0.0
+            resultados.escribir(funcion_analisis(datos, n_nuevos, fs=fs or None))
+        except Exception as e:
+            print(f"Error en DSP: {e}")
+        espera = periodo_min - (time.perf_counter() - inicio)
+        if espera > 0:
+            time.sleep(espera)
+
+    resultados.cerrar()
+    del buffer
+    shm.close()
+
+
+def aplicar_ajustes(ajustes, funcion_ajuste):
+    """Aplica todos los ajustes pendientes en la cola (sin bloquear)"""
+    while True:
+        try:
+            ajuste = ajustes.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            funcion_ajuste(**ajuste)
+        except Exception as e:
+            print(f"Error al ajustar el DSP: {e}")
+
+
+# ============================================
+# ORQUESTADOR (lado GUI)
+# ============================================
+class Pipeline:
+    def __init__(self, puerto, baud, n, campos, funcion_analisis, holgura=HOLGURA_POR_DEFECTO,
+                 directorio_grabacion=None, fs=None, crear_fuente=None, funcion_ajuste=None):
+        """funcion_analisis(datos, n_nuevos, fs=...) -> dict con los campos.
+
+        n_nuevos es cuántas muestras del final de datos no se habían visto
+        (None en la primera llamada); fs es la fs efectiva medida (None si
+        aún no hay estimación). Debe ser importable (picklable).
+        Con directorio_grabacion el proceso de adquisición guarda el ADC crudo.
+        crear_fuente (picklable, ej. functools.partial) reemplaza al puerto serial.
+        funcion_ajuste(**parametros) (importable) cambia el análisis en marcha
+        dentro del proceso DSP; se invoca con ajustar().
+        """
+        self.puerto = puerto
+        self.baud = baud
+        self.n = n
+        self.capacidad = int(n * (1 + holgura))
+        self.campos = campos
+        self.funcion_analisis = funcion_analisis
+        self.directorio_grabacion = directorio_grabacion
+        self.fs = fs
+        self.crear_fuente = crear_fuente
+        self.funcion_ajuste = funcion_ajuste
+        self.procesos = []
+
+    def iniciar(self):
+        self._shm_muestras = shared_memory.SharedMemory(
+            create=True, size=BufferCircular.bytes_necesarios(self.capacidad))
+        self.buffer = BufferCircular.desde_memoria(self._shm_muestras.buf, self.capacidad)
+        self.resultados = BloqueResultados(self.campos)
+        # [datos_recibidos, errores_lectura, huecos, muestras_perdidas]
+        self.contadores = mp.Array('q', 4)
+        self.fs_medida = mp.Value('d', 0.0)
+        self.evento_fin = mp.Event()
+        self.ajustes = mp.Queue() if self.funcion_ajuste else None
+
+        self.procesos = [
+            mp.Process(target=proceso_adquisicion, daemon=True,
+                       args=(self.puerto, self.baud, self._shm_muestras.name,
+                             self.capacidad, self.contadores, self.evento_fin,
+                             self.directorio_grabacion, self.fs, self.crear_fuente,
+                             self.fs_medida)),
+            mp.Process(target=proceso_dsp, daemon=True,
+                       args=(self._shm_muestras.name, self.capacidad, self.n,
+                             self.resultados.nombre, self.campos,
+                             self.funcion_analisis, self.evento_fin, self.fs_medida,
+                             0.02, self.ajustes, self.funcion_ajuste)),
+        ]
+        for proceso in self.procesos:
+            proceso.start()
+
+    def leer_resultados(self):
+        """Último resultado del DSP o None si no hay uno nuevo desde la última llamada"""
+        return self.resultados.leer()
+
+    @property
+    def datos_recibidos(self):
+        return self.contadores[0]
+
+    @property
+    def errores_lectura(self):
+        return self.contadores[1]
+
+    @property
+    def huecos(self):
+        """(huecos, muestras perdidas) detectados por el reloj de la fuente"""
+        return self.contadores[2], self.contadores[3]
+
+    def ajustar(self, **parametros):
+        """Envía parámetros nuevos al proceso DSP (ej. fc_envolvente=60)"""
+        if self.ajustes is None:
+            raise RuntimeError("Pipeline sin funcion_ajuste")
+        self.ajustes.put(parametros)
+
+    def detener(self):
+        self.evento_fin.set()
+        for proceso in self.procesos:
+            proceso.join(timeout=3)
+            if proceso.is_alive():
+                proceso.terminate()
+        self.procesos = []
+        self.resultados.cerrar(liberar=True)
+        del self.buffer
+        self._shm_muestras.close()
+        self._shm_muestras.unlink()
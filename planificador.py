@@ -0,0 +1,131 @@
+import time
+from contextlib import contextmanager
+
+# ============================================
+# PLANIFICADOR DE FRAMES DE LA GUI
+# ============================================
+# Reemplaza el QTimer fijo y el "frames % 10" para la FFT:
+#   - Mide cuánto tarda cada etapa (DSP, trazas, espectro...) con un
+#     promedio exponencial.
+#   - Ajusta el intervalo del timer para que la GUI use como mucho
+#     `presupuesto` de un núcleo (el resto queda para el hilo serial).
+#     La mitad del presupuesto es para los frames y la otra mitad para las
+#     etapas lentas (espectro/panel), cuyo periodo también se adapta.
+#   - Salta los frames en que no llegaron muestras nuevas.
+#   - Cuenta FPS reales, frames perdidos (el timer llegó tarde) y saltados.
+
+INTERVALO_MIN = 1 / 30     # s (tope de 30 FPS)
+INTERVALO_MAX = 0.5        # s
+PRESUPUESTO = 0.5          # Fracción de un núcleo para la GUI
+ALFA = 0.2                 # Peso de la medición nueva en los promedios
+CAMBIO_MIN = 0.2           # Cambio relativo mínimo para tocar el QTimer
+
+
+class PlanificadorFrames:
+    def __init__(self, intervalo_inicial=0.1, intervalo_min=INTERVALO_MIN,
+                 intervalo_max=INTERVALO_MAX, presupuesto=PRESUPUESTO, periodo_lento=0.5):
+        self.intervalo = intervalo_inicial
+        self.intervalo_min = intervalo_min
+        self.intervalo_max = intervalo_max
+        self.presupuesto = presupuesto
+        self.periodo_lento_min = periodo_lento   # Periodo mínimo de las etapas lentas (s)
+        self.periodo_lento = periodo_lento
+
+        self.tiempos = {}          # Etapa -> costo promedio (s)
+        self._lentas = set()
+        self._ultima_lenta = {}    # Etapa lenta -> perf_counter de su última ejecución
+        self._t_frame = None
+        self._t_anterior = None
+        self._lento_en_frame = 0.0
+        self._costo_frame = None   # Promedio sin etapas lentas (s)
+        self._fin_anterior = None
+        self._periodo_medido = None  # Promedio entre frames procesados (s)
+
+        self.frames = 0
+        self.saltados = 0          # Sin muestras nuevas
+        self.perdidos = 0          # El timer llegó más tarde de lo pedido
+
+    # ---------- Ciclo de un frame ----------
+    def inicio_frame(self, hay_datos=True):
+        """Llamar al disparar el timer; False = no hay nada que hacer en este frame"""
+        ahora = time.perf_counter()
+        if self._t_anterior is not None:
+            transcurrido = ahora - self._t_anterior
+            atrasados = int(transcurrido / self.intervalo) - 1
+            if atrasados > 0:
+                self.perdidos += atrasados
+        self._t_anterior = ahora
+        if not hay_datos:
+            self.saltados += 1
+            return False
+        self._t_frame = ahora
+        self._lento_en_frame = 0.0
+        return True
+
+    @contextmanager
+    def etapa(self, nombre, lenta=False):
+        """Mide una etapa: with planificador.etapa('dsp'): ..."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            costo = time.perf_counter() - inicio
+            self._promediar(nombre, costo)
+            if lenta:
+                self._lentas.add(nombre)
+                self._lento_en_frame += costo
+
+    def toca(self, nombre):
+        """True si a la etapa lenta `nombre` le toca correr en este frame"""
+        ahora = time.perf_counter()
+        ultima = self._ultima_lenta.get(nombre)
+        if ultima is not None and ahora - ultima < self.periodo_lento:
+            return False
+        self._ultima_lenta[nombre] = ahora
+        return True
+
+    def fin_frame(self):
+        """Cierra el frame; devuelve el nuevo intervalo del timer en ms o None si no cambia"""
+        if self._t_frame is None:
+            return None
+        ahora = time.perf_counter()
+        costo = ahora - self._t_frame - self._lento_en_frame
+        self._costo_frame = costo if self._costo_frame is None else \
+            (1 - ALFA) * self._costo_frame + ALFA * costo
+        if self._fin_anterior is not None:
+            periodo = ahora - self._fin_anterior
+            self._periodo_medido = periodo if self._periodo_medido is None else \
+                (1 - ALFA) * self._periodo_medido + ALFA * periodo
+        self._fin_anterior = ahora
+        self._t_frame = None
+        self.frames += 1
+
+        # Cada mitad del presupuesto: frames rápidos y etapas lentas
+        mitad = self.presupuesto / 2
+        costo_lento = sum(self.tiempos[n] for n in self._lentas)
+        self.periodo_lento = max(self.periodo_lento_min, costo_lento / mitad)
+        nuevo = min(self.intervalo_max, max(self.intervalo_min, self._costo_frame / mitad))
+        if abs(nuevo - self.intervalo) > CAMBIO_MIN * self.intervalo:
+            self.intervalo = nuevo
+            return int(round(nuevo * 1000))
+        return None
+
+    def _promediar(self, nombre, costo):
+        anterior = self.tiempos.get(nombre)
+        self.tiempos[nombre] = costo if anterior is None else (1 - ALFA) * anterior + ALFA * costo
+
+    # ---------- Reporte ----------
+    @property
+    def intervalo_ms(self):
+        return int(round(self.intervalo * 1000))
+
+    @property
+    def fps(self):
+        """Frames procesados por segundo (medidos, no los pedidos al timer)"""
+        if not self._periodo_medido:
+            return 0.0
+        return 1.0 / self._periodo_medido
+
+    def resumen_tiempos(self):
+        """'dsp 3.1 | trazas 0.8 | espectro 4.2 ms'"""
+        return " | ".join(f"{nombre} {costo * 1000:.1f}" for nombre, costo in self.tiempos.items()) + " ms"
@@ -0,0 +1,203 @@
+import struct
+import binascii
+import numpy as np
+
+# ============================================
+# PROTOCOLO BINARIO CON TRAMAS
+# ============================================
+# Todas las cantidades en little-endian:
+#
+#   SYNC     2 bytes   0xA5 0x5A
+#   seq      uint16    contador de trama (da la vuelta en 65535)
+#   n        uint16    número de muestras en la trama
+#   payload  n*uint16  muestras ADC
+#   crc      uint16    CRC-16/CCITT (poly 0x1021, inicio 0xFFFF) de seq+n+payload
+#
+# El CRC coincide con binascii.crc_hqx(datos, 0xFFFF), así el firmware puede
+# usar la implementación clásica bit a bit sin tablas.
+# Comparado con "512\r\n" (5 bytes/muestra) son ~2 bytes/muestra.
+#
+# Multicanal: el payload lleva cuadros intercalados (c0, c1, ..., c0, c1...)
+# y n cuenta valores, múltiplo del número de canales. Como cada trama
+# empieza en el canal 0, una trama perdida no desalinea los canales.
+
+SYNC = b'\xA5\x5A'
+CABECERA = struct.Struct('<2sHH')
+TAM_CABECERA = CABECERA.size   # 6 bytes
+TAM_CRC = 2
+MAX_MUESTRAS = 1024            # Cotas para descartar cabeceras falsas rápido
+CRC_INICIAL = 0xFFFF
+
+
+def crc16(datos):
+    """CRC-16/CCITT-FALSE usado en las tramas"""
+    return binascii.crc_hqx(datos, CRC_INICIAL)
+
+
+def codificar_trama(seq, muestras):
+    """Empaqueta muestras uint16 en una trama lista para enviar"""
+    payload = np.ascontiguousarray(muestras, dtype='<u2').tobytes()
+    cuerpo = struct.pack('<HH', seq & 0xFFFF, len(payload) // 2) + payload
+    return SYNC + cuerpo + struct.pack('<H', crc16(cuerpo))
+
+
+class DecodificadorTramas:
+    def __init__(self, canales=1):
+        """canales > 1: alimentar() devuelve bloques canales x k"""
+        self.canales = canales
+        self._pendiente = bytearray()
+        self._ultimo_seq = None
+        # Contadores para la GUI / diagnóstico
+        self.tramas_validas = 0
+        self.tramas_corruptas = 0
+        self.tramas_perdidas = 0   # Huecos en el número de secuencia
+        self.muestras_perdidas = 0  # Por canal; estimado con el tamaño de la trama siguiente
+        self.bytes_descartados = 0
+
+    def alimentar(self, bloque):
+        """Agrega bytes recibidos y devuelve las muestras de las tramas completas.
+
+        Ante basura o una trama corrupta avanza hasta el siguiente SYNC con
+        bytearray.find(), por lo que la resincronización es lineal en el bloque.
+        """
+        buf = self._pendiente
+        buf += bloque
+        pos = 0
+        payloads = []
+
+        while True:
+            i = buf.find(SYNC, pos)
+            if i < 0:
+                # Conservar el último byte por si es la mitad de un SYNC
+                fin = max(pos, len(buf) - 1)
+                self.bytes_descartados += fin - pos
+                pos = fin
+                break
+            self.bytes_descartados += i - pos
+            pos = i
+
+            if len(buf) - i < TAM_CABECERA:
+                break
+            _, seq, n = CABECERA.unpack_from(buf, i)
+            if n > MAX_MUESTRAS:
+                self.tramas_corruptas += 1
+                self.bytes_descartados += 1
+                pos = i + 1
+                continue
+
+            fin_payload = i + TAM_CABECERA + 2 * n
+            if len(buf) < fin_payload + TAM_CRC:
+                break
+            crc, = struct.unpack_from('<H', buf, fin_payload)
+            if crc16(memoryview(buf)[i + 2:fin_payload]) != crc:
+                self.tramas_corruptas += 1
+                self.bytes_descartados += 1
+                pos = i + 1
+                continue
+
+            if n % self.canales:
+                # CRC correcto pero no trae cuadros completos: se descarta entera
+                self.tramas_corruptas += 1
+                pos = fin_payload + TAM_CRC
+                continue
+
+            if self._ultimo_seq is not None:
+                perdidas = (seq - self._ultimo_seq - 1) & 0xFFFF
+                self.tramas_perdidas += perdidas
+                self.muestras_perdidas += perdidas * n // self.canales
+            self._ultimo_seq = seq
+            self.tramas_validas += 1
+            payloads.append(bytes(buf[i + TAM_CABECERA:fin_payload]))
+            pos = fin_payload + TAM_CRC
+
+        del buf[:pos]
+        if not payloads:
+            muestras = np.empty(0, dtype=np.uint16)
+        else:
+            muestras = np.frombuffer(b''.join(payloads), dtype='<u2').astype(np.uint16)
+        if self.canales > 1:
+            return muestras.reshape(-1, self.canales).T
+        return muestras
+
+
+# ============================================
+# TRAMAS DE COMANDO (HOST <-> ESP32)
+# ============================================
+# Mismo CRC, SYNC invertido para no confundirlas con las de muestras:
+#
+#   SYNC     2 bytes   0x5A 0xA5
+#   codigo   uint8     qué comando es (CMD_TABLA, ...)
+#   n        uint16    bytes de payload
+#   payload  n bytes
+#   crc      uint16    CRC-16/CCITT de codigo+n+payload
+#
+# El ESP32 responde con el mismo formato (RESP_OK / RESP_ERROR, payload =
+# comando uint8 + desplazamiento uint32, ver transferencia.py).
+
+SYNC_COMANDO = b'\x5A\xA5'
+CABECERA_COMANDO = struct.Struct('<2sBH')
+MAX_PAYLOAD_COMANDO = 0xFFFF
+CMD_TABLA = ord('T')           # payload: incremento uint32, bits uint8, tabla uint8[2**bits]
+CMD_INICIO = ord('I')          # payload: largo uint32, fs uint32
+CMD_DATOS = ord('D')           # payload: desplazamiento uint32 + bytes de la forma de onda
+CMD_FIN = ord('F')             # payload: crc32 de toda la forma de onda
+RESP_OK = ord('A')
+RESP_ERROR = ord('N')
+RESPUESTA = struct.Struct('<BI')  # comando respondido, desplazamiento
+
+
+def partes_comando(codigo, *payload):
+    """Trama de comando en partes (cabecera, *payload, crc) para escribirla sin
+    juntar el payload en un bytes nuevo (cada parte: bytes o memoryview)."""
+    cabecera = struct.pack('<BH', codigo, sum(len(p) for p in payload))
+    crc = crc16(cabecera)
+    for parte in payload:
+        crc = binascii.crc_hqx(parte, crc)
+    return (SYNC_COMANDO + cabecera,) + payload + (struct.pack('<H', crc),)
+
+
+def codificar_comando(codigo, payload):
+    """Trama de comando lista para enviar (payload: bytes o memoryview)"""
+    return b''.join(partes_comando(codigo, payload))
+
+
+class DecodificadorComandos:
+    """Separa tramas de comando de un flujo de bytes; ignora texto y tramas corruptas"""
+
+    def __init__(self, max_payload=MAX_PAYLOAD_COMANDO):
+        """max_payload: cota para descartar rápido cabeceras falsas (como MAX_MUESTRAS)"""
+        self.max_payload = max_payload
+        self._pendiente = bytearray()
+        self.tramas_corruptas = 0
+
+    def alimentar(self, bloque):
+        """Devuelve [(codigo, payload), ...] de las tramas completas con CRC correcto"""
+        buf = self._pendiente
+        buf += bloque
+        pos = 0
+        tramas = []
+        while True:
+            i = buf.find(SYNC_COMANDO, pos)
+            if i < 0:
+                pos = max(pos, len(buf) - 1)
+                break
+            pos = i
+            if len(buf) - i < CABECERA_COMANDO.size:
+                break
+            _, codigo, n = CABECERA_COMANDO.unpack_from(buf, i)
+            if n > self.max_payload:
+                self.tramas_corruptas += 1
+                pos = i + 1
+                continue
+            fin = i + CABECERA_COMANDO.size + n
+            if len(buf) < fin + TAM_CRC:
+                break
+            crc, = struct.unpack_from('<H', buf, fin)
+            if crc16(memoryview(buf)[i + 2:fin]) != crc:
+                self.tramas_corruptas += 1
+                pos = i + 1
+                continue
+            tramas.append((codigo, bytes(buf[i + CABECERA_COMANDO.size:fin])))
+            pos = fin + TAM_CRC
+        del buf[:pos]
+        return tramas
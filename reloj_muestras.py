@@ -0,0 +1,123 @@
+import math
+import time
+
+# ============================================
+# RELOJ DE MUESTRAS: fs EFECTIVA Y HUECOS
+# ============================================
+# El Arduino no muestrea exactamente a la fs nominal y el enlace USB
+# entrega en ráfagas. Cada bloque recibido se marca con el reloj del host
+# (time.perf_counter) junto a su posición acumulada, y una regresión lineal
+# por mínimos cuadrados del tiempo contra la posición, con olvido
+# exponencial (constante `tau`), da el periodo efectivo: su pendiente.
+# El jitter del USB mueve los puntos pero se promedia en la pendiente.
+#
+# Hueco: si un bloque llega bastante más tarde de lo que predice la recta
+# para su última muestra, faltan muestras (el Arduino dejó de muestrear o
+# se perdieron bytes)... o el USB solo lo demoró. Por eso se espera al
+# bloque siguiente: si también llega tarde, el hueco se confirma, se estima
+# como retraso * fs y se suma a la posición, así la recta sigue valiendo
+# después del hueco. Un bloque demorado suelto no entra en la regresión.
+#
+# Las sumas de la regresión se recentran en el último punto en cada bloque:
+# no crecen con el tiempo y no pierden precisión en sesiones largas.
+
+TAU = 20.0              # s - memoria de la regresión
+SPAN_MIN = 1.0          # s de datos antes de publicar una fs
+UMBRAL_HUECO = 0.02     # s - retraso mínimo para declarar un hueco
+LIMITE_JITTER = 6.0     # El retraso también debe superar LIMITE_JITTER * jitter
+ALFA_JITTER = 0.05      # Peso del residuo nuevo en el jitter
+TOLERANCIA = 0.2        # Se ignoran estimaciones a más de ±20% de la nominal
+
+
+class EstimadorFs:
+    def __init__(self, fs_nominal=None, tau=TAU, umbral_hueco=UMBRAL_HUECO, tolerancia=TOLERANCIA):
+        """fs_nominal=None: no se conoce (fs queda en None hasta tener una estimación)"""
+        self.fs_nominal = fs_nominal
+        self.tau = tau
+        self.umbral_hueco = umbral_hueco
+        self.tolerancia = tolerancia
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.fs = self.fs_nominal
+        self.muestras = 0        # Recibidas
+        self.perdidas = 0        # Estimadas en huecos
+        self.huecos = 0
+        self.jitter = 0.0        # Desviación típica del retraso de llegada (s)
+        self._sumas = (0.0, 0.0, 0.0, 0.0, 0.0)  # S0, Sx, Sy, Sxx, Sxy respecto del último punto
+        self._t = None           # Llegada del último bloque de la regresión
+        self._t_primero = None
+        self._pendientes = 0     # Muestras recibidas desde ese bloque
+        self._sospecha = None    # Retraso del bloque anterior, si llegó tarde
+
+    @property
+    def listo(self):
+        """True cuando la regresión ya cubre SPAN_MIN segundos"""
+        return self._t is not None and self._t - self._t_primero >= SPAN_MIN
+
+    def registrar(self, n, t=None):
+        """Registra un bloque de n muestras cuya última llegó en t (perf_counter).
+
+        Devuelve cuántas muestras se estiman perdidas (un hueco se confirma
+        con el bloque siguiente al que llegó tarde).
+        """
+        if n <= 0:
+            return 0
+        if t is None:
+            t = time.perf_counter()
+        self.muestras += n
+        if self._t is None:
+            self._t = self._t_primero = t
+            self._sumas = (1.0, 0.0, 0.0, 0.0, 0.0)
+            return 0
+
+        dx = float(self._pendientes + n)
+        dt = t - self._t
+        perdidas = 0
+        if self.listo and self.fs:
+            retraso = dt - self._predecir(dx)
+            if retraso > max(self.umbral_hueco, LIMITE_JITTER * self.jitter):
+                if self._sospecha is None:
+                    # ¿Hueco o bloque demorado? Lo decide el bloque siguiente
+                    self._sospecha = retraso
+                    self._pendientes += n
+                    return 0
+                perdidas = int(round(min(self._sospecha, retraso) * self.fs))
+                dx += perdidas
+                self.perdidas += perdidas
+                self.huecos += 1
+            else:
+                self.jitter = math.sqrt((1 - ALFA_JITTER) * self.jitter ** 2
+                                        + ALFA_JITTER * retraso ** 2)
+        self._sospecha = None
+        self._pendientes = 0
+
+        # Olvido según el tiempo transcurrido y recentrado en el punto nuevo
+        olvido = math.exp(-max(dt, 0.0) / self.tau)
+        s0, sx, sy, sxx, sxy = (s * olvido for s in self._sumas)
+        sxx = sxx - 2 * dx * sx + dx * dx * s0
+        sxy = sxy - dx * sy - dt * sx + dx * dt * s0
+        sx = sx - dx * s0
+        sy = sy - dt * s0
+        self._sumas = (s0 + 1.0, sx, sy, sxx, sxy)
+        self._t = t
+        self._actualizar_fs()
+        return perdidas
+
+    def _predecir(self, dx):
+        """Tiempo desde el último bloque en que debería llegar la posición dx"""
+        s0, sx, sy, _, _ = self._sumas
+        return sy / s0 + (dx - sx / s0) / self.fs
+
+    def _actualizar_fs(self):
+        s0, sx, sy, sxx, sxy = self._sumas
+        denominador = s0 * sxx - sx * sx
+        if not self.listo or denominador <= 0:
+            return
+        periodo = (s0 * sxy - sx * sy) / denominador
+        if periodo <= 0:
+            return
+        fs = 1.0 / periodo
+        if self.fs_nominal and abs(fs / self.fs_nominal - 1) > self.tolerancia:
+            return  # Ráfagas raras al arrancar: no es una fs creíble
+        self.fs = fs
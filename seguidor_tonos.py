@@ -0,0 +1,88 @@
+import numpy as np
+
+# ============================================
+# SEGUIDOR DE TONOS (DFT DESLIZANTE / GOERTZEL)
+# ============================================
+# Solo interesan fc, fc±fm y quizá algunos armónicos: en vez de una FFT
+# completa por frame se evalúa la DFT en esas frecuencias sobre una ventana
+# rectangular deslizante de L muestras, con una salida POR MUESTRA:
+#
+#   y[i] = x[i] * e^(-j w i)          (demodulación compleja)
+#   S[n] = sum(y[n-L+1 .. n])         (suma móvil con cumsum por bloque)
+#   A[n] = 2 |S[n]| / L               (amplitud del tono)
+#
+# Si L*fm/fs es entero, los nulos de la ventana rectangular caen justo en
+# los otros tonos y la portadora no se filtra a las bandas laterales; el
+# offset DC del ADC cae en el nulo de f=0 si además L*fc/fs es entero.
+
+PERIODOS_FM = 10  # Ventana = 10 periodos de la moduladora (200 ms a 50 Hz)
+
+
+class SeguidorTonos:
+    def __init__(self, fs, frecuencias, longitud):
+        self.fs = fs
+        self.frecuencias = np.asarray(frecuencias, dtype=np.float64)
+        self.longitud = int(longitud)
+        self._duracion = self.longitud / fs   # s: se conserva si cambia fs
+        self._omega = 2 * np.pi * self.frecuencias / fs
+        self.reiniciar()
+
+    @classmethod
+    def para_am(cls, fs, fc, fm, armonicos=1, periodos_fm=PERIODOS_FM):
+        """Tonos [fc, fc-fm, fc+fm, fc-2fm, fc+2fm, ...] con ventana múltiplo de 1/fm.
+
+        armonicos = cuántos pares de bandas laterales fc±k*fm seguir.
+        """
+        frecuencias = [fc]
+        for k in range(1, armonicos + 1):
+            frecuencias += [fc - k * fm, fc + k * fm]
+        longitud = max(1, int(round(periodos_fm * fs / fm)))
+        return cls(fs, frecuencias, longitud)
+
+    def ajustar_fs(self, fs):
+        """Nueva fs: la ventana se escala para seguir cubriendo los mismos periodos"""
+        self.longitud = max(1, int(round(self._duracion * fs)))
+        self.fs = fs
+        self._omega = 2 * np.pi * self.frecuencias / fs
+        self.reiniciar()
+
+    def reiniciar(self):
+        n_tonos = len(self.frecuencias)
+        self._historia = np.zeros((n_tonos, self.longitud), dtype=np.complex128)
+        self._fase = np.zeros(n_tonos)   # Fase acumulada (mod 2pi) de la muestra siguiente
+        self.muestras = 0
+        self.ultimo = np.zeros(n_tonos)  # Amplitudes en la última muestra
+
+    @property
+    def listo(self):
+        """True cuando la ventana ya está llena de muestras reales"""
+        return self.muestras >= self.longitud
+
+    def procesar(self, bloque):
+        """Agrega un bloque y devuelve las amplitudes por muestra (n_tonos x n)"""
+        x = np.asarray(bloque, dtype=np.float64)
+        n = x.size
+        if n == 0:
+            return np.empty((len(self.frecuencias), 0))
+
+        fases = self._fase[:, None] + self._omega[:, None] * np.arange(n)
+        y = x[None, :] * np.exp(-1j * fases)
+        self._fase = (self._fase + self._omega * n) % (2 * np.pi)
+
+        # Suma móvil: las últimas L de la historia más el bloque nuevo
+        extendida = np.concatenate((self._historia, y), axis=1)
+        acumulada = np.cumsum(extendida, axis=1)
+        sumas = acumulada[:, self.longitud:] - acumulada[:, :n]
+        self._historia = extendida[:, -self.longitud:]
+        self.muestras += n
+
+        amplitudes = 2.0 * np.abs(sumas) / self.longitud
+        self.ultimo = amplitudes[:, -1]
+        return amplitudes
+
+    @staticmethod
+    def indice_modulacion(amplitudes):
+        """m = (A_LSB + A_USB) / A_portadora (filas 0, 1, 2 de amplitudes)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(amplitudes[0] > 0,
+                            (amplitudes[1] + amplitudes[2]) / amplitudes[0], np.nan)
@@ -0,0 +1,180 @@
+import math
+import struct
+import time
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+
+from espectro import espectro_magnitud
+from protocolo_binario import codificar_comando, CMD_TABLA
+
+# ============================================
+# SÍNTESIS POR TABLA + ACUMULADOR DE FASE (ESP32)
+# ============================================
+# Antes el ESP32 evaluaba dos sin() en float por muestra dentro del ISR de
+# 50 kHz: no llegaba a portadoras por encima de ~5 kHz. Ahora el host
+# compila la señal y el ISR solo hace aritmética entera:
+#     fase += incremento;  i = fase >> (32 - bits);  frac = 8 bits siguientes
+#     dacWrite(DAC, tabla[i] + ((tabla[i + 1] - tabla[i]) * frac >> 8));
+#   - La tabla (2**bits bytes) es UN periodo base de la señal AM:
+#     f_base = fm / ciclos_m y contiene ciclos_c = fc / f_base portadoras
+#     y ciclos_m moduladoras enteras, así empalma sin saltos.
+#   - incremento = round(2**32 * f_base / fs): resolución de fs / 2**32.
+#   - Interpolación lineal entre entradas: sin ella, truncar la fase deja
+#     espurios a ~-6 dB por bit de puntos por ciclo (~-30 dB con 32 puntos);
+#     con ella quedan por debajo del ruido de cuantización de 8 bits.
+#   - Las frecuencias emitidas (fc_real, fm_real) salen exactas del modelo
+#     y simular() reproduce bit a bit lo que saca el DAC.
+#   - pureza() mide offline el espectro de esa secuencia: nivel de
+#     portadora y bandas laterales, m y el peor espurio (SFDR).
+# La tabla viaja en una trama de comando con CRC (protocolo_binario.py).
+
+FS_ESP32 = 50000              # Hz - SAMPLE_RATE de GetAMSignalESP32.ino
+VREF_DAC = 3.3                # V a fondo de escala del DAC de 8 bits
+BITS_FASE = 32
+BITS_FRACCION = 8             # Bits de fase para interpolar entre entradas
+BITS_MIN = 8
+BITS_MAX = 14                 # MAX_TABLA del firmware (16384 bytes)
+PUNTOS_POR_CICLO = 32         # Puntos de tabla por ciclo de portadora buscados
+PUNTOS_MIN = 4                # Por debajo se aproxima fc/fm
+FC_MAX = 0.4 * FS_ESP32       # Tope de portadora (muestras por ciclo >= 2.5)
+PUREZA_MIN_DB = 40.0          # SFDR por debajo del cual se avisa
+N_SIMULACION = 1 << 16        # Muestras para la medición offline
+EXCLUSION = 8                 # Bins alrededor de cada tono esperado
+
+
+class TablaDDS:
+    """Tabla uint8 de 2**bits muestras recorrida con un acumulador de fase de 32 bits"""
+
+    def __init__(self, tabla, incremento, fs, ciclos_c, ciclos_m):
+        self.tabla = np.ascontiguousarray(tabla, dtype=np.uint8)
+        self.bits = int(len(self.tabla)).bit_length() - 1
+        if len(self.tabla) != 1 << self.bits:
+            raise ValueError("el largo de la tabla debe ser potencia de 2")
+        self.incremento = int(incremento)
+        self.fs = fs
+        self.ciclos_c = ciclos_c
+        self.ciclos_m = ciclos_m
+
+    @property
+    def f_base(self):
+        """Frecuencia de repetición de la tabla que realmente se emite"""
+        return self.incremento * self.fs / 2 ** BITS_FASE
+
+    @property
+    def fc_real(self):
+        return self.ciclos_c * self.f_base
+
+    @property
+    def fm_real(self):
+        return self.ciclos_m * self.f_base
+
+    def simular(self, n, fase=0):
+        """Códigos DAC de las próximas n muestras, igual que el ISR (suma, luego lee e interpola)"""
+        pasos = np.arange(1, n + 1, dtype=np.uint64) * np.uint64(self.incremento)
+        fases = (np.uint64(fase) + pasos) & np.uint64(0xFFFFFFFF)
+        indices = (fases >> np.uint64(BITS_FASE - self.bits)).astype(np.int64)
+        fraccion = ((fases >> np.uint64(BITS_FASE - self.bits - BITS_FRACCION))
+                    & np.uint64((1 << BITS_FRACCION) - 1)).astype(np.int64)
+        a = self.tabla[indices].astype(np.int64)
+        b = self.tabla[(indices + 1) & (len(self.tabla) - 1)].astype(np.int64)
+        # >> de enteros con signo es aritmético, como en el firmware
+        return (a + (((b - a) * fraccion) >> BITS_FRACCION)).astype(np.uint8)
+
+    def voltajes(self, n, fase=0):
+        return self.simular(n, fase) * (VREF_DAC / 255)
+
+    def codificar(self):
+        """Trama CMD_TABLA: incremento uint32, bits uint8 y la tabla"""
+        payload = struct.pack('<IB', self.incremento, self.bits) + self.tabla.tobytes()
+        return codificar_comando(CMD_TABLA, payload)
+
+
+def _ciclos(fc, fm, max_ciclos_c):
+    """(ciclos_c, ciclos_m) enteros con ciclos_c/ciclos_m ≈ fc/fm y ciclos_c <= max_ciclos_c"""
+    razon = Fraction(fc).limit_denominator(10**6) / Fraction(fm).limit_denominator(10**6)
+    limite = 10**6
+    while True:
+        aproximada = razon.limit_denominator(limite)
+        if aproximada.numerator <= max_ciclos_c or limite == 1:
+            return aproximada.numerator, aproximada.denominator
+        limite = max(1, limite // 2)
+
+
+@lru_cache(maxsize=64)
+def compilar_am(fc, fm, m, offset, amplitud, fs=FS_ESP32, bits_max=BITS_MAX):
+    """Compila la señal AM a una TablaDDS con las mismas restricciones que START.
+
+    En caché por parámetros (compartida: no modificar la tabla devuelta).
+    """
+    if not 0 < fm < fc <= FC_MAX * fs / FS_ESP32:
+        raise ValueError(f"se necesita 0 < fm < fc <= {FC_MAX * fs / FS_ESP32:.0f} Hz")
+    m = min(max(m, 0.0), 1.0)
+    offset = min(max(offset, 0.0), VREF_DAC)
+    amplitud = min(max(amplitud, 0.0), VREF_DAC / 2)
+
+    ciclos_c, ciclos_m = _ciclos(fc, fm, (1 << bits_max) // PUNTOS_MIN)
+    bits = math.ceil(math.log2(PUNTOS_POR_CICLO * ciclos_c))
+    bits = min(max(bits, BITS_MIN), bits_max)
+    n = 1 << bits
+
+    # Un periodo base: ciclos_c portadoras y ciclos_m moduladoras enteras
+    theta = np.arange(n) / n
+    voltaje = offset + amplitud * (1 + m * np.sin(2 * np.pi * ciclos_m * theta)) * \
+        np.sin(2 * np.pi * ciclos_c * theta)
+    tabla = np.clip(np.round(voltaje / VREF_DAC * 255), 0, 255).astype(np.uint8)
+
+    incremento = round(2 ** BITS_FASE * (fm / ciclos_m) / fs)
+    return TablaDDS(tabla, incremento, fs, ciclos_c, ciclos_m)
+
+
+def pureza(tabla_dds, n=N_SIMULACION):
+    """Espectro de la secuencia emitida: niveles (dB) de portadora y bandas,
+    m medido, peor espurio y SFDR (portadora sobre el espurio, dB)."""
+    frecuencias, magnitud = espectro_magnitud(tabla_dds.voltajes(n), tabla_dds.fs)
+    df = frecuencias[1]
+    fc, fm = tabla_dds.fc_real, tabla_dds.fm_real
+
+    def nivel(f):
+        # Energía de los bins del lóbulo: no depende de dónde cae el tono en el bin
+        i = int(round(f / df))
+        return np.sqrt(np.sum(magnitud[max(i - 3, 0):i + 4] ** 2))
+
+    portadora, lsb, usb = nivel(fc), nivel(fc - fm), nivel(fc + fm)
+    resto = magnitud.copy()
+    for f in (0.0, fc - fm, fc, fc + fm):
+        i = int(round(f / df))
+        resto[max(i - EXCLUSION, 0):i + EXCLUSION + 1] = 0
+    i_espurio = int(np.argmax(resto))
+
+    def db(a, b):
+        return 20 * np.log10(max(a, 1e-30) / max(b, 1e-30))
+
+    return {
+        'fc_real': fc,
+        'fm_real': fm,
+        'm_medido': (lsb + usb) / portadora,
+        'lsb_db': db(lsb, portadora),
+        'usb_db': db(usb, portadora),
+        'f_espurio': frecuencias[i_espurio],
+        'sfdr_db': db(portadora, resto[i_espurio]),
+    }
+
+
+def enviar_tabla(ser, tabla_dds, espera=1.0):
+    """Sube la tabla al ESP32 y espera su respuesta; devuelve (ok, línea de respuesta).
+
+    espera se suma al tiempo de transmisión de la trama (10 bits por byte).
+    """
+    trama = tabla_dds.codificar()
+    ser.write(trama)
+    ser.flush()
+    limite = time.perf_counter() + espera + 10 * len(trama) / ser.baudrate
+    while time.perf_counter() < limite:
+        respuesta = ser.readline().decode(errors='replace').strip()
+        if 'GENERANDO' in respuesta:
+            return True, respuesta
+        if 'ERROR' in respuesta:
+            return False, respuesta
+    return False, "sin respuesta del ESP32"
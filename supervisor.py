@@ -0,0 +1,386 @@
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import atexit
+import _thread
+import threading
+import subprocess
+
+# ============================================
+# SUPERVISOR GENERADOR / ANALIZADOR
+# ============================================
+# Reemplaza a TwoScriptsAtTheSameTime.py (dos Popen sueltos): un solo punto
+# de entrada que lanza AMsignalESP32.py (generador) y GetAMSignal.py
+# (analizador) como trabajadores administrados.
+#   - Los dos arrancan a la vez: el analizador paga sus imports (Qt,
+#     pyqtgraph, scipy) mientras el ESP32 se reinicia, pero no abre el
+#     Arduino hasta que el generador avisa que está GENERANDO.
+#   - Un trabajador que termina con error se reinicia con espera creciente;
+#     demasiadas caídas seguidas lo dejan en 'fallido'.
+#   - Huérfanos: cada trabajador vigila su stdin (un pipe del supervisor).
+#     Si el supervisor termina, incluso a la fuerza, el pipe se cierra y el
+#     trabajador hace su cierre normal (STOP al ESP32, cierra el puerto) y
+#     sale: ningún proceso queda reteniendo un COM.
+#   - Canal de control: TCP en localhost, una línea por comando y una
+#     respuesta JSON ('estado', 'reiniciar <nombre>', 'detener').
+#     `python supervisor.py estado` consulta un supervisor en marcha.
+#
+# Protocolo con los trabajadores (por stdout, líneas con MARCA):
+#   MARCA + 'GENERANDO'     el generador está listo
+#   MARCA + {json}          contadores del trabajador (publicar_estado)
+# y por stdin el supervisor escribe 'GENERANDO' al analizador.
+# Sin supervisor (variable de entorno ausente) las funciones del lado del
+# trabajador no hacen nada: los scripts siguen funcionando solos.
+
+PUERTO_CONTROL = 8765           # TCP en 127.0.0.1; uno distinto por banco
+VARIABLE_ENTORNO = 'AM_SUPERVISOR'
+MARCA = '#SUPERVISOR '
+LISTO = 'GENERANDO'
+ESPERA_LISTO = 20.0             # s - sin aviso de listo, el generador se reinicia
+ESPERA_CIERRE = 3.0             # s - de cierre ordenado antes de terminar el proceso
+REINICIO_MIN = 1.0              # s - espera antes del primer reinicio (se duplica)
+REINICIO_MAX = 30.0
+MAX_CAIDAS = 5                  # Caídas dentro de VENTANA_CAIDAS -> 'fallido'
+VENTANA_CAIDAS = 300.0          # s
+PERIODO_ESTADO = 1.0            # s - mínimo entre dos publicar_estado
+
+
+# ============================================
+# LADO DEL TRABAJADOR
+# ============================================
+_generando = threading.Event()
+_ultimo_estado = 0.0
+
+
+def supervisado():
+    return os.environ.get(VARIABLE_ENTORNO) == '1'
+
+
+def unirse(esperar_generando=False, al_perder=None):
+    """Conecta el script con su supervisor (no hace nada si corre solo).
+
+    Vigila stdin: al cerrarse llama a al_perder (por defecto Ctrl+C en el
+    hilo principal y, si no alcanza, salida forzada). Con esperar_generando
+    bloquea hasta que el supervisor avisa que el generador está listo.
+    """
+    if not supervisado():
+        return
+
+    def vigilar():
+        for linea in sys.stdin:
+            if linea.strip() == LISTO:
+                _generando.set()
+        (al_perder or _interrumpir)()
+
+    threading.Thread(target=vigilar, daemon=True).start()
+    if esperar_generando and not _generando.is_set():
+        print("Esperando a que el generador esté listo...")
+        _generando.wait()
+
+
+def _interrumpir():
+    _thread.interrupt_main()  # Mismo camino que Ctrl+C: cierre normal del script
+    time.sleep(ESPERA_CIERRE)
+    os._exit(1)
+
+
+def avisar_listo():
+    """El generador ya está emitiendo la señal"""
+    if supervisado():
+        print(MARCA + LISTO, flush=True)
+
+
+def publicar_estado(**contadores):
+    """Publica contadores numéricos (como mucho uno por PERIODO_ESTADO)"""
+    global _ultimo_estado
+    if not supervisado():
+        return
+    ahora = time.monotonic()
+    if ahora - _ultimo_estado < PERIODO_ESTADO:
+        return
+    _ultimo_estado = ahora
+    print(MARCA + json.dumps(contadores), flush=True)
+
+
+# ============================================
+# TRABAJADOR ADMINISTRADO
+# ============================================
+class Trabajador:
+    """Un script lanzado, vigilado y reiniciado por el supervisor"""
+
+    def __init__(self, nombre, script, argumentos=()):
+        self.nombre = nombre
+        self.script = os.path.abspath(script)
+        self.argumentos = list(argumentos)
+        self.proceso = None
+        self.estado = 'detenido'  # iniciando, listo, caido, fallido, terminado, detenido
+        self.listo = threading.Event()
+        self.reinicios = 0
+        self.inicio = None
+        self.lineas = 0
+        self.ultima_salida = None
+        self.contadores = {}
+        self.tasas = {}           # Derivada por segundo de cada contador
+        self._anterior = None     # (hora, contadores) de la publicación anterior
+        self._caidas = []
+        self._proximo_inicio = None
+        self._cerrojo = threading.Lock()
+
+    @property
+    def vivo(self):
+        return self.proceso is not None and self.proceso.poll() is None
+
+    def iniciar(self):
+        entorno = dict(os.environ, PYTHONUNBUFFERED='1', PYTHONIOENCODING='utf-8')
+        entorno[VARIABLE_ENTORNO] = '1'
+        self.listo.clear()
+        self.contadores, self.tasas, self._anterior = {}, {}, None
+        self.proceso = subprocess.Popen(
+            [sys.executable, '-u', self.script, *self.argumentos],
+            cwd=os.path.dirname(self.script), env=entorno,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, encoding='utf-8', errors='replace', bufsize=1)
+        self.estado = 'iniciando'
+        self.inicio = time.monotonic()
+        threading.Thread(target=self._leer_salida, args=(self.proceso,), daemon=True).start()
+        print(f"✓ {self.nombre} iniciado (pid {self.proceso.pid})")
+
+    def _leer_salida(self, proceso):
+        for linea in proceso.stdout:
+            self.lineas += 1
+            self.ultima_salida = time.monotonic()
+            linea = linea.rstrip('\n')
+            if linea.startswith(MARCA):
+                self._mensaje(linea[len(MARCA):])
+            else:
+                print(f"[{self.nombre}] {linea}")
+
+    def _mensaje(self, mensaje):
+        if mensaje == LISTO:
+            self.listo.set()
+            self.estado = 'listo'
+            return
+        try:
+            contadores = json.loads(mensaje)
+        except ValueError:
+            return
+        ahora = time.monotonic()
+        with self._cerrojo:
+            if self._anterior is not None:
+                t_anterior, anteriores = self._anterior
+                dt = ahora - t_anterior
+                self.tasas = {clave: (valor - anteriores[clave]) / dt
+                              for clave, valor in contadores.items()
+                              if isinstance(valor, (int, float)) and clave in anteriores and dt > 0}
+            self.contadores = contadores
+            self._anterior = (ahora, contadores)
+
+    def enviar(self, linea):
+        """Escribe una línea en el stdin del trabajador (ignora si ya salió)"""
+        try:
+            self.proceso.stdin.write(linea + '\n')
+            self.proceso.stdin.flush()
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def detener(self):
+        """Cierre ordenado (stdin cerrado = Ctrl+C en el script); si no, terminate y kill"""
+        self.estado = 'detenido'
+        proceso = self.proceso
+        if proceso is None or proceso.poll() is not None:
+            return
+        try:
+            proceso.stdin.close()
+        except OSError:
+            pass
+        for accion in (None, proceso.terminate, proceso.kill):
+            if accion is not None:
+                accion()
+            try:
+                proceso.wait(timeout=ESPERA_CIERRE)
+                break
+            except subprocess.TimeoutExpired:
+                continue
+        print(f"✓ {self.nombre} detenido")
+
+    def revisar(self, ahora):
+        """Detecta caídas y reinicia con espera creciente; True si se reinició"""
+        if self.estado == 'caido' and ahora >= self._proximo_inicio:
+            self.reinicios += 1
+            self.iniciar()
+            return True
+        if self.estado not in ('iniciando', 'listo') or self.vivo:
+            return False
+        codigo = self.proceso.returncode
+        if codigo == 0:
+            self.estado = 'terminado'  # Salida normal (ej. se cerró la ventana)
+            print(f"⚠ {self.nombre} terminó normalmente; no se reinicia")
+        else:
+            self.registrar_caida(ahora, f"terminó con código {codigo}")
+        return False
+
+    def registrar_caida(self, ahora, motivo):
+        """Programa el reinicio (espera creciente) o lo deja 'fallido'"""
+        self._caidas = [t for t in self._caidas if ahora - t < VENTANA_CAIDAS] + [ahora]
+        if len(self._caidas) > MAX_CAIDAS:
+            self.estado = 'fallido'
+            print(f"❌ {self.nombre} cayó {len(self._caidas)} veces en {VENTANA_CAIDAS:.0f} s: no se reinicia")
+            return
+        espera = min(REINICIO_MIN * 2 ** (len(self._caidas) - 1), REINICIO_MAX)
+        self.estado = 'caido'
+        self._proximo_inicio = ahora + espera
+        print(f"⚠ {self.nombre} {motivo}; reinicio en {espera:.1f} s")
+
+    def informe(self):
+        ahora = time.monotonic()
+        with self._cerrojo:
+            contadores, tasas = dict(self.contadores), dict(self.tasas)
+        return {
+            'estado': self.estado,
+            'pid': self.proceso.pid if self.vivo else None,
+            'reinicios': self.reinicios,
+            'activo_s': ahora - self.inicio if self.vivo else 0.0,
+            'lineas': self.lineas,
+            'silencio_s': ahora - self.ultima_salida if self.ultima_salida else None,
+            'contadores': contadores,
+            'tasas': tasas,
+        }
+
+
+# ============================================
+# SUPERVISOR
+# ============================================
+class Supervisor:
+    def __init__(self, generador, analizador, puerto_control=PUERTO_CONTROL):
+        self.generador = generador
+        self.analizador = analizador
+        self.trabajadores = {t.nombre: t for t in (generador, analizador)}
+        self.puerto_control = puerto_control
+        self._fin = threading.Event()
+        self._avisado = False  # El analizador ya recibió GENERANDO
+        self._pedidos = []     # Reinicios pedidos por el canal de control
+        self._cerrojo = threading.Lock()
+
+    def iniciar(self):
+        threading.Thread(target=self._servir_control, daemon=True).start()
+        self.generador.iniciar()
+        self.analizador.iniciar()  # Importa mientras el ESP32 arranca; espera el aviso
+
+    def ejecutar(self):
+        """Vigila a los trabajadores hasta detener() o Ctrl+C"""
+        try:
+            while not self._fin.wait(0.2):
+                self._revisar()
+        except KeyboardInterrupt:
+            print("\nDeteniendo...")
+        finally:
+            self.detener()
+
+    def _revisar(self):
+        ahora = time.monotonic()
+        with self._cerrojo:
+            pedidos, self._pedidos = self._pedidos, []
+        for trabajador in pedidos:
+            # Reinicio manual: también rehabilita a un trabajador 'fallido'
+            trabajador.detener()
+            trabajador._caidas = []
+            trabajador.reinicios += 1
+            trabajador.iniciar()
+            self._avisado = False
+
+        generador = self.generador
+        if generador.estado == 'iniciando' and ahora - generador.inicio > ESPERA_LISTO:
+            generador.detener()
+            generador.registrar_caida(ahora, f"sin señal de listo en {ESPERA_LISTO:.0f} s")
+        for trabajador in self.trabajadores.values():
+            if trabajador.revisar(ahora):
+                self._avisado = False
+
+        # La compuerta del analizador: abre cuando el generador está listo
+        if generador.listo.is_set() and not self._avisado and self.analizador.vivo:
+            self.analizador.enviar(LISTO)
+            self.analizador.estado = 'listo'
+            self._avisado = True
+
+    def reiniciar(self, nombre):
+        if nombre not in self.trabajadores:
+            raise ValueError(f"trabajador desconocido: {nombre}")
+        with self._cerrojo:
+            self._pedidos.append(self.trabajadores[nombre])
+
+    def informe(self):
+        return {nombre: t.informe() for nombre, t in self.trabajadores.items()}
+
+    def detener(self):
+        self._fin.set()
+        # Primero el analizador (suelta el Arduino), después el generador (STOP al ESP32)
+        self.analizador.detener()
+        self.generador.detener()
+
+    # ---------- Canal de control ----------
+    def _servir_control(self):
+        try:
+            servidor = socket.create_server(('127.0.0.1', self.puerto_control))
+        except OSError as e:
+            print(f"⚠ Canal de control no disponible en el puerto {self.puerto_control}: {e}")
+            return
+        servidor.settimeout(0.5)
+        print(f"✓ Canal de control en 127.0.0.1:{self.puerto_control}")
+        with servidor:
+            while not self._fin.is_set():
+                try:
+                    conexion, _ = servidor.accept()
+                except socket.timeout:
+                    continue
+                threading.Thread(target=self._atender, args=(conexion,), daemon=True).start()
+
+    def _atender(self, conexion):
+        with conexion, conexion.makefile('rw', encoding='utf-8') as canal:
+            for linea in canal:
+                canal.write(json.dumps(self._comando(linea.split())) + '\n')
+                canal.flush()
+
+    def _comando(self, palabras):
+        try:
+            if palabras == ['estado']:
+                return self.informe()
+            if len(palabras) == 2 and palabras[0] == 'reiniciar':
+                self.reiniciar(palabras[1])
+                return {'ok': True}
+            if palabras == ['detener']:
+                self._fin.set()
+                return {'ok': True}
+            return {'error': "comandos: estado | reiniciar <nombre> | detener"}
+        except Exception as e:
+            return {'error': str(e)}
+
+
+def consultar(comando='estado', puerto=PUERTO_CONTROL):
+    """Envía un comando a un supervisor en marcha y devuelve su respuesta"""
+    with socket.create_connection(('127.0.0.1', puerto), timeout=5) as conexion, \
+            conexion.makefile('rw', encoding='utf-8') as canal:
+        canal.write(comando + '\n')
+        canal.flush()
+        return json.loads(canal.readline())
+
+
+def main(generador='AMsignalESP32.py', analizador='GetAMSignal.py', puerto_control=PUERTO_CONTROL):
+    carpeta = os.path.dirname(os.path.abspath(__file__))
+    supervisor = Supervisor(Trabajador('generador', os.path.join(carpeta, generador)),
+                            Trabajador('analizador', os.path.join(carpeta, analizador)),
+                            puerto_control)
+    # Terminado desde afuera (servicio, kill): mismo cierre ordenado que Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: supervisor._fin.set())
+    atexit.register(supervisor.detener)
+    supervisor.iniciar()
+    supervisor.ejecutar()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print(json.dumps(consultar(' '.join(sys.argv[1:])), indent=2, ensure_ascii=False))
+    else:
+        main()
@@ -0,0 +1,63 @@
+import math
+from fractions import Fraction
+
+import numpy as np
+
+# ============================================
+# TABLAS DE FORMA DE ONDA PRECALCULADAS
+# ============================================
+# Una señal AM muestreada a fs se repite exactamente cada N muestras, con N
+# el menor entero que hace enteros a N*fc/fs y a N*fm/fs (el mínimo común
+# múltiplo de los periodos de portadora y moduladora, en muestras). Basta
+# calcular esas N muestras UNA vez, vectorizado, y reproducirlas en ciclo:
+# el generador no evalúa senos por muestra y la tabla empalma sin saltos.
+
+MAX_TABLA = 1 << 16       # Muestras máximas de una tabla
+
+
+def periodo_comun(fs, *frecuencias, max_muestras=MAX_TABLA):
+    """Muestras del periodo común de todas las frecuencias a fs.
+
+    Las frecuencias no racionales respecto de fs se aproximan con la
+    fracción más cercana de denominador <= max_muestras.
+    """
+    n = 1
+    for f in frecuencias:
+        ciclos_por_muestra = (Fraction(f).limit_denominator(10**6) /
+                              Fraction(fs).limit_denominator(10**6))
+        n = math.lcm(n, ciclos_por_muestra.limit_denominator(max_muestras).denominator)
+    if n > max_muestras:
+        raise ValueError(f"periodo común de {n} muestras (máximo {max_muestras}): "
+                         f"elegir fc y fm que dividan mejor a fs")
+    return n
+
+
+def cuantizar(senal, bajo, alto, minimo=0, maximo=255):
+    """Mapea [bajo, alto] linealmente a códigos uint8 [minimo, maximo] (redondeando)"""
+    codigos = minimo + (maximo - minimo) * (np.asarray(senal) - bajo) / (alto - bajo)
+    return np.clip(np.round(codigos), minimo, maximo).astype(np.uint8)
+
+
+def senal_am(t, fc, fm, m, amplitud=1.0, offset=0.0):
+    """offset + amplitud * (1 + m sin(2π fm t)) sin(2π fc t)"""
+    return offset + amplitud * (1 + m * np.sin(2 * np.pi * fm * t)) * np.sin(2 * np.pi * fc * t)
+
+
+def tabla_am(fs, fc, fm, m, amplitud=1.0, offset=0.0, minimo=0, maximo=255, n=None):
+    """Un periodo común de la señal AM cuantizado a uint8.
+
+    La escala es la teórica, offset ± amplitud*(1+m) -> [minimo, maximo],
+    así el código no depende de qué muestras caen en la tabla.
+    n fuerza el largo (por defecto periodo_comun(fs, fc, fm)).
+    """
+    if n is None:
+        n = periodo_comun(fs, fc, fm)
+    t = np.arange(n) / fs
+    pico = amplitud * (1 + m)
+    return cuantizar(senal_am(t, fc, fm, m, amplitud, offset), offset - pico, offset + pico,
+                     minimo, maximo)
+
+
+def repetir(tabla, n):
+    """Las primeras n muestras de la tabla reproducida en ciclo"""
+    return np.resize(tabla, n)
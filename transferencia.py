@@ -0,0 +1,164 @@
+import time
+import struct
+import zlib
+
+import numpy as np
+
+from protocolo_binario import (partes_comando, DecodificadorComandos, RESPUESTA,
+                               CMD_INICIO, CMD_DATOS, CMD_FIN, RESP_OK, RESP_ERROR)
+
+# ============================================
+# CARGA DE FORMAS DE ONDA CON VENTANA DE ACKs
+# ============================================
+# Reemplaza "struct.pack(f'{n}B', *senal) + trozos de 256 bytes con un
+# sleep fijo y sin confirmación":
+#   - Los bytes salen de un memoryview sobre el arreglo uint8 (sin copiar
+#     ni desempaquetar muestras) en tramas CMD_DATOS de `tam_trama` bytes,
+#     cada una con su desplazamiento y CRC-16 (protocolo_binario.py).
+#   - Ventana deslizante: hasta `ventana` tramas en vuelo; cada ACK libera
+#     un lugar y sale la siguiente, sin esperar trama por trama.
+#   - Repetición selectiva: solo se reenvía la trama con NACK (CRC malo en
+#     el ESP32) o cuyo ACK no llegó a tiempo.
+#   - Al final, CMD_FIN con el CRC-32 de toda la forma de onda: el ESP32
+#     la reproduce solo si coincide.
+#
+# Secuencia: INICIO(largo, fs) -> DATOS... -> FIN(crc32); el ESP32 responde
+# cada una con RESP_OK/RESP_ERROR (comando, desplazamiento).
+
+TAM_TRAMA = 1024      # Bytes de forma de onda por trama
+VENTANA = 8           # Tramas sin confirmar en vuelo (<= buffer RX del ESP32 / trama)
+REINTENTOS = 8        # Envíos máximos de una misma trama
+ESPERA_CONTROL = 2.0  # s - respuesta a INICIO y FIN (FIN verifica el CRC-32)
+
+
+class TransferenciaVentana:
+    def __init__(self, ser, tam_trama=TAM_TRAMA, ventana=VENTANA, reintentos=REINTENTOS,
+                 espera_ack=None):
+        """espera_ack=None: el doble de lo que tarda en salir una ventana completa + 50 ms"""
+        self.ser = ser
+        self.tam_trama = int(tam_trama)
+        self.ventana = int(ventana)
+        self.reintentos = int(reintentos)
+        if espera_ack is None:
+            espera_ack = 2 * self.ventana * self._segundos_por_byte() * (self.tam_trama + 12) + 0.05
+        self.espera_ack = espera_ack
+        self._decodificador = DecodificadorComandos(max_payload=RESPUESTA.size)
+
+    def _segundos_por_byte(self):
+        return 10.0 / self.ser.baudrate   # 8N1
+
+    # ---------- Envío y respuestas ----------
+    def _enviar(self, codigo, *payload):
+        for parte in partes_comando(codigo, *payload):
+            self.ser.write(parte)
+
+    def _leer_respuestas(self):
+        """[(codigo, comando, desplazamiento), ...] llegadas hasta ahora"""
+        pendientes = self.ser.in_waiting
+        if not pendientes:
+            return []
+        respuestas = []
+        for codigo, payload in self._decodificador.alimentar(self.ser.read(pendientes)):
+            if len(payload) == RESPUESTA.size and codigo in (RESP_OK, RESP_ERROR):
+                respuestas.append((codigo,) + RESPUESTA.unpack(payload))
+        return respuestas
+
+    def _control(self, codigo, payload, desplazamiento):
+        """Envía INICIO/FIN y espera su respuesta; reenvía ante NACK o silencio"""
+        rechazado = False
+        for _ in range(self.reintentos):
+            self._enviar(codigo, payload)
+            limite = time.perf_counter() + ESPERA_CONTROL
+            respuesta = None
+            while respuesta is None and time.perf_counter() < limite:
+                for r, comando, valor in self._leer_respuestas():
+                    if comando == codigo and valor == desplazamiento:
+                        respuesta = r
+                if respuesta is None:
+                    time.sleep(0.001)
+            if respuesta == RESP_OK:
+                return
+            rechazado = rechazado or respuesta == RESP_ERROR
+        if rechazado and codigo == CMD_FIN:
+            raise RuntimeError("el ESP32 rechazó la forma de onda (CRC-32 distinto)")
+        if rechazado:
+            raise RuntimeError(f"el ESP32 rechazó el comando {chr(codigo)}")
+        raise RuntimeError(f"sin confirmación del comando {chr(codigo)}")
+
+    # ---------- Transferencia completa ----------
+    def enviar(self, forma, fs):
+        """Sube la forma de onda (uint8) y la deja reproduciéndose a fs.
+
+        Devuelve un dict con bytes, tramas, reenvíos, duración y throughput.
+        """
+        datos = np.ascontiguousarray(forma, dtype=np.uint8)
+        vista = memoryview(datos).cast('B')
+        total = len(vista)
+        self.ser.reset_input_buffer()
+        t0 = time.perf_counter()
+
+        self._control(CMD_INICIO, struct.pack('<II', total, int(fs)), 0)
+
+        en_vuelo = {}          # desplazamiento -> [hora de envío, envíos]
+        siguiente = 0
+        reenvios = 0
+        tramas = 0
+        while siguiente < total or en_vuelo:
+            # Llenar la ventana
+            while siguiente < total and len(en_vuelo) < self.ventana:
+                self._enviar_datos(vista, siguiente)
+                en_vuelo[siguiente] = [time.perf_counter(), 1]
+                siguiente += self.tam_trama
+                tramas += 1
+
+            # ACK libera la trama; NACK la reenvía ya
+            hubo_respuesta = False
+            for respuesta, comando, desplazamiento in self._leer_respuestas():
+                if comando != CMD_DATOS or desplazamiento not in en_vuelo:
+                    continue
+                hubo_respuesta = True
+                if respuesta == RESP_OK:
+                    del en_vuelo[desplazamiento]
+                else:
+                    reenvios += self._reenviar(vista, en_vuelo, desplazamiento)
+
+            # Sin ACK a tiempo: se perdió la trama o su respuesta
+            ahora = time.perf_counter()
+            for desplazamiento, (enviada, _) in list(en_vuelo.items()):
+                if ahora - enviada > self.espera_ack:
+                    reenvios += self._reenviar(vista, en_vuelo, desplazamiento)
+
+            if not hubo_respuesta and len(en_vuelo) >= self.ventana:
+                time.sleep(0.0005)
+
+        self._control(CMD_FIN, struct.pack('<I', zlib.crc32(vista)), total)
+        duracion = time.perf_counter() - t0
+        throughput = total / duracion if duracion > 0 else float('nan')
+        return {
+            'bytes': total,
+            'tramas': tramas,
+            'reenvios': reenvios,
+            'duracion': duracion,
+            'throughput': throughput,                                  # bytes/s útiles
+            'eficiencia': throughput * self._segundos_por_byte(),       # fracción del enlace
+        }
+
+    def _enviar_datos(self, vista, desplazamiento):
+        self._enviar(CMD_DATOS, struct.pack('<I', desplazamiento),
+                     vista[desplazamiento:desplazamiento + self.tam_trama])
+
+    def _reenviar(self, vista, en_vuelo, desplazamiento):
+        estado = en_vuelo[desplazamiento]
+        if estado[1] >= self.reintentos:
+            raise RuntimeError(f"la trama en {desplazamiento} falló {estado[1]} veces")
+        self._enviar_datos(vista, desplazamiento)
+        estado[0] = time.perf_counter()
+        estado[1] += 1
+        return 1
+
+
+def resumen(informe):
+    """Una línea para imprimir el informe de enviar()"""
+    return (f"{informe['bytes']} bytes en {informe['duracion']:.2f} s "
+            f"({informe['throughput'] / 1024:.1f} KiB/s, {informe['eficiencia'] * 100:.0f}% del enlace), "
+            f"{informe['tramas']} tramas, {informe['reenvios']} reenvíos")